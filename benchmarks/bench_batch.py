@@ -0,0 +1,83 @@
+"""Nightly-digest workload: every admin asks the same questions.
+
+Compares looping execute_query per admin per question against one
+execute_batch call, on a synthetic roster. The digest questions are answered
+from the data; --llm-questions adds open questions that go to the (stub) LLM,
+whose simulated latency shows the effect of running them concurrently.
+
+Usage: python benchmarks/bench_batch.py [--rows 100000] [--admins 48] [--storage json]
+                                        [--llm-questions 0] [--token-delay 0.002]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ai_query_engine import AIQueryEngine
+from data_manager import DataManager
+from stub_llm import make_stub_llm
+from synthetic_data import write_dataset
+
+DIGEST_QUESTIONS = [
+    "Which students haven't submitted their homework yet?",
+    "Who hasn't turned in their homework?",
+    "Who needs help improving their scores?",
+    "Give me a summary report of the average scores",
+    "What are the upcoming quizzes scheduled for next week?",
+    "How many students are in my scope?",
+    "Average quiz score per class",
+    "Top 5 students",
+]
+LLM_QUESTIONS = [
+    "Why might some students be falling behind this term?",
+    "Suggest a focus for next week's lessons",
+    "Anything unusual about this group?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query loop vs execute_batch for digest questions")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--admins', type=int, default=48)
+    parser.add_argument('--storage', default='json', choices=['json', 'columnar', 'sqlite'])
+    parser.add_argument('--llm-questions', type=int, default=0, choices=range(len(LLM_QUESTIONS) + 1))
+    parser.add_argument('--token-delay', type=float, default=0.002, help="stub LLM seconds per token")
+    args = parser.parse_args()
+
+    queries = DIGEST_QUESTIONS + LLM_QUESTIONS[:args.llm_questions]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        students_file, admins_file = write_dataset(tmp_dir, args.rows, admins=args.admins, skew=1.0)
+        data_manager = DataManager(students_file, admins_file, storage=args.storage)
+        admin_ids = [f"A{i:03d}" for i in range(1, args.admins + 1)]
+        llm = make_stub_llm(token_delay=args.token_delay)
+
+        start = time.perf_counter()
+        loop_engine = AIQueryEngine("unused", llm=llm)
+        expected = {}
+        for admin_id in admin_ids:
+            for query in queries:
+                expected[(admin_id, query)] = loop_engine.execute_query(data_manager, admin_id, query)
+                loop_engine.reset_context(admin_id)
+        loop_seconds = time.perf_counter() - start
+
+        # A fresh DataManager so the batch does not reuse scope positions cached by the loop
+        data_manager = DataManager(students_file, admins_file, storage=args.storage)
+        batch_engine = AIQueryEngine("unused", llm=llm)
+        start = time.perf_counter()
+        answers = batch_engine.execute_batch(data_manager, admin_ids, queries)
+        batch_seconds = time.perf_counter() - start
+
+        mismatches = sum(answers[admin_id][query] != expected[(admin_id, query)]
+                         for admin_id, query in expected if query not in LLM_QUESTIONS)
+        print(f"rows={args.rows:,} admins={args.admins} questions={len(queries)} storage={args.storage}")
+        print(f"loop   {loop_seconds * 1000:>9.1f} ms  ({len(expected)} execute_query calls)")
+        print(f"batch  {batch_seconds * 1000:>9.1f} ms  {batch_engine.last_timings['batch']}")
+        print(f"speedup {loop_seconds / batch_seconds:.1f}x, deterministic answers differing: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
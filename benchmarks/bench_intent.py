@@ -0,0 +1,98 @@
+"""Throughput of intent classification: the per-call keyword scan vs the precompiled matcher.
+
+Usage: python benchmarks/bench_intent.py [queries]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ai_query_engine import AIQueryEngine, INTENT_KEYWORDS
+from stub_llm import make_stub_llm
+
+TEMPLATES = [
+    "Which students haven't submitted their homework yet?",
+    "Show me performance data for Grade {grade} from last week",
+    "What are the upcoming quizzes scheduled for next week?",
+    "Show me students with quiz scores below {score}",
+    "What's the average score by class?",
+    "Compare 8A vs 8B results",
+    "Who needs help improving their scores?",
+    "Give me a summary report of this week's assessments",
+    "Why did the class do better recently?",
+    # Plural and inflected keywords
+    "What quizzes do students have?",
+    "Show me all quizzes",
+    "Quizzes for {grade}A",
+    "List all upcoming quizzes",
+    "Improvement plans for struggling students",
+    "Which tests are scheduled this week?",
+]
+
+
+def legacy_parse(query: str, context=None) -> dict:
+    """parse_query_intent as it was before the matchers were precompiled"""
+    query_lower = query.lower()
+    intent_mapping = {key: list(keywords) for key, keywords in INTENT_KEYWORDS.items()}
+    grade_match = re.search(r'grade\s*(\d+)', query_lower)
+    grade = f"Grade {grade_match.group(1)}" if grade_match else None
+    time_patterns = {"last week": "2024-W02", "this week": "2024-W03",
+                     "next week": "2024-W04", "recent": "2024-W02"}
+    week = None
+    for pattern, value in time_patterns.items():
+        if pattern in query_lower:
+            week = value
+            break
+    score_match = re.search(r'(below|under|less than|above|over|more than)\s*(\d+)', query_lower)
+    score_threshold = int(score_match.group(2)) if score_match else None
+    score_operator = None
+    if score_match:
+        score_operator = "<" if score_match.group(1) in ["below", "under", "less than"] else ">"
+    intent, confidence = "general", 0
+    for key, keywords in intent_mapping.items():
+        matches = sum(1 for keyword in keywords if keyword in query_lower)
+        if matches > confidence:
+            intent, confidence = key, matches
+    if context and any(marker in query_lower for marker in ("follow", "also", "what about")):
+        intent = context[-1].get("intent", "")
+    return {"intent": intent, "grade": grade, "week": week, "score_threshold": score_threshold,
+            "score_operator": score_operator, "confidence": confidence, "original_query": query,
+            "context_aware": bool(context)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = random.Random(0)
+    queries = [rng.choice(TEMPLATES).format(grade=rng.randint(6, 9), score=rng.randint(50, 90))
+               for _ in range(count)]
+    engine = AIQueryEngine("unused", llm=make_stub_llm())
+
+    start = time.perf_counter()
+    legacy = [legacy_parse(query) for query in queries]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [engine.parse_query_intent(query) for query in queries]
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = engine.parse_queries(queries)
+    batch_seconds = time.perf_counter() - start
+    assert [p["intent"] for p in parsed] == [p["intent"] for p in single]
+
+    agreement = sum(a["intent"] == b["intent"] for a, b in zip(legacy, parsed)) / count * 100
+    differing = {query: (a["intent"], b["intent"]) for query, a, b in zip(queries, legacy, parsed)
+                 if a["intent"] != b["intent"]}
+    print(f"{'matcher':<10} {'queries/s':>12}")
+    print(f"{'legacy':<10} {count / legacy_seconds:>12,.0f}")
+    print(f"{'compiled':<10} {count / single_seconds:>12,.0f}")
+    print(f"{'batch':<10} {count / batch_seconds:>12,.0f}  ({len(set(queries))} distinct queries)")
+    print(f"intent agreement: {agreement:.1f}% (differences come from whole-word matching)")
+    for query, (old, new) in sorted(differing.items()):
+        print(f"  {query!r}: legacy {old} -> compiled {new}")
+
+
+if __name__ == '__main__':
+    main()
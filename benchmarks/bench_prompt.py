@@ -0,0 +1,93 @@
+"""Tokens sent to the LLM per agent question: verbatim history + df.head() vs the budgeted prompt.
+
+Runs the real pandas agent on the offline stub model and counts every prompt it
+sends with the local token counter, for a few conversation lengths.
+
+Usage: python benchmarks/bench_prompt.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+
+from ai_query_engine import AIQueryEngine
+from data_manager import DataManager
+from prompt_budget import count_tokens
+from stub_llm import make_stub_llm
+from synthetic_data import write_dataset
+
+HISTORY = [
+    "Which students haven't submitted their homework yet?",
+    "Show me performance data for Grade 8 from last week",
+    "What are the upcoming quizzes scheduled for next week?",
+    "Who needs help improving their scores and what should teachers focus on in class?",
+    "Compare the average quiz results of the two classes and explain the difference",
+]
+QUESTION = "Why did the class do better recently, and which students drove the change?"
+
+
+class PromptTokens(BaseCallbackHandler):
+    def __init__(self):
+        self.tokens = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.tokens += sum(count_tokens(str(message.content)) for batch in messages for message in batch)
+
+
+def legacy_prompt(query: str, context) -> str:
+    """_build_context_prompt before the token budget: earlier queries verbatim"""
+    context_info = ""
+    if context:
+        recent_queries = [ctx["query"] for ctx in context[-3:]]
+        context_info = f"Previous queries in this conversation: {', '.join(recent_queries)}. "
+    return f"""
+        {context_info}Current query: {query}
+
+        Please analyze the student data and provide insights. Focus on:
+        - Clear, actionable information
+        - Relevant statistics and summaries
+        - Educational context and recommendations
+
+        Format your response professionally with appropriate emojis and structure.
+        """
+
+
+def run_agent(agent, prompt: str) -> int:
+    counter = PromptTokens()
+    agent.invoke({"input": prompt}, config={"callbacks": [counter]})
+    return counter.tokens
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        students_file, admins_file = write_dataset(tmp_dir, rows, skew=1.0)
+        data_manager = DataManager(students_file, admins_file, storage='json')
+        admin_id = 'A001'
+        scoped = data_manager.filter_data_by_scope(admin_id)
+        llm = make_stub_llm(token_delay=0)
+        legacy_agent = create_pandas_dataframe_agent(llm, scoped, verbose=False, allow_dangerous_code=True)
+        engine = AIQueryEngine("unused", llm=llm)
+        agent = engine._get_agent(data_manager, admin_id, scoped)
+
+        print(f"rows={rows} scope={len(scoped)} budget={engine.prompt_builder.budget}")
+        print(f"{'history':>7} {'legacy tokens':>14} {'budgeted tokens':>16} {'saved':>7} {'build ms':>9}")
+        for turns in (0, 1, 3, 5):
+            context = [{"query": query, "intent": "general"} for query in HISTORY[:turns]]
+            legacy = run_agent(legacy_agent, legacy_prompt(QUESTION, context + [{"query": QUESTION}]))
+
+            start = time.perf_counter()
+            prompt = engine._build_context_prompt(QUESTION, data_manager, admin_id, scoped, context)
+            build_ms = (time.perf_counter() - start) * 1000
+            budgeted = run_agent(agent, prompt)
+            print(f"{turns:>7} {legacy:>14} {budgeted:>16} {(1 - budgeted / legacy) * 100:>6.0f}% {build_ms:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Memory and scope-filter speed of the raw JSON frame vs the typed student schema.
+
+Usage: python benchmarks/bench_schema.py [rows]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from student_schema import apply_student_schema
+from bench_storage import write_roster
+
+SCOPE = {'grade': ['Grade 8'], 'class': ['8A', '8B'], 'region': ['North']}
+
+
+def scope_filter(students_df: pd.DataFrame) -> pd.DataFrame:
+    """The per-call isin masks DataManager used before scope indexes"""
+    mask = students_df['grade'].isin(SCOPE['grade'])
+    mask &= students_df['class'].isin(SCOPE['class'])
+    mask &= students_df['region'].isin(SCOPE['region'])
+    return students_df[mask]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        students_file = os.path.join(tmp_dir, 'students_data.json')
+        write_roster(students_file, rows)
+        raw_df = pd.read_json(students_file, convert_dates=False)
+
+    typed_df = apply_student_schema(raw_df)
+
+    print(f"{'schema':<8} {'memory (MB)':>12} {'scope filter (ms)':>18} {'score < 75 (ms)':>16}")
+    for name, frame in (('raw', raw_df), ('typed', typed_df)):
+        memory_mb = frame.memory_usage(deep=True).sum() / 1024 ** 2
+        filter_ms = min(timeit.repeat(lambda: scope_filter(frame), number=5, repeat=3)) / 5 * 1000
+        score_ms = min(timeit.repeat(lambda: frame[frame['quiz_score'] < 75], number=5, repeat=3)) / 5 * 1000
+        print(f"{name:<8} {memory_mb:>12.1f} {filter_ms:>18.2f} {score_ms:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Compare cold start and peak RSS of JSON vs memory-mapped Feather loading.
+
+Usage: python benchmarks/bench_storage.py [rows]
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+ADMINS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'admin_roles.json')
+
+# Runs in a fresh interpreter so RSS reflects a single load path
+CHILD_SCRIPT = """
+import resource, sys, time
+sys.path.insert(0, {src_dir!r})
+from data_manager import DataManager
+start = time.perf_counter()
+dm = DataManager({students_file!r}, {admins_file!r}, storage={storage!r})
+loaded = time.perf_counter() - start
+start = time.perf_counter()
+dm.get_performance_data('A001')
+query = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(f"{{loaded:.3f}} {{query:.4f}} {{rss_mb:.1f}}")
+"""
+
+
+def write_roster(path: str, rows: int, seed: int = 42):
+    """Write a synthetic students_data.json with the repo's record layout"""
+    rng = random.Random(seed)
+    classes = {'Grade 7': ['7A', '7B'], 'Grade 8': ['8A', '8B'], 'Grade 9': ['9A', '9B']}
+    regions = ['North', 'South', 'East', 'West']
+    quizzes = ['Math Quiz', 'Science Quiz', 'English Quiz', 'History Quiz']
+    records = []
+    for i in range(rows):
+        grade = rng.choice(list(classes))
+        records.append({
+            "student_id": f"S{i:07d}",
+            "student_name": f"Student {i}",
+            "grade": grade,
+            "class": rng.choice(classes[grade]),
+            "region": rng.choice(regions),
+            "homework_submitted": rng.random() < 0.7,
+            "homework_date": "2024-01-15",
+            "quiz_score": rng.randint(40, 100),
+            "quiz_date": "2024-01-10",
+            "upcoming_quiz": rng.choice(quizzes),
+            "upcoming_quiz_date": f"2024-01-{rng.randint(20, 31)}",
+            "performance_week": rng.choice(["2024-W02", "2024-W03"])
+        })
+    with open(path, 'w') as f:
+        json.dump(records, f)
+
+
+def run_child(students_file: str, storage: str):
+    script = CHILD_SCRIPT.format(src_dir=SRC_DIR, students_file=students_file,
+                                 admins_file=ADMINS_FILE, storage=storage)
+    output = subprocess.check_output([sys.executable, '-c', script], text=True)
+    return [float(value) for value in output.split()]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        students_file = os.path.join(tmp_dir, 'students_data.json')
+        print(f"Generating {rows:,} synthetic students...")
+        write_roster(students_file, rows)
+
+        # First columnar run pays the one-time JSON -> Feather conversion
+        run_child(students_file, 'columnar')
+
+        print(f"{'storage':<10} {'load (s)':>10} {'query (s)':>10} {'peak RSS (MB)':>14}")
+        for storage in ('json', 'columnar'):
+            loaded, query, rss_mb = run_child(students_file, storage)
+            print(f"{storage:<10} {loaded:>10.3f} {query:>10.4f} {rss_mb:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
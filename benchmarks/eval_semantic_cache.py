@@ -0,0 +1,94 @@
+"""Precision/recall of SemanticCache on a paraphrase set, across similarity thresholds.
+
+Each group holds paraphrases of one question. The first phrasing is cached, the
+rest are looked up: a hit from the same group is a true positive, a hit from
+another group a false positive, and a miss a false negative. Unrelated questions
+(UNSEEN) must miss; any hit on them is counted separately.
+
+Usage: python benchmarks/eval_semantic_cache.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from semantic_cache import SemanticCache
+
+# At the default threshold a false hit serves a wrong answer, so precision must stay perfect
+MIN_RECALL = 0.7
+
+SCOPE = {'grades': ['Grade 8'], 'classes': ['8A', '8B'], 'regions': ['North']}
+
+PARAPHRASES = [
+    ["Who hasn't turned in homework?", "missing homework list", "which students haven't submitted homework",
+     "list pupils without homework submissions", "students that did not hand in their assignment"],
+    ["What is the average quiz score?", "average score on quizzes", "mean quiz marks",
+     "what's the average test score"],
+    ["Which students scored below 70?", "students with scores below 70", "who has a score below 70",
+     "list pupils scoring below 70"],
+    ["Which students scored above 90?", "students with scores above 90", "who scored above 90 on the quiz"],
+    ["What quizzes are coming up?", "upcoming quizzes", "which tests are upcoming", "show upcoming exams"],
+    ["Who are the best students?", "best performing students", "show me the best pupils",
+     "which students perform best"],
+    ["Who are the weakest students?", "worst performing students", "which pupils perform worst"],
+    ["How is class 8A doing?", "performance of class 8A", "8A class performance"],
+    ["How is class 8B doing?", "performance of class 8B", "8B class performance"],
+    ["Which students need extra support?", "who needs support", "students needing extra support"],
+    ["Who submitted their homework?", "students who turned in homework", "list students that handed in homework"],
+    # Distractors: close in wording to the groups above but asking something else
+    ["What is the homework completion rate?", "homework completion rate", "what percentage completed homework"],
+    ["How many students are in Grade 8?", "number of students in grade 8", "count of grade 8 students"],
+    ["What is the average score in class 8A?", "average quiz score for 8A", "8A average score"],
+    ["When is the next science quiz?", "date of the next science quiz", "when is science quiz scheduled"],
+]
+
+UNSEEN = [
+    "What is the median quiz score?", "Which students are in the North region?", "list students in 7A",
+    "Who submitted homework late?", "What is the standard deviation of scores?", "Which class has the most students?",
+    "Show quiz dates for next month", "How many quizzes are scheduled?", "Who improved the most since last week?",
+]
+
+
+def evaluate(threshold: float):
+    cache = SemanticCache(threshold=threshold)
+    for group_index, group in enumerate(PARAPHRASES):
+        cache.put(group[0], SCOPE, 'v1', str(group_index))
+
+    true_positive = false_positive = false_negative = 0
+    for group_index, group in enumerate(PARAPHRASES):
+        for query in group[1:]:
+            hit = cache.lookup(query, SCOPE, 'v1')
+            if hit is None:
+                false_negative += 1
+            elif hit[0] == str(group_index):
+                true_positive += 1
+            else:
+                false_positive += 1
+                false_negative += 1
+
+    unseen_hits = sum(cache.lookup(query, SCOPE, 'v1') is not None for query in UNSEEN)
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 1.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    return precision, recall, unseen_hits
+
+
+def main():
+    print(f"{'threshold':>9} {'precision':>10} {'recall':>8} {'unseen hits':>12}")
+    for threshold in (0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9):
+        precision, recall, unseen_hits = evaluate(threshold)
+        print(f"{threshold:>9.2f} {precision:>10.2f} {recall:>8.2f} {unseen_hits:>7}/{len(UNSEEN)}")
+
+    default_threshold = SemanticCache().threshold
+    precision, recall, unseen_hits = evaluate(default_threshold)
+    assert precision == 1.0 and unseen_hits == 0, \
+        f"false hits at threshold {default_threshold}: precision {precision:.2f}, unseen hits {unseen_hits}"
+    assert recall >= MIN_RECALL, f"recall {recall:.2f} at threshold {default_threshold} is below {MIN_RECALL}"
+
+    # Cached answers never cross scopes or data versions
+    cache = SemanticCache(threshold=0.0)
+    cache.put(PARAPHRASES[0][0], SCOPE, 'v1', 'answer')
+    assert cache.lookup(PARAPHRASES[0][1], SCOPE, 'v2') is None
+    assert cache.lookup(PARAPHRASES[0][1], {'grades': ['Grade 7']}, 'v1') is None
+
+
+if __name__ == '__main__':
+    main()
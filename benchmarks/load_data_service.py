@@ -0,0 +1,102 @@
+"""Load test for the data service: many concurrent admin sessions against one server process.
+
+Starts src/data_service.py on a synthetic roster, then runs SESSIONS client threads
+that each replay a dashboard-like mix of calls for DURATION seconds.
+
+Usage: python benchmarks/load_data_service.py [rows] [sessions] [duration]
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from data_service import DataServiceClient
+from bench_storage import write_roster
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+ADMINS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'admin_roles.json')
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def session(client: DataServiceClient, admin_ids, deadline: float, latencies, errors, seed: int):
+    """One admin session: dashboard numbers, a few table pages, a drill-down"""
+    rng = random.Random(seed)
+    calls = [
+        lambda admin: client.get_class_analytics(admin),
+        lambda admin: client.get_group_statistics(admin, 'class'),
+        lambda admin: client.get_student_page(admin, ['student_name', 'class', 'quiz_score', 'homework_submitted'],
+                                              sort_by='quiz_score', ascending=False,
+                                              offset=rng.randrange(0, 500, 50), limit=50),
+        lambda admin: client.get_student_page(admin, ['student_name', 'class', 'quiz_score'],
+                                              search=str(rng.randint(1, 99)), limit=50),
+        lambda admin: client.get_students_by_score_threshold(admin, 45, '<'),
+    ]
+    while time.perf_counter() < deadline:
+        admin = rng.choice(admin_ids)
+        call = rng.choice(calls)
+        start = time.perf_counter()
+        try:
+            call(admin)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(repr(e))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+    with open(ADMINS_FILE) as f:
+        admin_ids = [admin['admin_id'] for admin in json.load(f)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        students_file = os.path.join(tmp_dir, 'students_data.json')
+        write_roster(students_file, rows)
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(SRC_DIR, 'data_service.py'), '--students', students_file,
+             '--admins', ADMINS_FILE, '--storage', 'columnar', '--port', '0'],
+            stdout=subprocess.PIPE, text=True)
+        try:
+            url = server.stdout.readline().strip().rsplit(' ', 1)[-1]
+            client = DataServiceClient(url)
+            for admin in admin_ids:
+                client.get_class_analytics(admin)  # warm scope indexes
+
+            latencies, errors = [], []
+            deadline = time.perf_counter() + duration
+            threads = [threading.Thread(target=session, args=(client, admin_ids, deadline, latencies, errors, i))
+                       for i in range(sessions)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            latencies.sort()
+            quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+            print(f"rows={rows} sessions={sessions} duration={duration:g}s")
+            print(f"requests: {len(latencies)}  errors: {len(errors)}  throughput: {len(latencies) / duration:,.0f} req/s")
+            print(f"latency ms: p50={quantile(0.5):.1f}  p95={quantile(0.95):.1f}  p99={quantile(0.99):.1f}")
+            print(f"server RSS: {rss_mb(server.pid):.0f} MB (shared by all UI processes)")
+            print(f"client RSS: {rss_mb(os.getpid()):.0f} MB (holds no student data)")
+            if errors:
+                print("first error:", errors[0])
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
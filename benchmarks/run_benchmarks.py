@@ -0,0 +1,199 @@
+"""Timing suite for DataManager methods, dashboard metrics and intent parsing.
+
+For each roster size a synthetic dataset is generated (benchmarks/synthetic_data.py),
+loaded once, and every case is timed: the first call separately (cold caches),
+then `--repeat` batches of warm calls. Results go to a JSON file; pass
+`--compare` with an earlier file to flag cases that got slower.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 1000,100000,1000000] [--storage json]
+                                           [--repeat 5] [--output FILE] [--compare FILE]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ai_query_engine import AIQueryEngine
+from dashboard_metrics import DASHBOARD_COLUMNS, dashboard_metrics
+from data_manager import DataManager
+from stub_llm import make_stub_llm
+from synthetic_data import write_dataset
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+# Warm calls are batched until a batch takes at least this long, so fast cases are measurable
+MIN_BATCH_SECONDS = 0.05
+
+QUERIES = [
+    "Which students haven't submitted their homework yet?",
+    "Show me performance data for Grade 8 from last week",
+    "What are the upcoming quizzes scheduled for next week?",
+    "Show me students with quiz scores below 60",
+    "Compare 8A vs 8B results",
+    "Who needs help improving their scores?",
+]
+
+
+def cases(data_manager: DataManager, engine: AIQueryEngine, admin_id: str) -> Dict[str, Callable[[], Any]]:
+    """Benchmark name -> zero-argument call"""
+    # Writes leave the data as they found it; the scope query after each one pays for any index rebuild
+    student = data_manager.filter_data_by_scope(admin_id).iloc[0].to_dict()
+    new_student = {**student, 'student_id': 'BENCH-NEW'}
+
+    def insert_delete():
+        data_manager.upsert_student(new_student)
+        data_manager.delete_student('BENCH-NEW')
+        return data_manager.filter_data_by_scope(admin_id, ['student_id'])
+
+    def update():
+        data_manager.upsert_student({'student_id': student['student_id'], 'quiz_score': student['quiz_score']})
+        return data_manager.filter_data_by_scope(admin_id, ['student_id'])
+
+    return {
+        'data_manager.filter_data_by_scope': lambda: data_manager.filter_data_by_scope(admin_id),
+        'data_manager.filter_data_by_scope[columns]':
+            lambda: data_manager.filter_data_by_scope(admin_id, DASHBOARD_COLUMNS),
+        'data_manager.get_students_without_homework': lambda: data_manager.get_students_without_homework(admin_id),
+        'data_manager.get_performance_data': lambda: data_manager.get_performance_data(admin_id, week='2024-W02'),
+        'data_manager.get_upcoming_quizzes': lambda: data_manager.get_upcoming_quizzes(admin_id),
+        'data_manager.get_students_by_score_threshold':
+            lambda: data_manager.get_students_by_score_threshold(admin_id, 60, '<'),
+        'data_manager.get_class_analytics': lambda: data_manager.get_class_analytics(admin_id),
+        'data_manager.get_group_statistics': lambda: data_manager.get_group_statistics(admin_id, 'class'),
+        'data_manager.get_students_needing_support': lambda: data_manager.get_students_needing_support(admin_id),
+        'data_manager.get_high_performers': lambda: data_manager.get_high_performers(admin_id),
+        'data_manager.get_student_page': lambda: data_manager.get_student_page(
+            admin_id, ['student_name', 'class', 'quiz_score'], sort_by='quiz_score', offset=100, limit=50),
+        'data_manager.write_export[csv]': lambda: data_manager.write_export(admin_id, io.BytesIO(), 'csv'),
+        'dashboard.metrics': lambda: dashboard_metrics(data_manager.filter_data_by_scope(admin_id, DASHBOARD_COLUMNS)),
+        'engine.parse_query_intent': lambda: [engine.parse_query_intent(query) for query in QUERIES],
+        'data_manager.upsert_student[insert+delete]': insert_delete,
+        'data_manager.upsert_student[update]': update,
+    }
+
+
+def measure(call: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """First-call time plus min/median/mean of warm per-call times, in seconds"""
+    start = time.perf_counter()
+    call()
+    first = time.perf_counter() - start
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_BATCH_SECONDS or number >= 10_000:
+            break
+        number *= 10
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        samples.append((time.perf_counter() - start) / number)
+    return {'first_s': first, 'min_s': min(samples), 'median_s': statistics.median(samples),
+            'mean_s': statistics.fmean(samples), 'number': number, 'repeat': repeat}
+
+
+def run_size(rows: int, storage: str, repeat: int, skew: float, seed: int) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        students_file, admins_file = write_dataset(tmp_dir, rows, skew=skew, seed=seed)
+        start = time.perf_counter()
+        data_manager = DataManager(students_file, admins_file, storage=storage)
+        load_seconds = time.perf_counter() - start
+        results = [{'name': 'data_manager.load', 'rows': rows, 'first_s': load_seconds, 'min_s': load_seconds,
+                    'median_s': load_seconds, 'mean_s': load_seconds, 'number': 1, 'repeat': 1}]
+
+        engine = AIQueryEngine("unused", llm=make_stub_llm())
+        admin_id = 'A001'  # largest scope under skew
+        scope_rows = len(data_manager.filter_data_by_scope(admin_id, ['student_id']))
+        for name, call in cases(data_manager, engine, admin_id).items():
+            result = {'name': name, 'rows': rows, 'scope_rows': scope_rows, **measure(call, repeat)}
+            results.append(result)
+            print(f"{rows:>9,} {name:<48} first {result['first_s'] * 1000:>9.2f} ms"
+                  f"   median {result['median_s'] * 1000:>9.3f} ms", flush=True)
+        return results
+
+
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'storage': args.storage,
+        'skew': args.skew,
+        'seed': args.seed,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_file: str, tolerance: float) -> List[Tuple[str, int, float]]:
+    """(name, rows, ratio) for cases whose median is more than `tolerance` times the baseline's"""
+    with open(baseline_file) as f:
+        baseline = {(r['name'], r['rows']): r['median_s'] for r in json.load(f)['results']}
+    regressions = []
+    print(f"\nCompared with {baseline_file}:")
+    for result in results:
+        before = baseline.get((result['name'], result['rows']))
+        if not before:
+            continue
+        ratio = result['median_s'] / before
+        flag = '  REGRESSION' if ratio > tolerance else ''
+        print(f"{result['rows']:>9,} {result['name']:<48} {ratio:>6.2f}x{flag}")
+        if ratio > tolerance:
+            regressions.append((result['name'], result['rows'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time DataManager, dashboard and intent hot paths")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated roster sizes")
+    parser.add_argument('--storage', default='json', choices=['auto', 'json', 'columnar', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    results = []
+    for rows in (int(size) for size in args.sizes.split(',')):
+        results.extend(run_size(rows, args.storage, args.repeat, args.skew, args.seed))
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': metadata(args), 'results': results}, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Deterministic synthetic rosters in the students_data.json / admin_roles.json layout.
+
+The same arguments always produce the same files. `skew` concentrates students
+in the first classes and regions (Zipf weights; 0 = uniform), so some admin
+scopes are much larger than others, as in a real district.
+
+Usage: python benchmarks/synthetic_data.py OUT_DIR [--rows N] [--grades N] [--classes N]
+                                          [--regions N] [--admins N] [--skew S] [--seed N]
+"""
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+FIRST_GRADE = 7
+REGION_NAMES = ['North', 'South', 'East', 'West', 'Central', 'Coastal', 'Highland', 'Valley']
+FIRST_NAMES = ['Alice', 'Bob', 'Charlie', 'Diana', 'Ethan', 'Fiona', 'George', 'Hannah', 'Ivan', 'Julia',
+               'Kevin', 'Laura', 'Mohammed', 'Nina', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Samuel', 'Tara']
+LAST_NAMES = ['Johnson', 'Smith', 'Brown', 'Prince', 'Hunt', 'Green', 'Wilson', 'Lee', 'Patel', 'Garcia',
+              'Kim', 'Nguyen', 'Khan', 'Rossi', 'Novak', 'Silva']
+QUIZZES = ['Math Quiz', 'Science Quiz', 'English Quiz', 'History Quiz', 'Geography Quiz']
+WEEKS = ['2024-W01', '2024-W02', '2024-W03']
+
+
+def grade_names(grades: int) -> List[str]:
+    return [f"Grade {FIRST_GRADE + i}" for i in range(grades)]
+
+
+def class_names(grade: str, classes: int) -> List[str]:
+    number = grade.split()[-1]
+    return [f"{number}{chr(ord('A') + i)}" for i in range(classes)]
+
+
+def region_names(regions: int) -> List[str]:
+    return [REGION_NAMES[i] if i < len(REGION_NAMES) else f"Region {i + 1}" for i in range(regions)]
+
+
+def _weights(count: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def generate_students(rows: int, grades: int = 3, classes: int = 2, regions: int = 4,
+                      skew: float = 0.0, seed: int = 42) -> pd.DataFrame:
+    """Student records as a DataFrame with the columns of students_data.json"""
+    rng = np.random.default_rng(seed)
+    all_classes = [(grade, name) for grade in grade_names(grades) for name in class_names(grade, classes)]
+    class_index = rng.choice(len(all_classes), size=rows, p=_weights(len(all_classes), skew))
+    region_index = rng.choice(regions, size=rows, p=_weights(regions, skew))
+
+    class_grades = np.array([grade for grade, _ in all_classes])
+    class_labels = np.array([name for _, name in all_classes])
+    first = np.array(FIRST_NAMES)[rng.integers(len(FIRST_NAMES), size=rows)]
+    last = np.array(LAST_NAMES)[rng.integers(len(LAST_NAMES), size=rows)]
+    quiz_day = rng.integers(20, 32, size=rows)
+
+    return pd.DataFrame({
+        'student_id': np.char.add('S', np.char.zfill(np.arange(1, rows + 1).astype(str), 7)),
+        'student_name': np.char.add(np.char.add(first, ' '), last),
+        'grade': class_grades[class_index],
+        'class': class_labels[class_index],
+        'region': np.array(region_names(regions))[region_index],
+        'homework_submitted': rng.random(rows) < 0.7,
+        'homework_date': '2024-01-15',
+        'quiz_score': np.clip(np.rint(rng.normal(78, 12, size=rows)), 0, 100).astype(int),
+        'quiz_date': '2024-01-10',
+        'upcoming_quiz': np.array(QUIZZES)[rng.integers(len(QUIZZES), size=rows)],
+        'upcoming_quiz_date': np.char.add('2024-01-', quiz_day.astype(str)),
+        'performance_week': np.array(WEEKS)[rng.integers(len(WEEKS), size=rows)]
+    })
+
+
+def generate_admins(admins: int, grades: int = 3, classes: int = 2, regions: int = 4) -> List[Dict[str, Any]]:
+    """Admins each scoped to one grade (all its classes) in one region; A001 gets the largest scope"""
+    names = grade_names(grades)
+    regions_list = region_names(regions)
+    records = []
+    for i in range(admins):
+        grade = names[i % grades]
+        records.append({
+            'admin_id': f"A{i + 1:03d}",
+            'admin_name': f"Admin {i + 1}",
+            'access_code': '0000',
+            'access_scope': {
+                'grades': [grade],
+                'classes': class_names(grade, classes),
+                'regions': [regions_list[(i // grades) % regions]]
+            }
+        })
+    return records
+
+
+def write_dataset(directory: str, rows: int, grades: int = 3, classes: int = 2, regions: int = 4,
+                  admins: int = 8, skew: float = 0.0, seed: int = 42) -> Tuple[str, str]:
+    """Write students_data.json and admin_roles.json into directory; returns both paths"""
+    os.makedirs(directory, exist_ok=True)
+    students_file = os.path.join(directory, 'students_data.json')
+    admins_file = os.path.join(directory, 'admin_roles.json')
+    generate_students(rows, grades, classes, regions, skew, seed).to_json(students_file, orient='records')
+    with open(admins_file, 'w') as f:
+        json.dump(generate_admins(admins, grades, classes, regions), f, indent=2)
+    return students_file, admins_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic student roster and admin file")
+    parser.add_argument('directory')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--grades', type=int, default=3)
+    parser.add_argument('--classes', type=int, default=2, help="classes per grade")
+    parser.add_argument('--regions', type=int, default=4)
+    parser.add_argument('--admins', type=int, default=8)
+    parser.add_argument('--skew', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    students_file, admins_file = write_dataset(args.directory, args.rows, args.grades, args.classes,
+                                               args.regions, args.admins, args.skew, args.seed)
+    print(f"Wrote {args.rows} students to {students_file} and {args.admins} admins to {admins_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, FrozenSet, Tuple
+
+@dataclass(frozen=True)
+class AdminScope:
+    """Normalized, immutable access scope. None means the dimension is unrestricted."""
+    grades: Optional[FrozenSet[str]] = None
+    classes: Optional[FrozenSet[str]] = None
+    regions: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def from_dict(cls, scope: Dict[str, List[str]]) -> 'AdminScope':
+        """Build a scope from the access_scope block of admin_roles.json"""
+        def _normalize(key):
+            values = scope.get(key)
+            return frozenset(values) if values is not None else None
+
+        return cls(
+            grades=_normalize('grades'),
+            classes=_normalize('classes'),
+            regions=_normalize('regions')
+        )
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Convert back to the JSON-style scope dict used across the app"""
+        scope = {}
+        for key in ('grades', 'classes', 'regions'):
+            values = getattr(self, key)
+            if values is not None:
+                scope[key] = sorted(values)
+        return scope
+
+
+@dataclass(frozen=True)
+class AdminRecord:
+    """Single admin profile with a frozen scope"""
+    admin_id: str
+    admin_name: str
+    access_code: str
+    scope: AdminScope
+
+    @classmethod
+    def from_dict(cls, admin: Dict[str, Any]) -> 'AdminRecord':
+        return cls(
+            admin_id=admin['admin_id'],
+            admin_name=admin.get('admin_name', admin['admin_id']),
+            access_code=admin.get('access_code', ''),
+            scope=AdminScope.from_dict(admin.get('access_scope', {}))
+        )
+
+
+class AdminRegistry:
+    """Admin profiles keyed by admin_id, reloaded only when the file's mtime changes"""
+
+    def __init__(self, admins_file: str = None, admin_roles: List[Dict[str, Any]] = None):
+        self.admins_file = admins_file
+        self.version = 0
+        self._lock = threading.Lock()
+        self._file_signature = None
+        self._admins: Dict[str, AdminRecord] = {}
+
+        if admin_roles is not None:
+            self.load_records(admin_roles)
+        elif admins_file:
+            self.refresh()
+
+    def _read_signature(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.admins_file)
+        except OSError:
+            return None
+        return (stat.st_mtime, stat.st_size)
+
+    def refresh(self) -> bool:
+        """Reload admin_roles.json if it changed on disk. Returns True when reloaded."""
+        if not self.admins_file:
+            return False
+
+        signature = self._read_signature()
+        if signature is not None and signature == self._file_signature:
+            return False
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if signature is not None and signature == self._file_signature:
+                return False
+            with open(self.admins_file, 'r') as f:
+                admin_roles = json.load(f)
+            self._install(admin_roles)
+            self._file_signature = signature
+        return True
+
+    def load_records(self, admin_roles: List[Dict[str, Any]]):
+        """Replace the registry contents with in-memory admin records"""
+        with self._lock:
+            self._install(admin_roles)
+
+    def _install(self, admin_roles: List[Dict[str, Any]]):
+        # Build the new mapping first, then swap it in with a single assignment
+        self._admins = {admin['admin_id']: AdminRecord.from_dict(admin) for admin in admin_roles}
+        self.version += 1
+
+    def get(self, admin_id: str) -> Optional[AdminRecord]:
+        """Get an admin record by id"""
+        return self._admins.get(admin_id)
+
+    def get_scope(self, admin_id: str) -> Optional[AdminScope]:
+        """Get the frozen scope for an admin"""
+        admin = self._admins.get(admin_id)
+        return admin.scope if admin else None
+
+    def get_admin_options(self) -> Dict[str, str]:
+        """Map admin_id to display name, in file order"""
+        return {admin_id: admin.admin_name for admin_id, admin in self._admins.items()}
+
+    def verify_access_code(self, admin_id: str, access_code: str) -> bool:
+        """Check an access code against the admin's profile"""
+        admin = self._admins.get(admin_id)
+        return bool(admin) and access_code == admin.access_code
+
+    def __contains__(self, admin_id: str) -> bool:
+        return admin_id in self._admins
+
+    def __len__(self) -> int:
+        return len(self._admins)
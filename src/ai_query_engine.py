@@ -2,52 +2,251 @@ import os
 from langchain_openai import ChatOpenAI
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.callbacks import BaseCallbackHandler
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+import queue
+import threading
 import re
 import json
+import time
+import asyncio
+import uuid
+import contextvars
+from conversation_store import ConversationStore, Turn
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+from table_render import TableResult
+from llm_pool import AgentCache, AsyncLimiter, get_shared_llm, shared_agent_cache, shared_llm_limiter
+from prompt_budget import DEFAULT_PROMPT_BUDGET, PromptBuilder, count_tokens
+from query_planner import QueryPlanner
+from tracing import tracer
+
+# Phrases that make a query depend on earlier turns, so its answer can't be cached
+FOLLOW_UP_MARKERS = ("follow", "also", "what about")
+
+# Intent keywords in priority order; ties go to the earlier intent
+INTENT_KEYWORDS = {
+    "homework": ["homework", "assignment", "submit", "turn in", "hand in"],
+    "performance": ["performance", "score", "grade", "result", "achievement", "progress"],
+    "quiz": ["quiz", "test", "exam", "upcoming", "scheduled", "assessment"],
+    "analytics": ["average", "mean", "statistics", "summary", "report", "analysis"],
+    "support": ["help", "support", "struggling", "difficulty", "improve", "below"],
+    "comparison": ["compare", "versus", "vs", "difference", "better", "worse"]
+}
+
+# Inflected forms that count as their keyword ("quizzes" for "quiz", "improvement" for "improve")
+KEYWORD_INFLECTIONS = {
+    "homework": ["homeworks"],
+    "assignment": ["assignments"],
+    "submit": ["submits", "submitted", "submitting", "submission", "submissions"],
+    "turn in": ["turns in", "turned in", "turning in"],
+    "hand in": ["hands in", "handed in", "handing in"],
+    "performance": ["performances"],
+    "score": ["scores", "scored", "scoring"],
+    "grade": ["grades", "graded", "grading"],
+    "result": ["results"],
+    "achievement": ["achievements"],
+    "progress": ["progresses", "progressed", "progressing"],
+    "quiz": ["quizzes", "quizzed"],
+    "test": ["tests", "tested", "testing"],
+    "exam": ["exams"],
+    "scheduled": ["schedule", "schedules"],
+    "assessment": ["assessments"],
+    "average": ["averages", "averaged", "averaging"],
+    "mean": ["means"],
+    "statistics": ["statistic", "stats"],
+    "summary": ["summaries"],
+    "report": ["reports", "reported", "reporting"],
+    "analysis": ["analyses"],
+    "help": ["helps", "helped", "helping"],
+    "support": ["supports", "supported", "supporting"],
+    "struggling": ["struggle", "struggles", "struggled"],
+    "difficulty": ["difficulties"],
+    "improve": ["improves", "improved", "improving", "improvement", "improvements"],
+    "compare": ["compares", "compared", "comparing", "comparison", "comparisons"],
+    "difference": ["differences"],
+    "recent": ["recently"],
+    "follow": ["follows", "followed", "following"],
+}
+
+TIME_PATTERNS = {
+    "last week": "2024-W02",
+    "this week": "2024-W03",
+    "next week": "2024-W04",
+    "recent": "2024-W02"
+}
+
+
+# Every keyword the parser looks for, mapped to what it signals
+_KEYWORD_ROLES: Dict[str, Tuple[str, Any]] = {
+    **{keyword: ("intent", intent) for intent, keywords in INTENT_KEYWORDS.items() for keyword in keywords},
+    **{pattern: ("week", week) for pattern, week in TIME_PATTERNS.items()},
+    **{marker: ("follow_up", None) for marker in FOLLOW_UP_MARKERS}
+}
+
+# Each form the scan can match, mapped to its keyword
+_KEYWORD_FORMS: Dict[str, str] = {
+    form: keyword for keyword in _KEYWORD_ROLES for form in (keyword, *KEYWORD_INFLECTIONS.get(keyword, ()))
+}
+
+# One compiled scan per query: keywords (and their listed inflections) are looked up as whole
+# words or word pairs, never inside other words ("vs" in "canvas", "test" in "latest")
+_WORD_PATTERN = re.compile(r"\w+")
+_GRADE_PATTERN = re.compile(r'grade\s*(\d+)')
+_SCORE_PATTERN = re.compile(r'(below|under|less than|above|over|more than)\s*(\d+)')
+
+
+def _find_keywords(query_lower: str) -> set:
+    """Keywords present in a lowercased query, with inflected forms mapped back to their keyword"""
+    words = _WORD_PATTERN.findall(query_lower)
+    found = {_KEYWORD_FORMS[word] for word in words if word in _KEYWORD_FORMS}
+    for pair in map(" ".join, zip(words, words[1:])):
+        if pair in _KEYWORD_FORMS:
+            found.add(_KEYWORD_FORMS[pair])
+    return found
+
+
+# Response prefixes that indicate a failure and must not be cached
+UNCACHEABLE_PREFIXES = ("Error processing query", "API quota exceeded")
+
+class _TokenCounter(BaseCallbackHandler):
+    """Counts LLM tokens: provider-reported usage when available, else local counts of
+    the prompts sent and the chunks streamed back"""
+    
+    def __init__(self):
+        self.reported = 0
+        self.prompt = 0
+        self.streamed = 0
+    
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompt += sum(count_tokens(str(message.content)) for batch in messages for message in batch)
+    
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.prompt += sum(count_tokens(prompt) for prompt in prompts)
+    
+    def on_llm_new_token(self, token: str, **kwargs):
+        self.streamed += 1
+    
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.reported += usage.get("total_tokens", 0)
+    
+    @property
+    def tokens(self) -> int:
+        return self.reported or self.prompt + self.streamed
+
+
+class _StreamingHandler(_TokenCounter):
+    """Forwards LLM tokens and agent tool calls to a queue for stream_query"""
+    
+    def __init__(self, events: queue.Queue):
+        super().__init__()
+        self.events = events
+    
+    def on_llm_new_token(self, token: str, **kwargs):
+        super().on_llm_new_token(token, **kwargs)
+        self.events.put({"type": "token", "text": token})
+    
+    def on_agent_action(self, action, **kwargs):
+        self.events.put({"type": "step", "text": f"Running {action.tool}: {action.tool_input}"})
+
+
+class _RequestState:
+    """Per-request state of a query: whose conversation it belongs to, the history it
+    was asked with, its timings, the table it produced and the turn it recorded"""
+    __slots__ = ('admin_id', 'history', 'timings', 'table', 'turn')
+    
+    def __init__(self, admin_id: Optional[str] = None):
+        self.admin_id = admin_id
+        self.history: List[Dict] = []
+        self.timings: Dict[str, Any] = {}
+        self.table: Optional[TableResult] = None
+        self.turn: Optional[Turn] = None
+
 
 class AIQueryEngine:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, response_cache: ResponseCache = None, llm=None,
+                 agent_cache: AgentCache = None, limiter: AsyncLimiter = None,
+                 semantic_cache: SemanticCache = None, conversation_store: ConversationStore = None,
+                 session_id: str = None, prompt_budget: int = DEFAULT_PROMPT_BUDGET):
         os.environ["OPENAI_API_KEY"] = api_key
-        self.llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
+        # State of the request running in the current context (thread or asyncio task), so
+        # concurrent queries on a shared engine never see each other's admin or history
+        self._request: contextvars.ContextVar = contextvars.ContextVar(f"engine_request_{id(self)}", default=None)
+        # Running totals, in seconds
+        self.timing_totals: Dict[str, float] = {}
+        self.token_totals: Dict[str, int] = {"prompt_tokens": 0, "llm_tokens": 0}
+        
+        start = time.perf_counter()
+        if llm is not None:
+            # Injected client (e.g. a local stub LLM in tests)
+            self.llm = llm
+        else:
+            # streaming=True lets stream_query forward tokens; invoke() still returns whole messages
+            self.llm, _ = get_shared_llm(api_key, lambda: ChatOpenAI(temperature=0, model="gpt-3.5-turbo",
+                                                                    streaming=True))
+        self._record_timing("llm_setup", time.perf_counter() - start)
+        self.agent_cache = agent_cache or shared_agent_cache
+        # Bounds concurrent LLM calls across all engines in the process (async path)
+        self.limiter = limiter or shared_llm_limiter
         # Simple conversation context management
         self.max_context_length = 5
-        self.conversation_context = []
+        # Turns per (admin, session); pass a shared store to keep context across engines and restarts
+        self.conversation_store = conversation_store or ConversationStore(max_turns=self.max_context_length)
+        self.session_id = session_id or uuid.uuid4().hex
+        # Shared across engines so repeated questions skip the LLM
+        self.response_cache = response_cache
+        # Answers to LLM questions, reused for close paraphrases
+        self.semantic_cache = semantic_cache
+        # Agent prompts carry a compact schema and aggregates instead of raw rows, within a token budget
+        self.prompt_builder = PromptBuilder(prompt_budget)
+        # Structured questions are compiled to data operations before falling back to the LLM
+        self.planner = QueryPlanner()
+        self.route_counts = {"planner": 0, "intent": 0, "semantic_cache": 0, "llm": 0}
+    
+    def _begin_request(self, admin_id: Optional[str]) -> _RequestState:
+        state = _RequestState(admin_id)
+        self._request.set(state)
+        return state
+    
+    def _state(self) -> _RequestState:
+        state = self._request.get()
+        if state is None:
+            state = self._begin_request(None)
+        return state
+    
+    @property
+    def last_timings(self) -> Dict[str, Any]:
+        """Timings of the most recent query in this context, in seconds"""
+        return self._state().timings
+    
+    @property
+    def last_table(self) -> Optional[TableResult]:
+        """Structured form of the last tabular answer in this context, for UIs that render tables natively"""
+        return self._state().table
+    
+    @property
+    def last_turn(self) -> Optional[Turn]:
+        """Turn recorded for the most recent query in this context, so callers can attach the answer to it"""
+        return self._state().turn
     
     def parse_query_intent(self, query: str, context: List[Dict] = None) -> Dict[str, Any]:
         """Enhanced query parsing with context awareness"""
         query_lower = query.lower()
         
-        intent_mapping = {
-            "homework": ["homework", "assignment", "submit", "turn in", "hand in"],
-            "performance": ["performance", "score", "grade", "result", "achievement", "progress"],
-            "quiz": ["quiz", "test", "exam", "upcoming", "scheduled", "assessment"],
-            "analytics": ["average", "mean", "statistics", "summary", "report", "analysis"],
-            "support": ["help", "support", "struggling", "difficulty", "improve", "below"],
-            "comparison": ["compare", "versus", "vs", "difference", "better", "worse"]
-        }
-        
         # Extract entities with improved patterns
-        grade_match = re.search(r'grade\s*(\d+)', query_lower)
+        grade_match = _GRADE_PATTERN.search(query_lower)
         grade = f"Grade {grade_match.group(1)}" if grade_match else None
         
-        # Enhanced time extraction
-        time_patterns = {
-            "last week": "2024-W02",
-            "this week": "2024-W03", 
-            "next week": "2024-W04",
-            "recent": "2024-W02"
-        }
+        # Single scan for intent, time and follow-up keywords
+        found = _find_keywords(query_lower)
         
-        week = None
-        for pattern, value in time_patterns.items():
-            if pattern in query_lower:
-                week = value
-                break
+        # Enhanced time extraction; the earliest-listed pattern wins
+        week = next((value for pattern, value in TIME_PATTERNS.items() if pattern in found), None)
         
         # Score threshold extraction
-        score_match = re.search(r'(below|under|less than|above|over|more than)\s*(\d+)', query_lower)
+        score_match = _SCORE_PATTERN.search(query_lower)
         score_threshold = None
         score_operator = None
         if score_match:
@@ -56,11 +255,15 @@ class AIQueryEngine:
             score_threshold = threshold
             score_operator = "<" if operator in ["below", "under", "less than"] else ">"
         
-        # Determine intent with priority
+        # Determine intent with priority: count distinct keywords per intent in one scan
+        counts = dict.fromkeys(INTENT_KEYWORDS, 0)
+        for keyword in found:
+            role, value = _KEYWORD_ROLES[keyword]
+            if role == "intent":
+                counts[value] += 1
         intent = "general"
         confidence = 0
-        for key, keywords in intent_mapping.items():
-            matches = sum(1 for keyword in keywords if keyword in query_lower)
+        for key, matches in counts.items():
             if matches > confidence:
                 intent = key
                 confidence = matches
@@ -68,7 +271,7 @@ class AIQueryEngine:
         # Context-aware intent refinement
         if context and len(context) > 0:
             last_intent = context[-1].get("intent", "")
-            if "follow" in query_lower or "also" in query_lower or "what about" in query_lower:
+            if any(marker in found for marker in FOLLOW_UP_MARKERS):
                 intent = last_intent  # Continue previous conversation thread
         
         return {
@@ -82,6 +285,19 @@ class AIQueryEngine:
             "context_aware": bool(context and len(context) > 0)
         }
     
+    def parse_queries(self, queries: List[str], context: List[Dict] = None) -> List[Dict[str, Any]]:
+        """Classify many queries at once (e.g. replaying logged questions to test routing).
+        
+        Repeated questions are parsed once; each result is still a separate dict.
+        """
+        parsed: Dict[str, Dict[str, Any]] = {}
+        results = []
+        for query in queries:
+            if query not in parsed:
+                parsed[query] = self.parse_query_intent(query, context)
+            results.append(dict(parsed[query]))
+        return results
+    
     def generate_contextual_response(self, data_result: pd.DataFrame, query_info: Dict, admin_id: str) -> str:
         """Generate intelligent, contextual responses"""
         intent = query_info["intent"]
@@ -209,120 +425,558 @@ class AIQueryEngine:
         """Format general responses"""
         return self._format_as_table(data, "Query Results", f"Total Records: {len(data)}")
     
+    @tracer.traced("engine.format_table")
     def _format_as_table(self, data: pd.DataFrame, title: str, summary: str = None) -> str:
         """Format DataFrame as a clean table with title and summary"""
-        if data.empty:
-            return f"{title}: No data found"
-        
-        # Create clean column headers
-        clean_data = data.copy()
-        clean_data.columns = [col.replace('_', ' ').title() for col in clean_data.columns]
-        
-        # Format the table
-        table_str = clean_data.to_string(index=False, justify='left')
-        
-        # Build response
-        response_parts = [f"** {title} **", "=" * (len(title) + 6), table_str]
-        
-        if summary:
-            response_parts.extend(["", f"Summary: {summary}"])
-        
-        return "\n".join(response_parts)
+        tracer.annotate(rows_in=len(data))
+        state = self._state()
+        state.table = TableResult(title, data, summary)
+        return state.table.to_text()
     
+    @tracer.traced("engine.execute_query")
     def execute_query(self, data_manager, admin_id: str, query: str) -> str:
         """Enhanced query execution with context awareness and agent-style handling"""
+        self._begin_request(admin_id)
+        start = time.perf_counter()
         # Parse query with conversation context
-        parsed = self.parse_query_intent(query, self.conversation_context)
+        parsed = self._parse_with_context(admin_id, query)
+        
+        cache_key = self._response_cache_key(data_manager, admin_id, query, parsed)
+        if cache_key is not None:
+            cached = self._cached_response(cache_key)
+            self.last_timings["response_cache_hit"] = cached is not None
+            if cached is not None:
+                self._remember_query(admin_id, query, parsed)
+                self._record_timing("query_total", time.perf_counter() - start)
+                return cached
         
+        response = self._run_query(data_manager, admin_id, query, parsed)
+        self._record_timing("query_total", time.perf_counter() - start)
+        if cache_key is not None and not response.startswith(UNCACHEABLE_PREFIXES):
+            self.response_cache.put(cache_key, response)
+        return response
+    
+    @tracer.traced("engine.parse_intent")
+    def _parse_with_context(self, admin_id: str, query: str) -> Dict[str, Any]:
+        # The history this question is asked with, read before the question joins it
+        state = self._state()
+        state.history = self._history(admin_id)
+        return self.parse_query_intent(query, state.history)
+    
+    def _history(self, admin_id: str) -> List[Dict]:
+        """Recent turns of an admin's conversation in this session, oldest first"""
+        turns = self.conversation_store.recent(admin_id, self.session_id, self.max_context_length)
+        return [turn.to_context() for turn in turns]
+    
+    @property
+    def conversation_context(self) -> List[Dict]:
+        """Recent turns of the conversation of the admin last queried in this context, oldest first"""
+        admin_id = self._state().admin_id
+        return self._history(admin_id) if admin_id is not None else []
+    
+    def _cached_response(self, cache_key: str) -> Optional[str]:
+        with tracer.span("engine.response_cache"):
+            cached = self.response_cache.get(cache_key)
+            tracer.annotate(cache_hit=cached is not None)
+        return cached
+    
+    def _response_cache_key(self, data_manager, admin_id: str, query: str, parsed: Dict) -> str:
+        """Cache key for a query, or None when the answer depends on conversation history"""
+        if self.response_cache is None:
+            return None
+        if self._is_follow_up(query, parsed):
+            return None
+        scope = data_manager.get_admin_scope(admin_id)
+        if not scope:
+            return None
+        return self.response_cache.make_key(query, scope, data_manager.data_fingerprint)
+    
+    @staticmethod
+    def _is_follow_up(query: str, parsed: Dict) -> bool:
+        """Whether the answer depends on earlier turns of the conversation"""
+        return parsed["context_aware"] and any(
+            marker in FOLLOW_UP_MARKERS for marker in _find_keywords(query.lower()))
+    
+    def _semantic_lookup(self, data_manager, admin_id: str, query: str, parsed: Dict) -> str:
+        """Cached answer to a near-duplicate LLM question, or None if the LLM must run"""
+        if self.semantic_cache is not None and not self._is_follow_up(query, parsed):
+            with tracer.span("engine.semantic_cache"):
+                hit = self.semantic_cache.lookup(query, data_manager.get_admin_scope(admin_id),
+                                                 data_manager.data_fingerprint)
+                tracer.annotate(cache_hit=hit is not None)
+            self.last_timings["semantic_cache_hit"] = hit is not None
+            if hit is not None:
+                self.last_timings["semantic_similarity"] = hit[1]
+                self._record_route("semantic_cache")
+                return hit[0]
+        self._record_route("llm")
+        return None
+    
+    def _semantic_store(self, data_manager, admin_id: str, query: str, parsed: Dict, response: str):
+        if self.semantic_cache is None or self._is_follow_up(query, parsed):
+            return
+        if response.startswith(UNCACHEABLE_PREFIXES):
+            return
+        self.semantic_cache.put(query, data_manager.get_admin_scope(admin_id),
+                                data_manager.data_fingerprint, response)
+    
+    def _remember_query(self, admin_id: str, query: str, parsed: Dict):
+        """Add a query to the admin's conversation; only the last few turns are kept in memory"""
+        self._state().turn = self.conversation_store.append(admin_id, self.session_id, query, parsed["intent"])
+    
+    def _run_query(self, data_manager, admin_id: str, query: str, parsed: Dict) -> str:
+        """Answer a parsed query from the data or the pandas agent"""
         try:
             # Add current query to context
-            self.conversation_context.append({
-                "query": query,
-                "intent": parsed["intent"],
-                "timestamp": pd.Timestamp.now().isoformat()
-            })
+            self._remember_query(admin_id, query, parsed)
             
-            # Keep only last 5 interactions for context
-            if len(self.conversation_context) > 5:
-                self.conversation_context = self.conversation_context[-5:]
+            response = self._answer_from_data(data_manager, admin_id, parsed)
+            if response is not None:
+                return response
             
-            # Execute based on intent
-            if parsed["intent"] == "homework":
-                df = data_manager.get_students_without_homework(admin_id)
-                return self.generate_contextual_response(df, parsed, admin_id)
+            # Enhanced pandas agent with context
+            filtered_df = data_manager.filter_data_by_scope(admin_id)
+            if filtered_df.empty:
+                return "No data available in your access scope."
             
-            elif parsed["intent"] == "performance":
-                df = data_manager.get_performance_data(admin_id, parsed["grade"], parsed["week"])
-                return self.generate_contextual_response(df, parsed, admin_id)
+            cached = self._semantic_lookup(data_manager, admin_id, query, parsed)
+            if cached is not None:
+                return cached
             
-            elif parsed["intent"] == "support" or (parsed.get("score_threshold") and parsed.get("score_operator")):
-                df = data_manager.filter_data_by_scope(admin_id)
-                return self.generate_contextual_response(df, parsed, admin_id)
+            # Create context-aware prompt
+            context_prompt = self._build_context_prompt(query, data_manager, admin_id, filtered_df)
             
-            elif parsed["intent"] == "quiz":
-                df = data_manager.get_upcoming_quizzes(admin_id)
-                return self.generate_contextual_response(df, parsed, admin_id)
+            agent = self._get_agent(data_manager, admin_id, filtered_df)
             
-            elif parsed["intent"] == "analytics":
-                df = data_manager.filter_data_by_scope(admin_id)
-                return self.generate_contextual_response(df, parsed, admin_id)
+            start = time.perf_counter()
+            with tracer.span("engine.agent_run"):
+                tokens = _TokenCounter()
+                result = agent.run(context_prompt, callbacks=[tokens])
+                self._record_tokens(tokens)
+            self._record_timing("agent_run", time.perf_counter() - start)
+            response = f"AI Analysis:\n\n{result}"
+            self._semantic_store(data_manager, admin_id, query, parsed, response)
+            return response
+                
+        except Exception as e:
+            return self._handle_query_error(e, query, data_manager, admin_id)
+    
+    def _answer_from_data(self, data_manager, admin_id: str, parsed: Dict) -> str:
+        """Answer deterministic intents directly; None means the query needs the LLM"""
+        start = time.perf_counter()
+        with tracer.span("engine.planner"):
+            plan = self.planner.plan(parsed["original_query"])
+            tracer.annotate(planned=plan is not None)
+            if plan is not None:
+                result = self.planner.execute(plan, data_manager, admin_id)
+        if plan is not None:
+            self._record_timing("planner", time.perf_counter() - start)
+            self._record_route("planner")
+            if result.text is not None:
+                return result.text
+            return self._format_as_table(result.data, result.title, result.summary)
+        
+        response = self._answer_from_intent(data_manager, admin_id, parsed)
+        if response is not None:
+            self._record_route("intent")
+        return response
+    
+    def _answer_from_intent(self, data_manager, admin_id: str, parsed: Dict) -> str:
+        # Execute based on intent
+        if parsed["intent"] == "homework":
+            df = data_manager.get_students_without_homework(admin_id)
+            return self.generate_contextual_response(df, parsed, admin_id)
+        
+        elif parsed["intent"] == "performance":
+            df = data_manager.get_performance_data(admin_id, parsed["grade"], parsed["week"])
+            return self.generate_contextual_response(df, parsed, admin_id)
+        
+        elif parsed["intent"] == "support" or (parsed.get("score_threshold") and parsed.get("score_operator")):
+            df = data_manager.filter_data_by_scope(admin_id)
+            return self.generate_contextual_response(df, parsed, admin_id)
+        
+        elif parsed["intent"] == "quiz":
+            df = data_manager.get_upcoming_quizzes(admin_id)
+            return self.generate_contextual_response(df, parsed, admin_id)
+        
+        elif parsed["intent"] == "analytics":
+            df = data_manager.filter_data_by_scope(admin_id)
+            return self.generate_contextual_response(df, parsed, admin_id)
+        
+        return None
+    
+    def _handle_query_error(self, error: Exception, query: str, data_manager, admin_id: str) -> str:
+        """Turn a failed query into a user-facing message, trying the offline fallback on quota errors"""
+        error_msg = str(error)
+        if "quota" in error_msg.lower() or "429" in error_msg:
+            # Try fallback for quota exceeded
+            fallback_response = self._try_fallback_query(query, data_manager, admin_id)
+            if fallback_response:
+                return fallback_response
+            return "API quota exceeded. Please check your OpenAI billing or try basic queries like 'best student' or 'homework status'."
+        return f"Error processing query: {error_msg}\n\nTry rephrasing your question or use one of the example queries."
+    
+    @tracer.traced("engine.aexecute_query")
+    async def aexecute_query(self, data_manager, admin_id: str, query: str, timeout: float = None) -> str:
+        """Async variant of execute_query for serving many admins on one event loop.
+        
+        Data work runs in worker threads, the LLM call uses the agent's async interface
+        behind the shared concurrency limiter, and the whole query is bounded by
+        timeout (seconds). Cancelling the awaiting task cancels the query.
+        """
+        self._begin_request(admin_id)
+        start = time.perf_counter()
+        parsed = self._parse_with_context(admin_id, query)
+        
+        cache_key = self._response_cache_key(data_manager, admin_id, query, parsed)
+        if cache_key is not None:
+            cached = self._cached_response(cache_key)
+            self.last_timings["response_cache_hit"] = cached is not None
+            if cached is not None:
+                self._remember_query(admin_id, query, parsed)
+                self._record_timing("query_total", time.perf_counter() - start)
+                return cached
+        
+        try:
+            response = await asyncio.wait_for(self._arun_query(data_manager, admin_id, query, parsed), timeout)
+        except asyncio.TimeoutError:
+            self._record_timing("query_total", time.perf_counter() - start)
+            return f"Query timed out after {timeout:g} seconds. Please try again or ask a more specific question."
+        
+        self._record_timing("query_total", time.perf_counter() - start)
+        if cache_key is not None and not response.startswith(UNCACHEABLE_PREFIXES):
+            self.response_cache.put(cache_key, response)
+        return response
+    
+    async def _arun_query(self, data_manager, admin_id: str, query: str, parsed: Dict) -> str:
+        try:
+            self._remember_query(admin_id, query, parsed)
             
-            elif parsed["intent"] == "support":
-                df = data_manager.filter_data_by_scope(admin_id)
-                return self.generate_contextual_response(df, parsed, admin_id)
+            response = await asyncio.to_thread(self._answer_from_data, data_manager, admin_id, parsed)
+            if response is not None:
+                return response
+        except Exception as e:
+            return await asyncio.to_thread(self._handle_query_error, e, query, data_manager, admin_id)
+        
+        return await self._aask_agent(data_manager, admin_id, query, parsed, self._state().history)
+    
+    async def _aask_agent(self, data_manager, admin_id: str, query: str, parsed: Dict,
+                          history: List[Dict]) -> str:
+        """Answer a query with the pandas agent (or a semantic cache hit) behind the shared limiter"""
+        try:
+            filtered_df = await asyncio.to_thread(data_manager.filter_data_by_scope, admin_id)
+            if filtered_df.empty:
+                return "No data available in your access scope."
+            
+            cached = self._semantic_lookup(data_manager, admin_id, query, parsed)
+            if cached is not None:
+                return cached
+            
+            context_prompt = await asyncio.to_thread(self._build_context_prompt, query, data_manager,
+                                                     admin_id, filtered_df, history)
+            agent = await asyncio.to_thread(self._get_agent, data_manager, admin_id, filtered_df)
             
+            async with self.limiter:
+                start = time.perf_counter()
+                with tracer.span("engine.agent_run"):
+                    tokens = _TokenCounter()
+                    result = await self._arun_agent(agent, context_prompt, [tokens])
+                    self._record_tokens(tokens)
+                self._record_timing("agent_run", time.perf_counter() - start)
+            response = f"AI Analysis:\n\n{result}"
+            self._semantic_store(data_manager, admin_id, query, parsed, response)
+            return response
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return await asyncio.to_thread(self._handle_query_error, e, query, data_manager, admin_id)
+    
+    def execute_batch(self, data_manager, admin_ids: List[str], queries: List[str]) -> Dict[str, Dict[str, str]]:
+        """Answer every query for every admin, e.g. for scheduled digests: {admin_id: {query: response}}.
+        
+        Blocking wrapper around aexecute_batch; call that one from async code.
+        """
+        async def run_batch():
+            answers = await self.aexecute_batch(data_manager, admin_ids, queries)
+            return answers, self._state()
+
+        # asyncio.run works on a copy of this context: carry the batch's request state back for last_timings
+        answers, state = asyncio.run(run_batch())
+        self._request.set(state)
+        return answers
+    
+    @tracer.traced("engine.execute_batch")
+    async def aexecute_batch(self, data_manager, admin_ids: List[str], queries: List[str]) -> Dict[str, Dict[str, str]]:
+        """Async variant of execute_batch.
+        
+        Each query is parsed and planned once, and queries that compile to the same
+        plan are answered once per admin. Deterministic plans run on one ScopeBatch
+        of all admins' scopes: every plan filters the stacked rows once and splits
+        them by admin. Queries that need the LLM run concurrently behind the shared
+        limiter. Batch queries are standalone, so they neither see nor join any
+        conversation; admins without a scope get the no-data answer.
+        """
+        state = self._begin_request(None)
+        start = time.perf_counter()
+        admin_ids = list(dict.fromkeys(admin_ids))
+        queries = list(dict.fromkeys(queries))
+        parsed = {query: self.parse_query_intent(query) for query in queries}
+        answers: Dict[str, Dict[str, str]] = {admin_id: {} for admin_id in admin_ids}
+        
+        cache_keys = {}
+        for admin_id in admin_ids:
+            for query in queries:
+                cache_key = self._response_cache_key(data_manager, admin_id, query, parsed[query])
+                cached = self._cached_response(cache_key) if cache_key is not None else None
+                if cached is not None:
+                    answers[admin_id][query] = cached
+                else:
+                    cache_keys[(admin_id, query)] = cache_key
+        
+        # Group queries by the plan they compile to; the intent route depends only on these fields
+        groups: Dict[Tuple, List[str]] = {}
+        plans: Dict[Tuple, Any] = {}
+        for query in queries:
+            plan = self.planner.plan(query)
+            if plan is not None:
+                key = ("planner", repr(plan))
+                plans[key] = plan
             else:
-                # Enhanced pandas agent with context
+                key = ("intent",) + tuple(parsed[query][field] for field in
+                                          ("intent", "grade", "week", "score_threshold", "score_operator"))
+            groups.setdefault(key, []).append(query)
+        
+        batch = await asyncio.to_thread(data_manager.batch_scope, admin_ids)
+        computed, llm_queries = await asyncio.to_thread(
+            self._answer_batch_from_data, data_manager, batch, groups, plans, parsed, cache_keys)
+        
+        requests = [(admin_id, query) for query in llm_queries for admin_id in batch.admin_ids
+                    if (admin_id, query) in cache_keys]
+        responses = await asyncio.gather(*(self._aask_agent(data_manager, admin_id, query, parsed[query], [])
+                                           for admin_id, query in requests))
+        computed.update(zip(requests, responses))
+        
+        for admin_id, query in cache_keys:
+            response = computed.get((admin_id, query), "No data available in your access scope.")
+            answers[admin_id][query] = response
+            cache_key = cache_keys[(admin_id, query)]
+            if cache_key is not None and not response.startswith(UNCACHEABLE_PREFIXES):
+                self.response_cache.put(cache_key, response)
+        
+        state.table = None
+        self.last_timings["batch"] = {"admins": len(admin_ids), "queries": len(queries),
+                                      "plan_groups": len(groups), "llm_calls": len(requests)}
+        tracer.annotate(batch_admins=len(admin_ids), batch_queries=len(queries),
+                        plan_groups=len(groups), llm_calls=len(requests))
+        self._record_timing("query_total", time.perf_counter() - start)
+        return answers
+    
+    def _answer_batch_from_data(self, data_manager, batch, groups: Dict[Tuple, List[str]], plans: Dict[Tuple, Any],
+                                parsed: Dict[str, Dict], pending: Dict[Tuple[str, str], Any]
+                                ) -> Tuple[Dict[Tuple[str, str], str], List[str]]:
+        """Answers of the deterministic plan groups per (admin, query), and the queries left for the LLM"""
+        answers: Dict[Tuple[str, str], str] = {}
+        llm_queries: List[str] = []
+        for key, group in groups.items():
+            admin_ids = [admin_id for admin_id in batch.admin_ids
+                         if any((admin_id, query) in pending for query in group)]
+            if not admin_ids:
+                continue
+            route, responses = key[0], {}
+            with tracer.span("engine.batch_group"):
+                tracer.annotate(route=route, queries=len(group), admins=len(admin_ids))
+                try:
+                    if route == "planner":
+                        results = self.planner.execute_batch(plans[key], batch)
+                        for admin_id in admin_ids:
+                            result = results[admin_id]
+                            responses[admin_id] = result.text if result.text is not None else \
+                                self._format_as_table(result.data, result.title, result.summary)
+                    else:
+                        for admin_id in admin_ids:
+                            response = self._answer_from_intent(batch, admin_id, parsed[group[0]])
+                            if response is None:
+                                break
+                            responses[admin_id] = response
+                except Exception as e:
+                    responses = {admin_id: self._handle_query_error(e, group[0], data_manager, admin_id)
+                                 for admin_id in admin_ids}
+            
+            if len(responses) < len(admin_ids):
+                # Not answerable from the data: every query in the group goes to the LLM separately
+                llm_queries.extend(group)
+                continue
+            for query in group:
+                for admin_id, response in responses.items():
+                    if (admin_id, query) in pending:
+                        answers[(admin_id, query)] = response
+                        self.route_counts[route] += 1
+        return answers, llm_queries
+    
+    @tracer.traced("engine.stream_query")
+    def stream_query(self, data_manager, admin_id: str, query: str) -> Iterator[Dict[str, str]]:
+        """Streaming variant of execute_query.
+        
+        Yields events as they happen: {"type": "token"} for LLM tokens, {"type": "step"}
+        for agent tool calls, and a single closing {"type": "final"} carrying the same
+        text execute_query would return. Cached and deterministic answers yield only
+        the final event.
+        """
+        self._begin_request(admin_id)
+        start = time.perf_counter()
+        parsed = self._parse_with_context(admin_id, query)
+        
+        cache_key = self._response_cache_key(data_manager, admin_id, query, parsed)
+        if cache_key is not None:
+            cached = self._cached_response(cache_key)
+            self.last_timings["response_cache_hit"] = cached is not None
+            if cached is not None:
+                self._remember_query(admin_id, query, parsed)
+                self._record_timing("query_total", time.perf_counter() - start)
+                yield {"type": "final", "text": cached}
+                return
+        
+        response = None
+        try:
+            self._remember_query(admin_id, query, parsed)
+            response = self._answer_from_data(data_manager, admin_id, parsed)
+            if response is None:
                 filtered_df = data_manager.filter_data_by_scope(admin_id)
                 if filtered_df.empty:
-                    return "No data available in your access scope."
-                
-                # Create context-aware prompt
-                context_prompt = self._build_context_prompt(query, parsed)
-                
-                agent = create_pandas_dataframe_agent(
-                    self.llm,
-                    filtered_df,
-                    verbose=False,
-                    allow_dangerous_code=True
-                )
-                
-                result = agent.run(context_prompt)
-                return f"AI Analysis:\n\n{result}"
-                
+                    response = "No data available in your access scope."
+                else:
+                    response = self._semantic_lookup(data_manager, admin_id, query, parsed)
         except Exception as e:
-            error_msg = str(e)
-            if "quota" in error_msg.lower() or "429" in error_msg:
-                # Try fallback for quota exceeded
-                fallback_response = self._try_fallback_query(query, data_manager, admin_id)
-                if fallback_response:
-                    return fallback_response
-                return "API quota exceeded. Please check your OpenAI billing or try basic queries like 'best student' or 'homework status'."
-            return f"Error processing query: {error_msg}\n\nTry rephrasing your question or use one of the example queries."
-    
-    def _build_context_prompt(self, query: str, parsed: Dict) -> str:
-        """Build context-aware prompt for the pandas agent"""
-        context_info = ""
-        if self.conversation_context:
-            recent_queries = [ctx["query"] for ctx in self.conversation_context[-3:]]
-            context_info = f"Previous queries in this conversation: {', '.join(recent_queries)}. "
-        
-        enhanced_prompt = f"""
-        {context_info}Current query: {query}
-        
-        Please analyze the student data and provide insights. Focus on:
-        - Clear, actionable information
-        - Relevant statistics and summaries
-        - Educational context and recommendations
-        
-        Format your response professionally with appropriate emojis and structure.
-        """
+            response = self._handle_query_error(e, query, data_manager, admin_id)
+        
+        if response is None:
+            for event in self._stream_agent(data_manager, admin_id, query, filtered_df, start):
+                if event["type"] == "final":
+                    response = event["text"]
+                else:
+                    yield event
+            self._semantic_store(data_manager, admin_id, query, parsed, response)
+        
+        self._record_timing("query_total", time.perf_counter() - start)
+        if cache_key is not None and not response.startswith(UNCACHEABLE_PREFIXES):
+            self.response_cache.put(cache_key, response)
+        yield {"type": "final", "text": response}
+    
+    def _stream_agent(self, data_manager, admin_id: str, query: str,
+                      filtered_df: pd.DataFrame, start: float) -> Iterator[Dict[str, str]]:
+        """Run the pandas agent on a worker thread and relay its callback events"""
+        events: queue.Queue = queue.Queue()
+        context_prompt = self._build_context_prompt(query, data_manager, admin_id, filtered_df)
+        
+        def worker():
+            try:
+                agent = self._get_agent(data_manager, admin_id, filtered_df)
+                with tracer.span("engine.agent_run"):
+                    handler = _StreamingHandler(events)
+                    result = agent.invoke({"input": context_prompt}, config={"callbacks": [handler]})
+                    self._record_tokens(handler)
+                output = result.get("output", result) if isinstance(result, dict) else result
+                events.put({"type": "result", "text": str(output)})
+            except Exception as e:
+                events.put({"type": "error", "error": e})
         
-        return enhanced_prompt
+        agent_start = time.perf_counter()
+        # The worker runs in a copy of this context so its spans join the request's trace
+        threading.Thread(target=contextvars.copy_context().run, args=(worker,), daemon=True).start()
+        while True:
+            event = events.get()
+            if event["type"] in ("token", "step"):
+                if "first_output" not in self.last_timings:
+                    self._record_timing("first_output", time.perf_counter() - start)
+                yield event
+            elif event["type"] == "result":
+                self._record_timing("agent_run", time.perf_counter() - agent_start)
+                yield {"type": "final", "text": f"AI Analysis:\n\n{event['text']}"}
+                return
+            else:
+                yield {"type": "final", "text": self._handle_query_error(event["error"], query, data_manager, admin_id)}
+                return
+    
+    @staticmethod
+    async def _arun_agent(agent, prompt: str, callbacks: List[BaseCallbackHandler] = None) -> str:
+        """Run an agent through its async interface, falling back to a worker thread"""
+        if hasattr(agent, "ainvoke"):
+            result = await agent.ainvoke({"input": prompt}, config={"callbacks": callbacks})
+            return result.get("output", result) if isinstance(result, dict) else result
+        return await asyncio.to_thread(agent.run, prompt, callbacks=callbacks)
+    
+    @tracer.traced("engine.agent_build")
+    def _get_agent(self, data_manager, admin_id: str, filtered_df: pd.DataFrame):
+        """Reuse the pandas agent built for this admin and data version"""
+        key = (id(self.llm), admin_id, data_manager.data_fingerprint)
+        start = time.perf_counter()
+        agent, hit = self.agent_cache.get_or_create(key, lambda: create_pandas_dataframe_agent(
+            self.llm,
+            filtered_df,
+            verbose=False,
+            # The question prompt carries a compact schema and aggregates; no raw head rows
+            include_df_in_prompt=False,
+            allow_dangerous_code=True
+        ))
+        self._record_timing("agent_build", time.perf_counter() - start)
+        self.last_timings["agent_cache_hit"] = hit
+        tracer.annotate(cache_hit=hit)
+        return agent
+    
+    def _record_timing(self, name: str, seconds: float):
+        self.last_timings[name] = seconds
+        self.timing_totals[name] = self.timing_totals.get(name, 0.0) + seconds
+    
+    def _record_tokens(self, counter: _TokenCounter):
+        """Report an agent run's token use on the current span and in last_timings"""
+        self.last_timings["llm_tokens"] = counter.tokens
+        self.token_totals["llm_tokens"] += counter.tokens
+        tracer.annotate(llm_tokens=counter.tokens, llm_prompt_tokens=counter.prompt)
+    
+    def _record_route(self, route: str):
+        self.last_timings["route"] = route
+        tracer.annotate(route=route)
+        self.route_counts[route] += 1
+    
+    def get_timing_stats(self) -> Dict[str, Any]:
+        """Timing of the last query, running totals, routing and agent cache counters"""
+        answered = sum(self.route_counts.values())
+        return {
+            "last": dict(self.last_timings),
+            "totals": dict(self.timing_totals),
+            "tokens": dict(self.token_totals),
+            "routes": dict(self.route_counts),
+            "llm_avoided_rate": 1 - self.route_counts["llm"] / answered if answered else 0.0,
+            "planner": self.planner.stats(),
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "agent_cache": self.agent_cache.stats()
+        }
+    
+    def _build_context_prompt(self, query: str, data_manager, admin_id: str, filtered_df: pd.DataFrame,
+                              history: List[Dict] = None) -> str:
+        """Build the agent prompt within the token budget: question, compact schema and
+        precomputed aggregates of the admin's scope, then a summary of earlier questions
+        (default: the ones this request was asked with)"""
+        if history is None:
+            history = self._state().history
+        with tracer.span("engine.build_prompt"):
+            data_context = self.prompt_builder.data_context(
+                (admin_id, data_manager.data_fingerprint), filtered_df,
+                lambda: data_manager.get_class_analytics(admin_id))
+            prompt, tokens = self.prompt_builder.build(query, history, data_context)
+            self.last_timings["prompt_tokens"] = tokens
+            self.token_totals["prompt_tokens"] += tokens
+            tracer.annotate(prompt_tokens=tokens)
+        return prompt
     
-    def reset_context(self):
-        """Reset conversation context"""
-        self.conversation_context = []
+    def reset_context(self, admin_id: str = None):
+        """Reset conversation context of an admin (default: the active one) in this session"""
+        state = self._state()
+        admin_id = admin_id or state.admin_id
+        if admin_id is not None:
+            self.conversation_store.clear(admin_id, self.session_id)
+        state.turn = None
     
     def _try_fallback_query(self, query: str, data_manager, admin_id: str) -> str:
         """Handle basic queries without OpenAI API"""
@@ -364,8 +1018,11 @@ class AIQueryEngine:
     
     def get_conversation_summary(self) -> Dict:
         """Get summary of current conversation"""
+        admin_id = self._state().admin_id
+        context = self.conversation_context
+        total = self.conversation_store.count(admin_id, self.session_id) if admin_id is not None else 0
         return {
-            "total_queries": len(self.conversation_context),
-            "recent_intents": [ctx["intent"] for ctx in self.conversation_context[-5:]],
-            "conversation_length": len(self.conversation_context)
+            "total_queries": total,
+            "recent_intents": [ctx["intent"] for ctx in context[-5:]],
+            "conversation_length": len(context)
         }
\ No newline at end of file
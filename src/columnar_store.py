@@ -0,0 +1,166 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Iterable, Iterator, List, Optional, Tuple
+from student_schema import apply_student_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to plain JSON loading
+    pa = None
+    feather = None
+    pq = None
+
+
+def columnar_available() -> bool:
+    """Whether the Arrow/Feather backend can be used"""
+    return feather is not None
+
+
+def columnar_path_for(json_path: str) -> str:
+    """Location of the Feather copy kept next to a JSON data file"""
+    return os.path.splitext(json_path)[0] + '.feather'
+
+
+# Schema metadata key holding the signature of the JSON file a Feather copy was built from
+SOURCE_SIGNATURE_KEY = b'source_signature'
+
+
+def source_signature(path: str) -> Tuple[int, int]:
+    """mtime_ns/size pair identifying a version of a data file"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _stored_signature(columnar_path: str) -> Optional[bytes]:
+    """Source signature recorded in a Feather file, or None if missing or unreadable"""
+    try:
+        with pa.memory_map(columnar_path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return metadata.get(SOURCE_SIGNATURE_KEY)
+
+
+def ensure_columnar_copy(json_path: str, columnar_path: str = None,
+                         signature: Tuple[int, int] = None) -> str:
+    """Convert a JSON record array to Feather once, re-converting only when the JSON changes.
+
+    The copy is keyed on the JSON file's (mtime_ns, size) signature, stored in the
+    Feather schema metadata; pass the signature the caller already took so the copy
+    matches the version it is loading.
+    """
+    if not columnar_available():
+        raise RuntimeError("pyarrow is required for columnar storage")
+
+    columnar_path = columnar_path or columnar_path_for(json_path)
+    signature_bytes = ('%d:%d' % (signature or source_signature(json_path))).encode()
+    if _stored_signature(columnar_path) == signature_bytes:
+        return columnar_path
+
+    # Typed schema is baked into the file (dictionary-encoded categoricals, int8 scores, dates)
+    table = pa.Table.from_pandas(apply_student_schema(pd.read_json(json_path)))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           SOURCE_SIGNATURE_KEY: signature_bytes})
+    # Write to a unique temp file and rename so readers never see a half-written file,
+    # and concurrent converters never write into the same one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(columnar_path)),
+                                    prefix=os.path.basename(columnar_path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, columnar_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return columnar_path
+
+
+class ColumnarTable:
+    """Memory-mapped Feather file that materializes pandas columns on demand"""
+
+    def __init__(self, columnar_path: str):
+        self.path = columnar_path
+        # Uncompressed Feather + memory_map means column buffers stay on disk until touched
+        self.table = feather.read_table(columnar_path, memory_map=True)
+        self.columns = list(self.table.column_names)
+        self._series_cache = {}
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def column(self, name: str) -> pd.Series:
+        """Get a single column as a pandas Series (cached after first access)"""
+        series = self._series_cache.get(name)
+        if series is None:
+            series = self.table.column(name).to_pandas()
+            series.name = name
+            self._series_cache[name] = series
+        return series
+
+    def to_pandas(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Build a DataFrame holding only the requested columns"""
+        columns = self.columns if columns is None else [c for c in columns if c in self.columns]
+        return pd.DataFrame({name: self.column(name) for name in columns}, columns=columns)
+
+    def take(self, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Materialize only the given rows, without caching whole columns"""
+        columns = self.columns if columns is None else [c for c in columns if c in self.columns]
+        rows = self.table.select(columns).take(pa.array(positions, type=pa.int64())).to_pandas()
+        rows.index = pd.Index(positions)
+        return rows
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def parquet_chunks(frames: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode DataFrames as one Parquet file, one row group per frame, yielding bytes as they are written"""
+    if pq is None:
+        raise RuntimeError("pyarrow is required for Parquet export")
+
+    sink = _ChunkSink()
+    writer = None
+    for frame in frames:
+        if writer is None:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            writer = pq.ParquetWriter(sink, table.schema)
+        else:
+            # Later chunks follow the first chunk's schema (e.g. categorical dictionaries)
+            table = pa.Table.from_pandas(frame, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
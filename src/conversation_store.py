@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+# Responses are kept as display previews; the full text is never needed for context
+MAX_RESPONSE_CHARS = 4000
+
+
+class Turn:
+    """One question in a conversation, with its parsed intent and (once answered) a response preview"""
+    __slots__ = ('turn_id', 'query', 'intent', 'timestamp', 'response', 'table')
+
+    def __init__(self, turn_id: Optional[int], query: str, intent: str, timestamp: float,
+                 response: Optional[str] = None, table: Optional[Dict[str, Any]] = None):
+        self.turn_id = turn_id
+        self.query = query
+        self.intent = intent
+        self.timestamp = timestamp
+        self.response = response
+        self.table = table
+
+    def to_context(self) -> Dict[str, Any]:
+        """The record the query engine keeps as conversation context"""
+        return {
+            "query": self.query,
+            "intent": self.intent,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.to_context(), "response": self.response, "table": self.table}
+
+
+class ConversationStore:
+    """Recent turns per (admin, session) in fixed-size ring buffers, optionally persisted to SQLite.
+
+    Only the last max_turns turns of a session live in memory, and at most
+    max_sessions sessions are held at once (least recently used are dropped).
+    With a db_path every turn is also written to disk, so a session's context
+    survives restarts and older turns can be paged in with history().
+    """
+
+    def __init__(self, max_turns: int = 50, max_sessions: int = 1024, db_path: str = None,
+                 max_persisted_turns: int = 1000):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.max_persisted_turns = max_persisted_turns
+        self.db_path = db_path
+        self._sessions: "OrderedDict[Tuple[str, str], deque]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._connection = None
+
+        if db_path:
+            self._connection = sqlite3.connect(db_path, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS conversation_turns (id INTEGER PRIMARY KEY, admin_id TEXT, "
+                    "session_id TEXT, query TEXT, intent TEXT, created REAL, response TEXT, table_json TEXT)")
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS conversation_turns_session "
+                    "ON conversation_turns (admin_id, session_id, id)")
+
+    def append(self, admin_id: str, session_id: Hashable, query: str, intent: str) -> Turn:
+        """Record a new question and return its turn"""
+        turn = Turn(None, query, intent, time.time())
+        with self._lock:
+            turns = self._session(admin_id, session_id)
+            if self._connection is not None:
+                with self._connection:
+                    turn.turn_id = self._connection.execute(
+                        "INSERT INTO conversation_turns (admin_id, session_id, query, intent, created) "
+                        "VALUES (?, ?, ?, ?, ?)", (admin_id, str(session_id), query, intent, turn.timestamp)
+                    ).lastrowid
+                    # Trimming old turns on disk is amortized over many inserts
+                    if turn.turn_id % 100 == 0:
+                        self._prune(admin_id, session_id)
+            else:
+                turn.turn_id = self._next_id
+                self._next_id += 1
+            turns.append(turn)
+        return turn
+
+    def set_response(self, turn: Turn, response: str, table: Dict[str, Any] = None):
+        """Attach the answer to a turn (stored as a preview of at most MAX_RESPONSE_CHARS)"""
+        turn.response = response[:MAX_RESPONSE_CHARS] if response is not None else None
+        turn.table = table
+        if self._connection is not None:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "UPDATE conversation_turns SET response = ?, table_json = ? WHERE id = ?",
+                    (turn.response, json.dumps(table, default=str) if table is not None else None, turn.turn_id))
+
+    def recent(self, admin_id: str, session_id: Hashable, limit: int = None) -> List[Turn]:
+        """Latest turns, oldest first; at most max_turns"""
+        with self._lock:
+            turns = self._session(admin_id, session_id)
+            if limit is None or limit >= len(turns):
+                return list(turns)
+            return list(turns)[len(turns) - limit:]
+
+    def history(self, admin_id: str, session_id: Hashable, before_id: int = None,
+                limit: int = 20) -> List[Turn]:
+        """Turns older than before_id (or the newest ones), newest first; reads from disk when persisted"""
+        with self._lock:
+            if self._connection is None:
+                turns = [turn for turn in reversed(self._session(admin_id, session_id))
+                         if before_id is None or turn.turn_id < before_id]
+                return turns[:limit]
+            sql = ("SELECT id, query, intent, created, response, table_json FROM conversation_turns "
+                   "WHERE admin_id = ? AND session_id = ?")
+            params: List[Any] = [admin_id, str(session_id)]
+            if before_id is not None:
+                sql += " AND id < ?"
+                params.append(before_id)
+            sql += " ORDER BY id DESC LIMIT ?"
+            params.append(limit)
+            return [self._row_to_turn(row) for row in self._connection.execute(sql, params)]
+
+    def iter_all(self, admin_id: str, session_id: Hashable, batch: int = 200) -> Iterator[Turn]:
+        """Every stored turn of a session, oldest first, read in batches"""
+        if self._connection is None:
+            yield from self.recent(admin_id, session_id)
+            return
+        after_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT id, query, intent, created, response, table_json FROM conversation_turns "
+                    "WHERE admin_id = ? AND session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (admin_id, str(session_id), after_id, batch)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_turn(row)
+            after_id = rows[-1][0]
+
+    def count(self, admin_id: str, session_id: Hashable) -> int:
+        """Total turns in a session, including those only on disk"""
+        with self._lock:
+            if self._connection is None:
+                return len(self._session(admin_id, session_id))
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM conversation_turns WHERE admin_id = ? AND session_id = ?",
+                (admin_id, str(session_id))).fetchone()[0]
+
+    def clear(self, admin_id: str, session_id: Hashable):
+        """Forget a session, in memory and on disk"""
+        with self._lock:
+            self._sessions.pop((admin_id, str(session_id)), None)
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM conversation_turns WHERE admin_id = ? AND session_id = ?",
+                        (admin_id, str(session_id)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessions_in_memory': len(self._sessions),
+                'turns_in_memory': sum(len(turns) for turns in self._sessions.values()),
+                'max_turns': self.max_turns,
+                'persisted': self._connection is not None
+            }
+
+    def _session(self, admin_id: str, session_id: Hashable) -> deque:
+        """Ring buffer of a session, loading its latest turns from disk on first use"""
+        key = (admin_id, str(session_id))
+        turns = self._sessions.get(key)
+        if turns is None:
+            turns = deque(maxlen=self.max_turns)
+            if self._connection is not None:
+                rows = self._connection.execute(
+                    "SELECT id, query, intent, created, response, table_json FROM conversation_turns "
+                    "WHERE admin_id = ? AND session_id = ? ORDER BY id DESC LIMIT ?",
+                    (admin_id, str(session_id), self.max_turns)).fetchall()
+                turns.extend(self._row_to_turn(row) for row in reversed(rows))
+            self._sessions[key] = turns
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(key)
+        return turns
+
+    def _prune(self, admin_id: str, session_id: Hashable):
+        """Trim a session on disk to its latest max_persisted_turns turns"""
+        self._connection.execute(
+            "DELETE FROM conversation_turns WHERE admin_id = ? AND session_id = ? AND id <= ("
+            "SELECT id FROM conversation_turns WHERE admin_id = ? AND session_id = ? "
+            "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (admin_id, str(session_id), admin_id, str(session_id), self.max_persisted_turns))
+
+    @staticmethod
+    def _row_to_turn(row: tuple) -> Turn:
+        turn_id, query, intent, created, response, table_json = row
+        return Turn(turn_id, query, intent, created, response, json.loads(table_json) if table_json else None)
@@ -0,0 +1,32 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Columns the dashboard reads; scoped frames are fetched with only these
+DASHBOARD_COLUMNS = ['class', 'quiz_score', 'homework_submitted']
+
+
+def dashboard_metrics(filtered_data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Dashboard numbers for a scoped frame in one pass over its rows; None when empty"""
+    if filtered_data.empty:
+        return None
+
+    scores = filtered_data['quiz_score'].to_numpy(dtype=float, na_value=np.nan)
+    # 0 = high (85+), 1 = medium (75-84), 2 = low (<75); missing scores fall in no band
+    bands = np.select([scores >= 85, scores >= 75, scores < 75], [0, 1, 2], default=-1)
+    band_counts = np.bincount(bands[bands >= 0], minlength=3)
+    homework = filtered_data['homework_submitted'].to_numpy(dtype=bool)
+
+    homework_summary = filtered_data.groupby('class', observed=True)['homework_submitted'].agg(['sum', 'count'])
+    homework_summary.columns = ['Submitted', 'Total']
+    homework_summary['Rate %'] = (homework_summary['Submitted'] / homework_summary['Total'] * 100).round(1)
+
+    total_students = len(filtered_data)
+    return {
+        'total_students': total_students,
+        'homework_rate': homework.sum() / total_students * 100,
+        'avg_score': float(np.nanmean(scores)) if not np.isnan(scores).all() else float('nan'),
+        'performance_bands': band_counts.tolist(),
+        'homework_summary': homework_summary
+    }
@@ -1,47 +1,716 @@
+import bisect
+import copy
 import json
+import os
+import threading
+import uuid
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any
+from typing import BinaryIO, Callable, Dict, Iterator, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
+from admin_registry import AdminRegistry
+from columnar_store import ColumnarTable, columnar_available, ensure_columnar_copy, parquet_chunks, source_signature
+from student_schema import apply_student_schema
+from sqlite_store import SQLiteStore, quote_identifier
+from running_aggregates import RunningAggregates, sorted_counts
+from tracing import tracer
+
+# Scope keys in admin_roles.json mapped to the student columns they restrict
+SCOPE_COLUMNS = {
+    'grades': 'grade',
+    'classes': 'class',
+    'regions': 'region'
+}
+
+# Columns each query reads, so columnar storage only materializes what is needed
+PERFORMANCE_COLUMNS = ['student_name', 'grade', 'class', 'quiz_score', 'quiz_date', 'performance_week']
+QUIZ_COLUMNS = ['student_name', 'grade', 'class', 'upcoming_quiz', 'upcoming_quiz_date']
+ANALYTICS_COLUMNS = ['grade', 'class', 'quiz_score', 'homework_submitted', 'upcoming_quiz']
+SUPPORT_COLUMNS = ['student_name', 'grade', 'class', 'quiz_score', 'homework_submitted']
+# Rows per chunk when streaming exports
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+_NO_POSITIONS = np.array([], dtype=np.intp)
+
+
+class RowIds:
+    """student_id -> row position, kept current across inserts and deletes without a rebuild.
+    
+    Positions are stored as of the frame the index was built from, with appended rows
+    numbered on; deleted rows are remembered (sorted) and subtracted on lookup.
+    """
+    
+    def __init__(self, student_ids):
+        self._positions = {student_id: position for position, student_id in enumerate(student_ids)}
+        self._next = len(self._positions)
+        self._deleted: List[int] = []
+    
+    def get(self, student_id: str) -> Optional[int]:
+        stored = self._positions.get(student_id)
+        if stored is None:
+            return None
+        return stored - bisect.bisect_left(self._deleted, stored)
+    
+    def append(self, student_id: str):
+        """Record a row appended at the end of the frame"""
+        self._positions[student_id] = self._next
+        self._next += 1
+    
+    def remove(self, student_id: str):
+        bisect.insort(self._deleted, self._positions.pop(student_id))
+
+
+class DataSnapshot:
+    """Student data plus its scope indexes, swapped into DataManager as one unit"""
+    
+    def __init__(self, students_df: Optional[pd.DataFrame], version: int, registry_version: int,
+                 file_signature: Optional[Tuple[int, int]] = None, table: ColumnarTable = None,
+                 store: SQLiteStore = None):
+        self._students_df = students_df
+        self.table = table
+        # When set, queries are pushed down to SQLite instead of scanning pandas frames
+        self.store = store
+        self.version = version
+        self.file_signature = file_signature
+        self._value_positions = None
+        self._id_positions = None
+        self._running = None
+        self.scope_positions = {}
+        # Per-admin analytics memo; lives with the snapshot so a data reload invalidates it
+        self.analytics_cache = {}
+        self.registry_version = registry_version
+        # Random per-process token set on the first in-memory edit, so edited frames never share a
+        # fingerprint with the source file or with another process's edits
+        self.edit_token = None
+    
+    def mark_edited(self):
+        """Record a write: drop analytics and give the data a new version"""
+        self.analytics_cache = {}
+        self.version += 1
+        if self.store is None and self.edit_token is None:
+            self.edit_token = uuid.uuid4().hex
+    
+    @property
+    def value_positions(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Per-value row positions, built on first use"""
+        if self._value_positions is None:
+            self._value_positions = self._build_value_positions(self.frame(list(SCOPE_COLUMNS.values())))
+        return self._value_positions
+    
+    @property
+    def id_positions(self) -> RowIds:
+        """student_id -> row position, built on first use"""
+        if self._id_positions is None:
+            self._id_positions = RowIds(self.frame(['student_id'])['student_id'])
+        return self._id_positions
+    
+    @property
+    def running(self) -> RunningAggregates:
+        """Incrementally maintained analytics, built on first use"""
+        if self._running is None:
+            self._running = RunningAggregates.from_frame(self.frame(list(ANALYTICS_COLUMNS) + ['region']))
+        return self._running
+    
+    def invalidate_rows(self):
+        """Drop row-position caches after rows were added, removed or moved between scopes"""
+        self._value_positions = None
+        self._id_positions = None
+        self.scope_positions = {}
+    
+    def successor(self, students_df: pd.DataFrame, running: RunningAggregates, position: int,
+                  old_record: Optional[Dict[str, Any]], new_record: Optional[Dict[str, Any]],
+                  scopes: Dict[str, Dict[str, List[str]]]) -> 'DataSnapshot':
+        """The next snapshot after one row changed, with its row indexes patched instead of rebuilt.
+        
+        old_record is None for a row appended at position, new_record None for the row
+        deleted from position. scopes holds the scope of each admin with cached positions.
+        This snapshot is left as it was, for readers still holding it.
+        """
+        successor = DataSnapshot(students_df, self.version, self.registry_version, self.file_signature)
+        successor.edit_token = self.edit_token
+        successor._running = running
+        deleted = new_record is None
+        if self._id_positions is not None:
+            # Only writers read it, under the write lock and on the current snapshot, so it is handed on
+            successor._id_positions = self._id_positions
+            if old_record is None:
+                successor._id_positions.append(new_record['student_id'])
+            elif deleted:
+                successor._id_positions.remove(old_record['student_id'])
+        if self._value_positions is not None:
+            successor._value_positions = {
+                column: _patch_positions(index, position, _present_keys(old_record, column),
+                                         _present_keys(new_record, column), deleted, keep_empty=False)
+                for column, index in self._value_positions.items()
+            }
+        cached = {admin_id: positions for admin_id, positions in self.scope_positions.items() if scopes.get(admin_id)}
+        successor.scope_positions = _patch_positions(
+            cached, position, {admin_id for admin_id in cached if _in_scope(old_record, scopes[admin_id])},
+            {admin_id for admin_id in cached if _in_scope(new_record, scopes[admin_id])}, deleted, keep_empty=True)
+        successor.mark_edited()
+        return successor
+    
+    @property
+    def students_df(self) -> pd.DataFrame:
+        """Full student frame; materialized lazily when backed by a columnar file"""
+        if self._students_df is None:
+            self._students_df = self.table.to_pandas()
+        return self._students_df
+    
+    @property
+    def row_count(self) -> int:
+        """Number of students, without materializing a columnar file"""
+        return len(self.table) if self._students_df is None else len(self._students_df)
+    
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Student data restricted to the given columns (all columns when None)"""
+        if columns is None:
+            return self.students_df
+        if self._students_df is None:
+            return self.table.to_pandas(columns)
+        return self._students_df[[c for c in columns if c in self._students_df.columns]]
+    
+    def rows(self, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Only the given rows; a columnar file is read row-wise instead of materializing whole columns"""
+        if self._students_df is None:
+            return self.table.take(positions, columns)
+        return self.frame(columns).iloc[positions]
+    
+    @staticmethod
+    def _build_value_positions(students_df: pd.DataFrame) -> Dict[str, Dict[str, np.ndarray]]:
+        """Build row-position indexes per grade/class/region value"""
+        value_positions = {}
+        for column in SCOPE_COLUMNS.values():
+            if column in students_df.columns:
+                value_positions[column] = {
+                    value: np.asarray(positions, dtype=np.intp)
+                    for value, positions in students_df.groupby(column, sort=False, observed=True).indices.items()
+                }
+            else:
+                value_positions[column] = {}
+        return value_positions
+
+
+class ScopeBatch:
+    """The scopes of several admins, resolved once, for asking all of them the same questions.
+    
+    The batch keeps every admin's row positions back to back with a parallel
+    array of admin codes, so a row appears once per admin who can see it but no
+    row data is copied up front. Each query filters the stacked positions once
+    (reading only the columns the filter needs), materializes just the matching
+    rows, and splits them by admin; since the positions are grouped by admin
+    already, the split is a bincount plus slicing. The query methods mirror
+    DataManager's for one admin and memoize the split, so the next admin's
+    answer is a lookup. Group statistics still come from the DataManager's
+    aggregates, which need no rows at all.
+    """
+    
+    def __init__(self, rows: Callable[[np.ndarray, Optional[List[str]]], pd.DataFrame], positions: np.ndarray,
+                 codes: np.ndarray, admin_ids: List[str], data_manager: 'DataManager'):
+        self._rows = rows
+        self.positions = positions
+        self.codes = codes
+        self.admin_ids = admin_ids
+        self._data_manager = data_manager
+        self._values: Dict[Tuple[str, ...], pd.DataFrame] = {}
+        self._splits: Dict[Tuple, Dict[str, pd.DataFrame]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.positions)
+    
+    def values(self, columns: List[str]) -> pd.DataFrame:
+        """Stacked values of a few columns, one row per (admin, student), with a positional index"""
+        key = tuple(columns)
+        frame = self._values.get(key)
+        if frame is None:
+            frame = self._values[key] = self._rows(self.positions, columns).reset_index(drop=True)
+        return frame
+    
+    def split(self, mask: Optional[np.ndarray] = None, columns: List[str] = None) -> Dict[str, pd.DataFrame]:
+        """Rows selected by a mask over the stacked positions (all when None), per admin"""
+        positions, codes = (self.positions, self.codes) if mask is None else (self.positions[mask], self.codes[mask])
+        rows = self._rows(positions, columns)
+        ends = np.cumsum(np.bincount(codes, minlength=len(self.admin_ids)))
+        starts = ends - np.bincount(codes, minlength=len(self.admin_ids))
+        return {admin_id: rows.iloc[start:end] for admin_id, start, end in zip(self.admin_ids, starts, ends)}
+    
+    def _split_once(self, key: Tuple, select: Callable[[], Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+        frames = self._splits.get(key)
+        if frames is None:
+            frames = self._splits[key] = select()
+        return frames
+    
+    def filter_data_by_scope(self, admin_id: str, columns: List[str] = None) -> pd.DataFrame:
+        rows = self._split_once(('scope',), self.split)[admin_id]
+        return rows if columns is None else rows[[c for c in columns if c in rows.columns]]
+    
+    def get_students_without_homework(self, admin_id: str) -> pd.DataFrame:
+        def select():
+            return self.split((self.values(['homework_submitted'])['homework_submitted'] == False).to_numpy())
+        return self._split_once(('homework',), select)[admin_id]
+    
+    def get_performance_data(self, admin_id: str, grade: str = None, week: str = None) -> pd.DataFrame:
+        def select():
+            keys = self.values(['grade', 'performance_week'])
+            mask = np.ones(len(keys), dtype=bool)
+            if grade:
+                mask &= (keys['grade'] == grade).to_numpy()
+            if week:
+                mask &= (keys['performance_week'] == week).to_numpy()
+            return self.split(mask, ['student_name', 'grade', 'class', 'quiz_score', 'quiz_date'])
+        return self._split_once(('performance', grade, week), select)[admin_id]
+    
+    def get_upcoming_quizzes(self, admin_id: str) -> pd.DataFrame:
+        def select():
+            # The admin code is part of the key, so duplicates are only dropped within each scope
+            keys = self.values(QUIZ_COLUMNS).assign(_admin=self.codes)
+            return self.split(~keys.duplicated().to_numpy(), QUIZ_COLUMNS)
+        return self._split_once(('quizzes',), select)[admin_id]
+    
+    def get_group_statistics(self, admin_id: str, column: str = 'class') -> Dict[str, Dict[str, Any]]:
+        # Served by the running aggregates (or one SQL GROUP BY) without touching the stacked rows
+        return self._data_manager.get_group_statistics(admin_id, column)
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """mtime_ns/size pair used to detect changes to a data file"""
+    try:
+        return source_signature(path)
+    except OSError:
+        return None
+
+
+def _typed_row(students_df: pd.DataFrame, record: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """The record as a one-row frame in the frame's dtypes, and the frame with any columns that
+    could not hold its values re-typed (a shallow copy, so the original is untouched).
+    
+    Columns the record lacks get the schema's typed defaults; fields the frame lacks are dropped.
+    """
+    columns = list(students_df.columns) or list(record)
+    row = apply_student_schema(pd.DataFrame([record]).reindex(columns=columns))
+    widened = students_df.copy(deep=False)
+    for column in students_df.columns:
+        fitted = _fit_column(students_df[column], row[column].iloc[0])
+        if fitted is not None:
+            widened[column] = fitted
+        row[column] = row[column].astype(widened[column].dtype)
+    return row, widened
+
+
+def _fit_column(series: pd.Series, value: Any) -> Optional[pd.Series]:
+    """The column re-typed so it can store value, or None if it already can"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if pd.isna(value) or value in series.cat.categories:
+            return None
+        return series.cat.add_categories([value])
+    if pd.api.types.is_bool_dtype(series.dtype) or not pd.api.types.is_integer_dtype(series.dtype):
+        return None
+    numpy_dtype = np.dtype(getattr(series.dtype, 'numpy_dtype', series.dtype))
+    nullable = isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+    if pd.isna(value):
+        return None if nullable else series.astype(f"Int{numpy_dtype.itemsize * 8}")
+    limits = np.iinfo(numpy_dtype)
+    if limits.min <= value <= limits.max:
+        return None
+    wider = np.promote_types(numpy_dtype, np.min_scalar_type(int(value)))
+    return series.astype(f"Int{wider.itemsize * 8}" if nullable else wider)
+
+
+def _present_keys(record: Optional[Dict[str, Any]], column: str) -> set:
+    """The record's value in column as an index key, if it has one"""
+    if record is None or column not in record or pd.isna(record[column]):
+        return set()
+    return {record[column]}
+
+
+def _in_scope(record: Optional[Dict[str, Any]], scope: Dict[str, List[str]]) -> bool:
+    return record is not None and all(record.get(column) in scope[scope_key]
+                                      for scope_key, column in SCOPE_COLUMNS.items() if scope_key in scope)
+
+
+def _patch_positions(index: Dict[Any, np.ndarray], position: int, old_keys: set, new_keys: set,
+                     deleted: bool, keep_empty: bool) -> Dict[Any, np.ndarray]:
+    """A copy of a key -> sorted positions index after the row at position left old_keys and
+    joined new_keys. A deleted row also shifts every later position down by one.
+    
+    Only the arrays that change are rebuilt, each with one searchsorted and a copy; the
+    others are shared with the original index, which stays as it was.
+    """
+    patched = dict(index)
+    for key in (index.keys() | old_keys) if deleted else (old_keys ^ new_keys):
+        positions = index.get(key, _NO_POSITIONS)
+        at = int(np.searchsorted(positions, position))
+        if key in new_keys:
+            positions = np.insert(positions, at, position)
+        else:
+            found = at < len(positions) and positions[at] == position
+            tail = positions[at + 1 if found else at:]
+            if deleted and len(tail):
+                tail = tail - 1
+            elif not found:
+                continue
+            positions = np.concatenate([positions[:at], tail])
+        if len(positions) or keep_empty:
+            positions.setflags(write=False)
+            patched[key] = positions
+        else:
+            patched.pop(key, None)
+    return patched
+
 
 class DataManager:
-    def __init__(self, students_file: str, admins_file: str):
-        self.students_df = pd.read_json(students_file)
-        with open(admins_file, 'r') as f:
-            self.admin_roles = json.load(f)
+    def __init__(self, students_file: str, admins_file: str, admin_registry: AdminRegistry = None,
+                 storage: str = 'auto', sqlite_path: str = None):
+        self.students_file = students_file
+        # 'columnar' memory-maps a Feather copy of the JSON, 'json' parses the JSON directly,
+        # 'sqlite' imports it into a local database and pushes queries down to SQL,
+        # 'auto' picks columnar when pyarrow is installed
+        if storage == 'auto':
+            storage = 'columnar' if columnar_available() else 'json'
+        self.storage = storage
+        self.sqlite_store = None
+        if storage == 'sqlite':
+            self.sqlite_store = SQLiteStore(sqlite_path or os.path.splitext(students_file)[0] + '.db')
+        # A shared registry lets several DataManagers reuse one parsed admin file
+        self.admin_registry = admin_registry or AdminRegistry(admins_file)
+        self._reload_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reload_thread = None
+        self._snapshot = self._load_snapshot(version=1)
+    
+    @property
+    def students_df(self) -> pd.DataFrame:
+        """Student data of the current snapshot"""
+        return self._snapshot.students_df
+    
+    @property
+    def columns(self) -> List[str]:
+        """Student column names, without materializing any data"""
+        snapshot = self._snapshot
+        if snapshot.store is not None:
+            return list(snapshot.store.columns)
+        if snapshot._students_df is None:
+            return list(snapshot.table.columns)
+        return list(snapshot.students_df.columns)
+    
+    @property
+    def data_version(self) -> int:
+        """Monotonic version of the loaded student data, bumped on every reload"""
+        return self._snapshot.version
+    
+    @property
+    def data_fingerprint(self) -> str:
+        """Identifies the loaded data across processes and restarts.
+        
+        SQLite-backed data uses the store's persisted write counter; in-memory data is the
+        source file until its first edit, then a per-process edit token plus version.
+        """
+        snapshot = self._snapshot
+        if snapshot.store is not None:
+            return f"{snapshot.file_signature}:r{snapshot.store.revision}"
+        if snapshot.edit_token is None:
+            return str(snapshot.file_signature)
+        return f"{snapshot.file_signature}:{snapshot.edit_token}:{snapshot.version}"
+    
+    @tracer.traced('DataManager.load')
+    def _load_snapshot(self, version: int) -> DataSnapshot:
+        """Read the students file and build a fresh snapshot"""
+        signature = _file_signature(self.students_file)
+        if self.storage == 'sqlite':
+            # Older snapshots keep the store bound to the table they were loaded from
+            store = self.sqlite_store = self.sqlite_store.import_json(self.students_file)
+            return DataSnapshot(None, version, self.admin_registry.version, signature,
+                                table=store, store=store)
+        if self.storage == 'columnar':
+            table = ColumnarTable(ensure_columnar_copy(self.students_file, signature=signature))
+            return DataSnapshot(None, version, self.admin_registry.version, signature, table=table)
+        students_df = apply_student_schema(pd.read_json(self.students_file))
+        return DataSnapshot(students_df, version, self.admin_registry.version, signature)
+    
+    def refresh(self, background: bool = True) -> bool:
+        """Reload student data if the source file changed on disk.
+        
+        The new snapshot is built off to the side and swapped in with a single
+        assignment, so in-flight requests keep reading the snapshot they started with.
+        Returns True when a reload was started (or completed, if not in background).
+        """
+        self.admin_registry.refresh()
+        
+        signature = _file_signature(self.students_file)
+        if signature is None or signature == self._snapshot.file_signature:
+            return False
+        
+        # Only one reload at a time; concurrent callers keep serving the current snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        
+        if background:
+            self._reload_thread = threading.Thread(target=self._reload_snapshot, daemon=True)
+            self._reload_thread.start()
+        else:
+            self._reload_snapshot()
+        return True
+    
+    def _reload_snapshot(self):
+        try:
+            self._snapshot = self._load_snapshot(version=self._snapshot.version + 1)
+        finally:
+            self._reload_lock.release()
+    
+    def wait_for_reload(self, timeout: float = None):
+        """Block until a background reload (if any) has finished"""
+        if self._reload_thread is not None:
+            self._reload_thread.join(timeout)
+    
+    def invalidate_scope_index(self):
+        """Drop cached scope indexes after students or admin roles change"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            snapshot.invalidate_rows()
+            snapshot.analytics_cache = {}
+    
+    def set_students_data(self, students_df: pd.DataFrame):
+        """Replace student data and rebuild scope indexes (in-memory storage only)"""
+        snapshot = self._snapshot
+        if snapshot.store is not None:
+            # A detached frame would make later upserts and deletes skip the database
+            raise ValueError("Student data lives in SQLite; use upsert_student/delete_student or reload the source file")
+        replacement = DataSnapshot(apply_student_schema(students_df.reset_index(drop=True)), snapshot.version,
+                                   self.admin_registry.version, snapshot.file_signature)
+        replacement.mark_edited()
+        self._snapshot = replacement
+    
+    def set_admin_roles(self, admin_roles: List[Dict[str, Any]]):
+        """Replace admin roles and drop cached per-admin scopes"""
+        self.admin_registry.load_records(admin_roles)
+    
+    def upsert_student(self, record: Dict[str, Any]):
+        """Insert or update one student record, keeping analytics current incrementally.
+        
+        Updates are applied in memory (or to the SQLite table); reloading the source
+        JSON replaces them.
+        """
+        if 'student_id' not in record:
+            raise ValueError("Student record must include 'student_id'")
+        
+        with self._write_lock:
+            snapshot = self._snapshot
+            if snapshot.store is not None:
+                snapshot.store.upsert_record(record)
+                snapshot.mark_edited()
+            else:
+                self._snapshot = self._upsert_frame_row(snapshot, record)
+    
+    def delete_student(self, student_id: str) -> bool:
+        """Remove one student record. Returns False if the student is unknown."""
+        with self._write_lock:
+            snapshot = self._snapshot
+            if snapshot.store is not None:
+                deleted = snapshot.store.delete_record(student_id)
+                if deleted:
+                    snapshot.mark_edited()
+                return deleted
+            
+            position = snapshot.id_positions.get(student_id)
+            if position is None:
+                return False
+            students_df = snapshot.students_df
+            old_record = students_df.iloc[position].to_dict()
+            remaining = students_df.drop(students_df.index[position]).reset_index(drop=True)
+            running = snapshot.running.copy()
+            running.remove(old_record)
+            self._snapshot = snapshot.successor(remaining, running, position, old_record, None,
+                                                self._cached_scopes(snapshot))
+            return True
+    
+    def _upsert_frame_row(self, snapshot: DataSnapshot, record: Dict[str, Any]) -> DataSnapshot:
+        """Apply an upsert to a pandas-backed snapshot, returning the snapshot to swap in.
+        
+        The edited frame and aggregates are copies (columns and cells are shared until
+        they change), so readers of the current snapshot never see a half-applied row
+        and a failure leaves it untouched.
+        """
+        students_df = snapshot.students_df
+        row, edited = _typed_row(students_df, record)
+        position = snapshot.id_positions.get(record['student_id'])
+        running = snapshot.running.copy()
+        
+        if position is None:
+            edited = pd.concat([edited, row], ignore_index=True)
+            position, old_record = len(students_df), None
+        else:
+            old_record = students_df.iloc[position].to_dict()
+            for column in record:
+                if column in edited.columns:
+                    edited.iloc[position, edited.columns.get_loc(column)] = row[column].iloc[0]
+            running.remove(old_record)
+        new_record = edited.iloc[position].to_dict()
+        running.add(new_record)
+        return snapshot.successor(edited, running, position, old_record, new_record, self._cached_scopes(snapshot))
+    
+    def _cached_scopes(self, snapshot: DataSnapshot) -> Dict[str, Dict[str, List[str]]]:
+        """Current scope of every admin with cached positions on the snapshot"""
+        self._sync_registry(snapshot)
+        return {admin_id: self.get_admin_scope(admin_id) for admin_id in snapshot.scope_positions}
+    
+    def _sync_registry(self, snapshot: DataSnapshot):
+        """Drop per-admin caches on the snapshot if admin roles were reloaded"""
+        if snapshot.registry_version != self.admin_registry.version:
+            snapshot.scope_positions = {}
+            snapshot.analytics_cache = {}
+            snapshot.registry_version = self.admin_registry.version
+    
+    def _get_scope_positions(self, snapshot: DataSnapshot, admin_id: str, scope: Dict[str, List[str]]) -> np.ndarray:
+        """Get (cached) row positions visible to an admin within a snapshot"""
+        self._sync_registry(snapshot)
+        positions = snapshot.scope_positions.get(admin_id)
+        if positions is not None:
+            tracer.annotate(rows_in=len(positions))
+            return positions
+        
+        # Boolean masks instead of sorted intersections: linear in rows, and positions come out sorted
+        visible = np.ones(snapshot.row_count, dtype=bool)
+        for scope_key, column in SCOPE_COLUMNS.items():
+            if scope_key not in scope:
+                continue
+            index = snapshot.value_positions.get(column, {})
+            allowed = np.zeros(len(visible), dtype=bool)
+            for value in scope[scope_key]:
+                if value in index:
+                    allowed[index[value]] = True
+            visible &= allowed
+        
+        positions = np.flatnonzero(visible).astype(np.intp, copy=False)
+        positions.setflags(write=False)
+        snapshot.scope_positions[admin_id] = positions
+        tracer.annotate(rows_in=len(positions))
+        return positions
     
     def get_admin_scope(self, admin_id: str) -> Dict[str, List[str]]:
         """Get access scope for specific admin"""
-        for admin in self.admin_roles:
-            if admin['admin_id'] == admin_id:
-                return admin['access_scope']
-        return {}
+        scope = self.admin_registry.get_scope(admin_id)
+        return scope.to_dict() if scope else {}
     
-    def filter_data_by_scope(self, admin_id: str) -> pd.DataFrame:
-        """Filter student data based on admin's access scope"""
+    @tracer.traced()
+    def filter_data_by_scope(self, admin_id: str, columns: List[str] = None) -> pd.DataFrame:
+        """Filter student data based on admin's access scope, optionally to a subset of columns"""
         scope = self.get_admin_scope(admin_id)
         if not scope:
             return pd.DataFrame()
         
-        filtered_df = self.students_df.copy()
+        snapshot = self._snapshot
+        if snapshot.store is not None:
+            return self._query_scope(snapshot.store, admin_id, columns)
         
-        # Apply filters based on admin scope
-        if 'grades' in scope:
-            filtered_df = filtered_df[filtered_df['grade'].isin(scope['grades'])]
-        if 'classes' in scope:
-            filtered_df = filtered_df[filtered_df['class'].isin(scope['classes'])]
-        if 'regions' in scope:
-            filtered_df = filtered_df[filtered_df['region'].isin(scope['regions'])]
-            
-        return filtered_df
+        # Precomputed row positions replace per-call copy + isin masks
+        positions = self._get_scope_positions(snapshot, admin_id, scope)
+        return snapshot.frame(columns).iloc[positions]
+    
+    def _query_scope(self, store: SQLiteStore, admin_id: str, columns: List[str] = None,
+                     condition: str = None, params: List[Any] = None, distinct: bool = False,
+                     order_by: str = "rowid", limit: int = None, offset: int = 0) -> pd.DataFrame:
+        """Run a scoped SELECT against SQLite with an optional extra condition"""
+        columns = store.columns if columns is None else [c for c in columns if c in store.columns]
+        select = [quote_identifier(c) for c in columns]
+        if not distinct:
+            # Keep the source row position as the index, like the pandas backends
+            select.insert(0, "rowid - 1 AS _row")
+        
+        sql, sql_params = self.get_database_query(admin_id, store.table_name, select)
+        if distinct:
+            sql = sql.replace("SELECT ", "SELECT DISTINCT ", 1)
+        if condition:
+            sql += f" AND ({condition})"
+            sql_params += params or []
+        if not distinct:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            sql_params += [limit, offset]
+        return store.read_frame(sql, sql_params)
     
+    @tracer.traced()
+    def get_student_page(self, admin_id: str, columns: List[str] = None, filters: Dict[str, Any] = None,
+                         search: str = None, sort_by: str = None, ascending: bool = True,
+                         offset: int = 0, limit: int = 50) -> Tuple[pd.DataFrame, int]:
+        """One page of an admin's students and the total number of matching rows.
+        
+        filters maps columns to required values and search matches student names
+        (case-insensitive). Filtering and sorting run on the scope's row positions,
+        or in SQL on the SQLite backend, so only the returned page is materialized.
+        """
+        filters = filters or {}
+        scope = self.get_admin_scope(admin_id)
+        if not scope:
+            return pd.DataFrame(), 0
+        
+        snapshot = self._snapshot
+        store = snapshot.store
+        if store is not None:
+            conditions, params = ["1=1"], []
+            for column, value in filters.items():
+                conditions.append(f"{quote_identifier(column)} = ?")
+                params.append(int(value) if isinstance(value, bool) else value)
+            if search:
+                escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                conditions.append("student_name LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+            condition = " AND ".join(conditions)
+            where, scope_params = self._build_sql_filter(admin_id)
+            total = store.fetchall(f"SELECT COUNT(*) FROM {quote_identifier(store.table_name)} "
+                                   f"WHERE {where} AND ({condition})", scope_params + params)[0][0]
+            order_by = "rowid"
+            if sort_by:
+                # NULLs last, like pandas
+                column = quote_identifier(sort_by)
+                order_by = f"{column} IS NULL, {column} {'ASC' if ascending else 'DESC'}, rowid"
+            page = self._query_scope(store, admin_id, columns, condition, params,
+                                     order_by=order_by, limit=limit, offset=offset)
+            return page, total
+        
+        positions = self._get_scope_positions(snapshot, admin_id, scope)
+        if filters or search:
+            keys = snapshot.frame(list(filters) + (['student_name'] if search else [])).iloc[positions]
+            mask = np.ones(len(positions), dtype=bool)
+            for column, value in filters.items():
+                mask &= (keys[column] == value).to_numpy()
+            if search:
+                mask &= keys['student_name'].str.contains(search, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+            positions = positions[mask]
+        
+        if sort_by:
+            values = snapshot.frame([sort_by]).iloc[positions][sort_by].reset_index(drop=True)
+            order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+            positions = positions[order]
+        
+        return snapshot.frame(columns).iloc[positions[offset:offset + limit]], len(positions)
+    
+    @tracer.traced()
     def get_students_without_homework(self, admin_id: str) -> pd.DataFrame:
         """Get students who haven't submitted homework within admin scope"""
+        store = self._snapshot.store
+        if store is not None and self.get_admin_scope(admin_id):
+            return self._query_scope(store, admin_id, condition="homework_submitted = 0")
+        
         filtered_df = self.filter_data_by_scope(admin_id)
         return filtered_df[filtered_df['homework_submitted'] == False]
     
+    @tracer.traced()
     def get_performance_data(self, admin_id: str, grade: str = None, week: str = None) -> pd.DataFrame:
         """Get performance data filtered by admin scope"""
-        filtered_df = self.filter_data_by_scope(admin_id)
+        store = self._snapshot.store
+        if store is not None and self.get_admin_scope(admin_id):
+            conditions, params = ["1=1"], []
+            if grade:
+                conditions.append("grade = ?")
+                params.append(grade)
+            if week:
+                conditions.append("performance_week = ?")
+                params.append(week)
+            return self._query_scope(store, admin_id, ['student_name', 'grade', 'class', 'quiz_score', 'quiz_date'],
+                                     " AND ".join(conditions), params)
+        
+        filtered_df = self.filter_data_by_scope(admin_id, PERFORMANCE_COLUMNS)
         
         if grade:
             filtered_df = filtered_df[filtered_df['grade'] == grade]
@@ -50,13 +719,25 @@ class DataManager:
             
         return filtered_df[['student_name', 'grade', 'class', 'quiz_score', 'quiz_date']]
     
+    @tracer.traced()
     def get_upcoming_quizzes(self, admin_id: str) -> pd.DataFrame:
         """Get upcoming quizzes within admin scope"""
-        filtered_df = self.filter_data_by_scope(admin_id)
-        return filtered_df[['student_name', 'grade', 'class', 'upcoming_quiz', 'upcoming_quiz_date']].drop_duplicates()
+        store = self._snapshot.store
+        if store is not None and self.get_admin_scope(admin_id):
+            return self._query_scope(store, admin_id, QUIZ_COLUMNS, distinct=True)
+        
+        filtered_df = self.filter_data_by_scope(admin_id, QUIZ_COLUMNS)
+        return filtered_df.drop_duplicates()
     
+    @tracer.traced()
     def get_students_by_score_threshold(self, admin_id: str, threshold: int, operator: str = '<') -> pd.DataFrame:
         """Get students based on score threshold"""
+        store = self._snapshot.store
+        if store is not None and self.get_admin_scope(admin_id):
+            if operator in ('<', '>', '='):
+                return self._query_scope(store, admin_id, condition=f"quiz_score {operator} ?", params=[threshold])
+            return self._query_scope(store, admin_id)
+        
         filtered_df = self.filter_data_by_scope(admin_id)
         
         if operator == '<':
@@ -68,33 +749,115 @@ class DataManager:
         else:
             return filtered_df
     
+    @tracer.traced()
     def get_class_analytics(self, admin_id: str) -> Dict[str, Any]:
-        """Get comprehensive analytics for admin's classes"""
-        filtered_df = self.filter_data_by_scope(admin_id)
+        """Get comprehensive analytics for admin's classes (memoized per data version)"""
+        snapshot = self._snapshot
+        self._sync_registry(snapshot)
+        analytics = snapshot.analytics_cache.get(admin_id)
+        tracer.annotate(cache_hit=analytics is not None)
+        if analytics is None:
+            if snapshot.store is not None:
+                analytics = self._sql_class_analytics(snapshot.store, admin_id)
+            else:
+                analytics = snapshot.running.summarize(self.get_admin_scope(admin_id))
+            snapshot.analytics_cache[admin_id] = analytics
+        # Callers get their own copy so the memo can't be mutated from outside
+        return copy.deepcopy(analytics)
+    
+    def _sql_class_analytics(self, store: SQLiteStore, admin_id: str) -> Dict[str, Any]:
+        """get_class_analytics computed with one SQL GROUP BY instead of a pandas frame"""
+        if not self.get_admin_scope(admin_id):
+            return {}
         
-        if filtered_df.empty:
+        where, params = self._build_sql_filter(admin_id)
+        table = quote_identifier(store.table_name)
+        # One pass over the scoped rows, grouped by (grade, class); totals are folded in Python
+        groups = store.fetchall(
+            f"SELECT grade, \"class\", COUNT(*), COUNT(quiz_score), SUM(quiz_score), "
+            f"SUM(quiz_score * quiz_score), SUM(homework_submitted), MIN(quiz_score), MAX(quiz_score) "
+            f"FROM {table} WHERE {where} GROUP BY grade, \"class\"", params)
+        if not groups:
             return {}
         
-        analytics = {
-            'total_students': len(filtered_df),
-            'average_quiz_score': filtered_df['quiz_score'].mean(),
-            'homework_completion_rate': (filtered_df['homework_submitted'].sum() / len(filtered_df) * 100),
-            'grade_distribution': filtered_df['grade'].value_counts().to_dict(),
-            'class_distribution': filtered_df['class'].value_counts().to_dict(),
-            'upcoming_quiz_count': filtered_df['upcoming_quiz'].nunique(),
+        total = sum(group[2] for group in groups)
+        scored = sum(group[3] for group in groups)
+        score_sum = sum(group[4] or 0 for group in groups)
+        sum_squares = sum(group[5] or 0 for group in groups)
+        submitted = sum(group[6] or 0 for group in groups)
+        minimums = [group[7] for group in groups if group[7] is not None]
+        maximums = [group[8] for group in groups if group[8] is not None]
+        
+        grade_distribution, class_distribution = {}, {}
+        for grade, class_name, count, *_ in groups:
+            grade_distribution[grade] = grade_distribution.get(grade, 0) + count
+            class_distribution[class_name] = class_distribution.get(class_name, 0) + count
+        
+        quiz_count = store.fetchall(
+            f"SELECT COUNT(DISTINCT upcoming_quiz) FROM {table} WHERE {where}", params)[0][0]
+        # Median: average of the one or two middle scores
+        middle = store.fetchall(
+            f"SELECT quiz_score FROM {table} WHERE {where} AND quiz_score IS NOT NULL "
+            f"ORDER BY quiz_score LIMIT ? OFFSET ?", params + [2 - scored % 2, (scored - 1) // 2]) if scored else []
+        
+        average = score_sum / scored if scored else float('nan')
+        # Sample standard deviation, matching pandas' default ddof=1
+        std = float('nan')
+        if scored > 1:
+            variance = (sum_squares - scored * average * average) / (scored - 1)
+            std = float(np.sqrt(max(variance, 0.0)))
+        
+        return {
+            'total_students': total,
+            'average_quiz_score': average,
+            'homework_completion_rate': submitted / total * 100,
+            'grade_distribution': sorted_counts(grade_distribution),
+            'class_distribution': sorted_counts(class_distribution),
+            'upcoming_quiz_count': quiz_count,
             'score_statistics': {
-                'min': filtered_df['quiz_score'].min(),
-                'max': filtered_df['quiz_score'].max(),
-                'median': filtered_df['quiz_score'].median(),
-                'std': filtered_df['quiz_score'].std()
+                'min': min(minimums) if minimums else float('nan'),
+                'max': max(maximums) if maximums else float('nan'),
+                'median': float(np.mean([row[0] for row in middle])) if middle else float('nan'),
+                'std': std
             }
         }
+    
+    @tracer.traced()
+    def get_group_statistics(self, admin_id: str, column: str = 'class') -> Dict[str, Dict[str, Any]]:
+        """Per-grade, per-class or per-region totals within an admin's scope"""
+        if column not in SCOPE_COLUMNS.values():
+            raise ValueError(f"Unsupported group column: {column}")
+        scope = self.get_admin_scope(admin_id)
+        if not scope:
+            return {}
+        
+        snapshot = self._snapshot
+        if snapshot.store is None:
+            return snapshot.running.rollup(scope, column)
         
-        return analytics
+        where, params = self._build_sql_filter(admin_id)
+        rows = snapshot.store.fetchall(
+            f"SELECT {quote_identifier(column)}, COUNT(*), AVG(quiz_score), SUM(homework_submitted) "
+            f"FROM {quote_identifier(snapshot.store.table_name)} WHERE {where} "
+            f"GROUP BY {quote_identifier(column)}", params)
+        return {
+            value: {
+                'total_students': count,
+                'average_quiz_score': average if average is not None else float('nan'),
+                'homework_submitted': submitted or 0,
+                'homework_completion_rate': (submitted or 0) / count * 100
+            } for value, count, average, submitted in rows
+        }
     
+    @tracer.traced()
     def get_students_needing_support(self, admin_id: str, score_threshold: int = 75) -> pd.DataFrame:
         """Identify students who may need additional support"""
-        filtered_df = self.filter_data_by_scope(admin_id)
+        store = self._snapshot.store
+        if store is not None and self.get_admin_scope(admin_id):
+            return self._query_scope(store, admin_id, SUPPORT_COLUMNS,
+                                     "quiz_score < ? OR homework_submitted = 0", [score_threshold])
+        
+        filtered_df = self.filter_data_by_scope(admin_id, SUPPORT_COLUMNS)
         
         # Students with low scores OR missing homework
         support_needed = filtered_df[
@@ -102,11 +865,17 @@ class DataManager:
             (filtered_df['homework_submitted'] == False)
         ]
         
-        return support_needed[['student_name', 'grade', 'class', 'quiz_score', 'homework_submitted']]
+        return support_needed
     
+    @tracer.traced()
     def get_high_performers(self, admin_id: str, score_threshold: int = 90) -> pd.DataFrame:
         """Identify high-performing students"""
-        filtered_df = self.filter_data_by_scope(admin_id)
+        store = self._snapshot.store
+        if store is not None and self.get_admin_scope(admin_id):
+            return self._query_scope(store, admin_id, ['student_name', 'grade', 'class', 'quiz_score'],
+                                     "quiz_score >= ? AND homework_submitted = 1", [score_threshold])
+        
+        filtered_df = self.filter_data_by_scope(admin_id, SUPPORT_COLUMNS)
         
         high_performers = filtered_df[
             (filtered_df['quiz_score'] >= score_threshold) & 
@@ -115,6 +884,107 @@ class DataManager:
         
         return high_performers[['student_name', 'grade', 'class', 'quiz_score']]
     
+    @tracer.traced()
+    def batch_scope(self, admin_ids: List[str]) -> ScopeBatch:
+        """Resolve the scopes of several admins once, for ScopeBatch queries across all of them.
+        
+        Admins without a scope are left out of the batch.
+        """
+        scopes = {admin_id: self.get_admin_scope(admin_id) for admin_id in admin_ids}
+        admin_ids = [admin_id for admin_id, scope in scopes.items() if scope]
+        snapshot = self._snapshot
+        if snapshot.store is not None:
+            # Row positions are not addressable in SQLite: read each scope once and stack the frames
+            parts = [self._query_scope(snapshot.store, admin_id) for admin_id in admin_ids]
+            lengths = [len(part) for part in parts]
+            # Without admins, an unscoped query still gives the empty frame its columns and dtypes
+            stacked = pd.concat(parts) if parts else self._query_scope(snapshot.store, None)
+            positions = np.arange(len(stacked), dtype=np.intp)
+            
+            def rows(selected: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+                frame = stacked if columns is None else stacked[[c for c in columns if c in stacked.columns]]
+                return frame.iloc[selected]
+        else:
+            scope_positions = [self._get_scope_positions(snapshot, admin_id, scopes[admin_id])
+                               for admin_id in admin_ids]
+            lengths = [len(part) for part in scope_positions]
+            positions = np.concatenate(scope_positions) if scope_positions else np.array([], dtype=np.intp)
+            rows = snapshot.rows
+        
+        codes = np.repeat(np.arange(len(admin_ids), dtype=np.intp), lengths)
+        tracer.annotate(rows_out=len(positions))
+        return ScopeBatch(rows, positions, codes, admin_ids, self)
+    
+    def iter_export_chunks(self, admin_id: str, columns: List[str] = None, filters: Dict[str, Any] = None,
+                           chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Scoped (and optionally filtered) rows in chunks of at most chunk_rows, in source order"""
+        filters = filters or {}
+        scope = self.get_admin_scope(admin_id)
+        if not scope:
+            return
+        
+        snapshot = self._snapshot
+        store = snapshot.store
+        if store is not None:
+            conditions, params = [], []
+            for column, value in filters.items():
+                conditions.append(f"{quote_identifier(column)} = ?")
+                params.append(int(value) if isinstance(value, bool) else value)
+            last_rowid = 0
+            while True:
+                # Keyset pagination: each chunk starts after the previous chunk's last rowid
+                chunk = self._query_scope(store, admin_id, columns, " AND ".join(conditions + ["rowid > ?"]),
+                                          params + [last_rowid], limit=chunk_rows)
+                if chunk.empty:
+                    return
+                yield chunk
+                last_rowid = int(chunk.index[-1]) + 1
+                if len(chunk) < chunk_rows:
+                    return
+        
+        positions = self._get_scope_positions(snapshot, admin_id, scope)
+        if filters:
+            keys = snapshot.frame(list(filters)).iloc[positions]
+            mask = np.ones(len(positions), dtype=bool)
+            for column, value in filters.items():
+                mask &= (keys[column] == value).to_numpy()
+            positions = positions[mask]
+        for start in range(0, len(positions), chunk_rows):
+            yield snapshot.rows(positions[start:start + chunk_rows], columns)
+    
+    def stream_export(self, admin_id: str, format: str = 'csv', columns: List[str] = None,
+                      filters: Dict[str, Any] = None, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+        """Export an admin's data as a stream of encoded chunks (csv, ndjson or parquet).
+        
+        Memory stays bounded by chunk_rows regardless of scope size.
+        """
+        format = format.lower()
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        chunks = self.iter_export_chunks(admin_id, columns, filters, chunk_rows)
+        if format == 'parquet':
+            yield from parquet_chunks(chunks)
+            return
+        
+        first = True
+        for chunk in chunks:
+            if format == 'csv':
+                yield chunk.to_csv(index=False, header=first).encode('utf-8')
+            else:
+                yield chunk.to_json(orient='records', lines=True, date_format='iso').rstrip('\n').encode('utf-8') + b'\n'
+            first = False
+    
+    @tracer.traced()
+    def write_export(self, admin_id: str, fileobj: BinaryIO, format: str = 'csv', columns: List[str] = None,
+                     filters: Dict[str, Any] = None, chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+        """Write a streamed export to a binary file object; returns the number of bytes written"""
+        written = 0
+        for data in self.stream_export(admin_id, format, columns, filters, chunk_rows):
+            fileobj.write(data)
+            written += len(data)
+        return written
+    
+    @tracer.traced()
     def export_filtered_data(self, admin_id: str, format: str = 'csv') -> str:
         """Export filtered data in specified format"""
         filtered_df = self.filter_data_by_scope(admin_id)
@@ -122,49 +992,62 @@ class DataManager:
         if format.lower() == 'csv':
             return filtered_df.to_csv(index=False)
         elif format.lower() == 'json':
-            return filtered_df.to_json(orient='records', indent=2)
+            return filtered_df.to_json(orient='records', indent=2, date_format='iso')
         else:
             return filtered_df.to_string(index=False)
     
     def get_admin_info(self, admin_id: str) -> Dict[str, Any]:
         """Get detailed admin information"""
-        for admin in self.admin_roles:
-            if admin['admin_id'] == admin_id:
-                scope = admin['access_scope']
-                filtered_data = self.filter_data_by_scope(admin_id)
-                
-                return {
-                    'admin_id': admin_id,
-                    'admin_name': admin['admin_name'],
-                    'access_scope': scope,
-                    'accessible_students': len(filtered_data),
-                    'grades_managed': scope.get('grades', []),
-                    'classes_managed': scope.get('classes', []),
-                    'regions_managed': scope.get('regions', [])
-                }
-        return {}
-    
-    # Database-ready methods for future integration
-    def _build_sql_filter(self, admin_id: str) -> str:
-        """Build SQL WHERE clause for database integration"""
-        scope = self.get_admin_scope(admin_id)
-        conditions = []
+        admin = self.admin_registry.get(admin_id)
+        if not admin:
+            return {}
         
-        if 'grades' in scope and scope['grades']:
-            grades = "', '".join(scope['grades'])
-            conditions.append(f"grade IN ('{grades}')")
+        scope = admin.scope.to_dict()
+        snapshot = self._snapshot
+        if snapshot.store is not None:
+            where, params = self._build_sql_filter(admin_id)
+            accessible_students = snapshot.store.fetchall(
+                f"SELECT COUNT(*) FROM {quote_identifier(snapshot.store.table_name)} WHERE {where}", params)[0][0]
+        else:
+            accessible_students = len(self._get_scope_positions(snapshot, admin_id, scope))
         
-        if 'classes' in scope and scope['classes']:
-            classes = "', '".join(scope['classes'])
-            conditions.append(f"class IN ('{classes}')")
+        return {
+            'admin_id': admin_id,
+            'admin_name': admin.admin_name,
+            'access_scope': scope,
+            'accessible_students': accessible_students,
+            'grades_managed': scope.get('grades', []),
+            'classes_managed': scope.get('classes', []),
+            'regions_managed': scope.get('regions', [])
+        }
+    
+    # SQL helpers used by the SQLite backend; also usable against any DB-API database
+    def _build_sql_filter(self, admin_id: str) -> Tuple[str, List[Any]]:
+        """Build a parameterized SQL WHERE clause and its bound values"""
+        scope = self.get_admin_scope(admin_id)
+        if not scope:
+            # Unknown admins see nothing
+            return "1=0", []
         
-        if 'regions' in scope and scope['regions']:
-            regions = "', '".join(scope['regions'])
-            conditions.append(f"region IN ('{regions}')")
+        conditions = []
+        params = []
+        for scope_key, column in SCOPE_COLUMNS.items():
+            if scope_key not in scope:
+                continue
+            values = scope[scope_key]
+            if not values:
+                # Matches the pandas backends: an empty list grants no rows
+                conditions.append("1=0")
+                continue
+            placeholders = ", ".join("?" for _ in values)
+            conditions.append(f"{quote_identifier(column)} IN ({placeholders})")
+            params.extend(values)
         
-        return " AND ".join(conditions) if conditions else "1=1"
+        return (" AND ".join(conditions) if conditions else "1=1"), params
     
-    def get_database_query(self, admin_id: str, table_name: str = 'students') -> str:
-        """Generate SQL query for database integration"""
-        where_clause = self._build_sql_filter(admin_id)
-        return f"SELECT * FROM {table_name} WHERE {where_clause}"
\ No newline at end of file
+    def get_database_query(self, admin_id: str, table_name: str = 'students',
+                           columns: List[str] = None) -> Tuple[str, List[Any]]:
+        """Generate a parameterized SQL query and its bound values"""
+        where_clause, params = self._build_sql_filter(admin_id)
+        select = ", ".join(columns) if columns else "*"
+        return f"SELECT {select} FROM {quote_identifier(table_name)} WHERE {where_clause}", params
@@ -0,0 +1,292 @@
+"""Local query service that lets several UI processes share one DataManager.
+
+Run it next to the Streamlit workers:
+
+    python src/data_service.py --students data/students_data.json --admins data/admin_roles.json
+
+and point the app at it with DATA_SERVICE_URL=http://127.0.0.1:8765. DataFrames
+travel as Arrow IPC streams; everything else as JSON.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_manager import EXPORT_FORMATS, DataManager
+from tracing import tracer
+
+# DataManager methods and properties callable over the service
+SERVICE_METHODS = frozenset([
+    'filter_data_by_scope', 'get_admin_scope', 'get_students_without_homework', 'get_performance_data',
+    'get_upcoming_quizzes', 'get_students_by_score_threshold', 'get_class_analytics', 'get_group_statistics',
+    'get_students_needing_support', 'get_high_performers', 'export_filtered_data', 'get_admin_info',
+    'get_student_page', 'get_database_query', 'refresh'
+])
+SERVICE_PROPERTIES = frozenset(['data_version', 'data_fingerprint', 'columns'])
+
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def frame_to_arrow(frame: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame (index included) as an Arrow IPC stream"""
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_to_frame(payload: bytes) -> pd.DataFrame:
+    """Read an Arrow IPC stream back into a DataFrame; numeric columns map without copying"""
+    return pa.ipc.open_stream(pa.py_buffer(payload)).read_all().to_pandas()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_result(result: Any) -> Tuple[bytes, str, Dict[str, str]]:
+    """Response body, content type and extra headers for a method result"""
+    if isinstance(result, pd.DataFrame):
+        return frame_to_arrow(result), ARROW_CONTENT_TYPE, {}
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], pd.DataFrame):
+        # (page, total) from get_student_page
+        return frame_to_arrow(result[0]), ARROW_CONTENT_TYPE, {'X-Total-Rows': str(int(result[1]))}
+    body = json.dumps({'result': result}, default=_json_default).encode('utf-8')
+    return body, JSON_CONTENT_TYPE, {}
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients reuse connections
+    data_manager: DataManager = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/call':
+                self._call(request)
+            elif self.path == '/property':
+                self._property(request)
+            elif self.path == '/export':
+                self._export(request)
+            else:
+                self._send_error(404, f"Unknown endpoint: {self.path}")
+        except Exception as e:
+            self._send_error(500, f"{type(e).__name__}: {e}")
+
+    def _call(self, request: Dict[str, Any]):
+        method = request.get('method')
+        if method not in SERVICE_METHODS:
+            self._send_error(400, f"Method not available: {method}")
+            return
+        result = getattr(self.data_manager, method)(*request.get('args', []), **request.get('kwargs', {}))
+        self._send(*_encode_result(result))
+
+    def _property(self, request: Dict[str, Any]):
+        name = request.get('name')
+        if name not in SERVICE_PROPERTIES:
+            self._send_error(400, f"Property not available: {name}")
+            return
+        self._send(*_encode_result(getattr(self.data_manager, name)))
+
+    def _export(self, request: Dict[str, Any]):
+        """Stream an export with chunked transfer encoding.
+        
+        The request is checked and the first chunk produced before the status line
+        goes out, so bad requests still get a proper error response.
+        """
+        format = str(request.get('format') or 'csv').lower()
+        if format not in EXPORT_FORMATS:
+            self._send_error(400, f"Unsupported export format: {format}")
+            return
+        admin_id = request.get('admin_id')
+        if not self.data_manager.get_admin_scope(admin_id):
+            self._send_error(404, f"Unknown admin: {admin_id}")
+            return
+        chunks = self.data_manager.stream_export(**request)
+        try:
+            first = next(chunks, b"")
+        except (KeyError, ValueError) as e:
+            self._send_error(400, f"{type(e).__name__}: {e}")
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for data in itertools.chain([first], chunks):
+                if data:
+                    self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        except Exception:
+            # Too late for an error status: drop the connection without the final chunk so the
+            # client sees a truncated stream instead of an error body spliced into the data
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send(self, body: bytes, content_type: str, headers: Dict[str, str]):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', JSON_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(data_manager: DataManager, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP server answering DataManager calls; one thread per connection"""
+    handler = type('DataServiceHandler', (_ServiceHandler,), {'data_manager': data_manager})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class DataServiceError(RuntimeError):
+    """Raised when the data service rejects or fails a call"""
+
+
+class DataServiceClient:
+    """Drop-in stand-in for DataManager that forwards calls to a data service.
+
+    Each thread keeps its own keep-alive connection. Methods in SERVICE_METHODS
+    are forwarded as-is; DataFrame results arrive as Arrow IPC buffers.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 8765
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port,
+                                                                              timeout=self.timeout)
+        return connection
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> http.client.HTTPResponse:
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        headers = {'Content-Type': JSON_CONTENT_TYPE}
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('POST', path, body, headers)
+                return connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Server closed an idle keep-alive connection; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+    def _decode(self, response: http.client.HTTPResponse) -> Any:
+        payload = response.read()
+        if response.status != 200:
+            raise DataServiceError(json.loads(payload).get('error', f"HTTP {response.status}"))
+        if response.getheader('Content-Type') == ARROW_CONTENT_TYPE:
+            frame = arrow_to_frame(payload)
+            total = response.getheader('X-Total-Rows')
+            return (frame, int(total)) if total is not None else frame
+        return json.loads(payload)['result']
+
+    def _call(self, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        with tracer.span(f"DataServiceClient.{method}"):
+            return self._decode(self._post('/call', {'method': method, 'args': list(args), 'kwargs': kwargs}))
+
+    def __getattr__(self, name: str):
+        if name in SERVICE_METHODS:
+            return lambda *args, **kwargs: self._call(name, args, kwargs)
+        raise AttributeError(name)
+
+    @property
+    def data_version(self) -> int:
+        return self._decode(self._post('/property', {'name': 'data_version'}))
+
+    @property
+    def data_fingerprint(self) -> str:
+        return self._decode(self._post('/property', {'name': 'data_fingerprint'}))
+
+    @property
+    def columns(self) -> List[str]:
+        return self._decode(self._post('/property', {'name': 'columns'}))
+
+    def stream_export(self, admin_id: str, format: str = 'csv', columns: List[str] = None,
+                      filters: Dict[str, Any] = None, chunk_rows: int = None) -> Iterator[bytes]:
+        """Export streamed from the service, yielded as it arrives"""
+        request = {'admin_id': admin_id, 'format': format, 'columns': columns, 'filters': filters}
+        if chunk_rows:
+            request['chunk_rows'] = chunk_rows
+        response = self._post('/export', request)
+        if response.status != 200:
+            raise DataServiceError(json.loads(response.read()).get('error', f"HTTP {response.status}"))
+        try:
+            while True:
+                data = response.read1(1 << 16)
+                if not data:
+                    return
+                yield data
+        finally:
+            if not response.isclosed():
+                # Abandoned mid-stream; the connection still holds unread data
+                self._connection().close()
+                self._local.connection = None
+
+    def write_export(self, admin_id: str, fileobj, format: str = 'csv', columns: List[str] = None,
+                     filters: Dict[str, Any] = None, chunk_rows: int = None) -> int:
+        written = 0
+        for data in self.stream_export(admin_id, format, columns, filters, chunk_rows):
+            fileobj.write(data)
+            written += len(data)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a DataManager to local UI processes")
+    parser.add_argument('--students', default='data/students_data.json')
+    parser.add_argument('--admins', default='data/admin_roles.json')
+    parser.add_argument('--storage', default='auto', choices=['auto', 'json', 'columnar', 'sqlite'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    data_manager = DataManager(args.students, args.admins, storage=args.storage)
+    server = make_server(data_manager, args.host, args.port)
+    print(f"Data service listening on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
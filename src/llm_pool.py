@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# One chat client per (api key, model, temperature) per process. ChatOpenAI keeps an
+# HTTP connection pool internally, so reusing the client also reuses connections.
+_LLM_POOL: Dict[Tuple[str, str, float], Any] = {}
+_LLM_POOL_LOCK = threading.Lock()
+
+
+def get_shared_llm(api_key: str, factory: Callable[[], Any], model: str = "gpt-3.5-turbo",
+                   temperature: float = 0) -> Tuple[Any, bool]:
+    """Get the pooled LLM client for these settings, creating it with factory() on first use.
+
+    Returns (client, created) so callers can report whether construction was paid.
+    """
+    key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest(), model, temperature)
+    with _LLM_POOL_LOCK:
+        llm = _LLM_POOL.get(key)
+        if llm is not None:
+            return llm, False
+        llm = factory()
+        _LLM_POOL[key] = llm
+        return llm, True
+
+
+def clear_llm_pool():
+    """Forget pooled clients (e.g. after rotating the API key)"""
+    with _LLM_POOL_LOCK:
+        _LLM_POOL.clear()
+
+
+class AgentCache:
+    """LRU of built pandas agents keyed by (llm, admin, data version)"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._agents: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Cached agent for key, building it with factory() on a miss. Returns (agent, hit)."""
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._agents.move_to_end(key)
+                self.hits += 1
+                return agent, True
+            self.misses += 1
+
+        # Build outside the lock; a racing duplicate build is harmless
+        agent = factory()
+        with self._lock:
+            self._agents[key] = agent
+            self._agents.move_to_end(key)
+            while len(self._agents) > self.max_entries:
+                self._agents.popitem(last=False)
+        return agent, False
+
+    def clear(self):
+        with self._lock:
+            self._agents.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._agents),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class AsyncLimiter:
+    """Bounded concurrency for async LLM calls; one semaphore per event loop"""
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max_concurrency
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    async def __aenter__(self):
+        await self._semaphore().acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self._semaphore().release()
+
+
+# Default process-wide agent cache and LLM limiter shared by all AIQueryEngine instances
+shared_agent_cache = AgentCache()
+shared_llm_limiter = AsyncLimiter(int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+# Tokens for the whole question prompt: instructions, data context and history
+DEFAULT_PROMPT_BUDGET = 600
+# Share of what is left after the instructions and question that history may use
+HISTORY_SHARE = 0.25
+# Distinct values listed per text column in the schema
+SCHEMA_TOP_VALUES = 3
+
+INSTRUCTIONS = ("Answer the question about the student data in `df` (one row per student). "
+                "Use the summary below when it is enough; query `df` only for details it lacks. "
+                "Be concise: key numbers first, then one or two recommendations.")
+
+HISTORY_HEADER = "Earlier questions:\n"
+
+# Rough BPE shape: short letter runs, up to three digits, single punctuation marks
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]")
+_encoding = None
+
+
+def _tiktoken_encoding():
+    """cl100k encoder when PROMPT_TOKENIZER=tiktoken and it loads, else False.
+
+    Opt-in because tiktoken downloads its vocabulary on first use, which would
+    stall the first prompt on machines without internet access.
+    """
+    global _encoding
+    if _encoding is None:
+        _encoding = False
+        if os.getenv("PROMPT_TOKENIZER") == "tiktoken":
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                pass
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text: exact with tiktoken, otherwise a local estimate close to cl100k"""
+    encoding = _tiktoken_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text (whole lines where possible) within max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for line in text.splitlines():
+        tokens = count_tokens(line) + 1
+        if used + tokens > max_tokens:
+            break
+        kept.append(line)
+        used += tokens
+    return "\n".join(kept)
+
+
+def describe_columns(frame: pd.DataFrame) -> str:
+    """One line per column: dtype plus range, true rate or most common values"""
+    lines = [f"{len(frame)} rows"]
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_bool_dtype(series):
+            detail = f"bool, {series.mean() * 100:.0f}% true"
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            detail = f"date, {series.min():%Y-%m-%d} to {series.max():%Y-%m-%d}"
+        elif pd.api.types.is_numeric_dtype(series):
+            detail = f"{series.dtype}, min {series.min():g}, mean {series.mean():.1f}, max {series.max():g}"
+        else:
+            counts = series.value_counts()
+            counts = counts[counts > 0]  # categoricals list unused categories too
+            if len(counts) > SCHEMA_TOP_VALUES and len(counts) * 2 > len(series):
+                # Identifier-like: counts per value say nothing
+                detail = f"text, {len(counts)} distinct, e.g. {counts.index[0]}"
+            else:
+                top = ", ".join(f"{value} ({count})" for value, count in counts.head(SCHEMA_TOP_VALUES).items())
+                more = f", +{len(counts) - SCHEMA_TOP_VALUES} more" if len(counts) > SCHEMA_TOP_VALUES else ""
+                detail = f"text, {len(counts)} distinct: {top}{more}"
+        lines.append(f"- {column}: {detail}")
+    return "\n".join(lines)
+
+
+def format_aggregates(analytics: Dict[str, Any]) -> str:
+    """Precomputed scope analytics as compact 'name: value' lines"""
+    lines = []
+    for name, value in analytics.items():
+        if isinstance(value, dict):
+            value = ", ".join(f"{key} {_format_number(item)}" for key, item in value.items())
+        else:
+            value = _format_number(value)
+        lines.append(f"- {name.replace('_', ' ')}: {value}")
+    return "\n".join(lines)
+
+
+def _format_number(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def summarize_history(context: List[Dict[str, Any]], max_tokens: int) -> str:
+    """Earlier questions, newest first, as many as fit; the rest are reduced to their intents"""
+    if not context or max_tokens <= 0:
+        return ""
+    lines, used = [], 0
+    for position, turn in enumerate(reversed(context)):
+        line = f"- {turn['query']}"
+        tokens = count_tokens(line) + 1
+        if used + tokens > max_tokens:
+            older = [older_turn['intent'] for older_turn in list(reversed(context))[position:]]
+            lines.append(f"- ({len(older)} earlier: {', '.join(sorted(set(older)))})")
+            break
+        lines.append(line)
+        used += tokens
+    return truncate_to_tokens("\n".join(lines), max_tokens)
+
+
+class PromptBuilder:
+    """Builds the agent's question prompt within a token budget.
+
+    Instead of raw rows the prompt carries a compact schema and the scope's
+    precomputed aggregates, which are cached per data key (admin + data version).
+    Sections are added by priority: instructions and question, data context,
+    then earlier questions; whatever does not fit is trimmed.
+    """
+
+    def __init__(self, budget: int = DEFAULT_PROMPT_BUDGET, cache_entries: int = 64):
+        self.budget = budget
+        self.cache_entries = cache_entries
+        self._data_contexts: "OrderedDict[Hashable, str]" = OrderedDict()
+        # Agent questions build prompts from worker threads
+        self._lock = threading.Lock()
+
+    def data_context(self, key: Hashable, frame: pd.DataFrame,
+                     load_analytics: Callable[[], Optional[Dict[str, Any]]] = None) -> str:
+        """Schema and aggregates text for a scope, computed once per key"""
+        with self._lock:
+            text = self._data_contexts.get(key)
+            if text is not None:
+                self._data_contexts.move_to_end(key)
+                return text
+        
+        # Build outside the lock; a racing duplicate build is harmless
+        # Aggregates first: when the budget trims, the schema tail goes before them
+        analytics = load_analytics() if load_analytics is not None else None
+        text = f"Precomputed summary:\n{format_aggregates(analytics)}\n\n" if analytics else ""
+        text += f"Columns of df:\n{describe_columns(frame)}"
+        with self._lock:
+            self._data_contexts[key] = text
+            self._data_contexts.move_to_end(key)
+            while len(self._data_contexts) > self.cache_entries:
+                self._data_contexts.popitem(last=False)
+        return text
+
+    def build(self, query: str, history: List[Dict[str, Any]], data_context: str = "") -> Tuple[str, int]:
+        """Prompt text and its token count"""
+        head = f"{INSTRUCTIONS}\n\nQuestion: {query}"
+        remaining = self.budget - count_tokens(head)
+        history_tokens = int(remaining * HISTORY_SHARE)
+
+        sections = [head]
+        if data_context and remaining - history_tokens > 0:
+            data_text = truncate_to_tokens(data_context, remaining - history_tokens)
+            sections.append(data_text)
+            remaining -= count_tokens(data_text)
+        history_text = summarize_history(history, remaining - count_tokens(HISTORY_HEADER))
+        if history_text:
+            sections.append(f"{HISTORY_HEADER}{history_text}")
+
+        prompt = "\n\n".join(sections)
+        return prompt, count_tokens(prompt)
@@ -0,0 +1,335 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Grammar pieces, compiled once
+CLASS_PATTERN = re.compile(r"\b(\d{1,2}[a-z])\b")
+GRADE_PATTERN = re.compile(r"\bgrade\s*(\d+)\b")
+DATE_PATTERN = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+SCORE_PATTERN = re.compile(r"\b(below|under|less than|above|over|more than|at least)\s*(\d+)")
+# Ranking keywords only plan a top-N when they rank students or scores ("best students", "top 5",
+# "scored the highest"), not in "the best way to help"
+RANKED_NOUN = r"(?:quiz\s+|average\s+)?(?:students?|performers?|scorers?|scores?|scoring|performing|results?|marks?|averages?)\b"
+TOP_PATTERN = re.compile(r"\b(?:top|best|highest|strongest)\s+(?:(\d+)\s+)?" + RANKED_NOUN
+                         + r"|\btop\s+(\d+)\b|\b(\d+)\s+(?:best|top|highest|strongest)\s+" + RANKED_NOUN
+                         + r"|\b(?:scored|scoring|performed|performing)\s+(?:the\s+)?(?:best|highest)\b")
+BOTTOM_PATTERN = re.compile(r"\b(?:bottom|worst|lowest|weakest)\s+(?:(\d+)\s+)?" + RANKED_NOUN
+                            + r"|\bbottom\s+(\d+)\b|\b(\d+)\s+(?:worst|bottom|lowest|weakest)\s+" + RANKED_NOUN
+                            + r"|\b(?:scored|scoring|performed|performing)\s+(?:the\s+)?(?:worst|lowest)\b")
+# In "which class/grade ..." the group itself is what gets ranked
+RANK_WORD_PATTERN = re.compile(r"\b(?:(top|best|highest|strongest)|(bottom|worst|lowest|weakest))\b")
+GROUP_PATTERN = re.compile(r"\b(?:per|by|for each|each|across|every)\s+(class|grade|region)(?:es|s)?\b")
+WHICH_GROUP_PATTERN = re.compile(r"\bwhich\s+(class|grade|region)\b")
+# Counts are of students only; "how many quizzes ..." goes to the LLM
+COUNT_PATTERN = re.compile(r"\b(?:how many|number of|count)\s+(?:(?:of|the|my|our|all|grade|class|\d+[a-z]?|[a-z]+ing)\s+){0,4}"
+                           r"(?:students|pupils|learners|kids)\b")
+COMPARE_PATTERN = re.compile(r"\b(compare|comparison|versus|vs\.?)\b")
+SORT_PATTERN = re.compile(r"\b(?:sort(?:ed)?|order(?:ed)?|rank(?:ed)?)\s+by\s+(quiz score|score|name|class|grade)"
+                          r"(?:\s+(asc|ascending|desc|descending))?")
+ALPHABETICAL_PATTERN = re.compile(r"\balphabetical(?:ly)?\b")
+HOMEWORK_MISSING_PATTERN = re.compile(
+    r"\b(?:haven'?t|have not|hasn'?t|has not|not|didn'?t|did not|never)\s+(?:yet\s+)?"
+    r"(?:submitted|turned in|handed in|done|completed)|\bmissing\b|\bwithout\b|\boverdue\b")
+HOMEWORK_DONE_PATTERN = re.compile(r"\b(submitted|completed|turned in|handed in)\b")
+PAST_QUIZ_PATTERN = re.compile(r"\b(taken|took|past|previous|scored)\b")
+
+SORT_COLUMNS = {'quiz score': 'quiz_score', 'score': 'quiz_score', 'name': 'student_name',
+                'class': 'class', 'grade': 'grade'}
+STUDENT_COLUMNS = ['student_name', 'grade', 'class', 'quiz_score']
+# Columns plan filters read
+FILTER_COLUMNS = ['grade', 'class', 'homework_submitted', 'quiz_score']
+
+
+@dataclass
+class QueryPlan:
+    """Deterministic plan compiled from a natural-language query"""
+    operation: str
+    filters: Dict[str, Any] = field(default_factory=dict)
+    n: Optional[int] = None
+    ascending: bool = False
+    group_by: Optional[str] = None
+    sort_by: Optional[str] = None
+    classes: List[str] = field(default_factory=list)
+    date_column: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+
+@dataclass
+class PlanResult:
+    """Output of an executed plan: a table with title/summary, or plain text"""
+    title: str = ""
+    data: Optional[pd.DataFrame] = None
+    summary: Optional[str] = None
+    text: Optional[str] = None
+
+
+class QueryPlanner:
+    """Rule-based planner that answers structured questions without the LLM"""
+
+    def __init__(self):
+        self.planned = 0
+        self.escalated = 0
+
+    def plan(self, query: str) -> Optional[QueryPlan]:
+        """Compile a query into a QueryPlan, or None if the LLM is needed"""
+        plan = self._compile(query.lower())
+        if plan is None:
+            self.escalated += 1
+        else:
+            self.planned += 1
+        return plan
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.planned + self.escalated
+        return {
+            'planned': self.planned,
+            'escalated': self.escalated,
+            'hit_rate': self.planned / total if total else 0.0
+        }
+
+    def _compile(self, query: str) -> Optional[QueryPlan]:
+        filters = self._extract_filters(query)
+        classes = [match.upper() for match in CLASS_PATTERN.findall(query)]
+        dates = DATE_PATTERN.findall(query)
+        group_match = GROUP_PATTERN.search(query) or WHICH_GROUP_PATTERN.search(query)
+        top_match = TOP_PATTERN.search(query)
+        bottom_match = BOTTOM_PATTERN.search(query)
+
+        if len(set(classes)) >= 2 and (COMPARE_PATTERN.search(query) or " and " in query):
+            return QueryPlan('compare_classes', filters, classes=sorted(set(classes), key=classes.index))
+
+        if COUNT_PATTERN.search(query) and not group_match:
+            if classes:
+                filters['classes'] = classes
+            return QueryPlan('count', filters)
+
+        if group_match:
+            plan = QueryPlan('group_stats', filters, group_by=group_match.group(1))
+            rank_match = RANK_WORD_PATTERN.search(query) if WHICH_GROUP_PATTERN.search(query) else None
+            if rank_match:
+                plan.n = 1
+                plan.ascending = bool(rank_match.group(2))
+            return plan
+
+        if top_match or bottom_match:
+            match = top_match or bottom_match
+            number = match.group(1) or match.group(2) or match.group(3)
+            plural = bool(re.search(r"\b(students|performers|scorers|scores)\b", query))
+            if classes:
+                filters['classes'] = classes
+            return QueryPlan('top_n', filters, n=int(number) if number else (5 if plural else 1),
+                             ascending=bool(bottom_match) and not top_match)
+
+        if dates:
+            plan = QueryPlan('date_range', filters,
+                             date_column='quiz_date' if PAST_QUIZ_PATTERN.search(query) else 'upcoming_quiz_date')
+            if len(dates) >= 2:
+                plan.start_date, plan.end_date = sorted(dates[:2])
+            elif re.search(r"\b(before|until|by|up to)\s+" + re.escape(dates[0]), query):
+                plan.end_date = dates[0]
+            elif re.search(r"\b(after|since|from)\s+" + re.escape(dates[0]), query):
+                plan.start_date = dates[0]
+            else:
+                plan.start_date = plan.end_date = dates[0]
+            if classes:
+                filters['classes'] = classes
+            return plan
+
+        sort_match = SORT_PATTERN.search(query)
+        if sort_match or ALPHABETICAL_PATTERN.search(query):
+            sort_by = SORT_COLUMNS[sort_match.group(1)] if sort_match else 'student_name'
+            direction = sort_match.group(2) if sort_match else None
+            # Names and classes read naturally A-Z; scores highest first
+            ascending = direction in ('asc', 'ascending') if direction else sort_by != 'quiz_score'
+            if classes:
+                filters['classes'] = classes
+            return QueryPlan('list', filters, sort_by=sort_by, ascending=ascending)
+
+        return None
+
+    @staticmethod
+    def _extract_filters(query: str) -> Dict[str, Any]:
+        filters: Dict[str, Any] = {}
+        grade_match = GRADE_PATTERN.search(query)
+        if grade_match:
+            filters['grade'] = f"Grade {grade_match.group(1)}"
+        if re.search(r"\b(homework|assignment)", query):
+            if HOMEWORK_MISSING_PATTERN.search(query):
+                filters['homework_submitted'] = False
+            elif HOMEWORK_DONE_PATTERN.search(query):
+                filters['homework_submitted'] = True
+        score_match = SCORE_PATTERN.search(query)
+        if score_match:
+            word = score_match.group(1)
+            operator = '<' if word in ('below', 'under', 'less than') else ('>=' if word == 'at least' else '>')
+            filters['score'] = (operator, int(score_match.group(2)))
+        return filters
+
+    def execute(self, plan: QueryPlan, data_manager, admin_id: str) -> PlanResult:
+        """Run a plan against the admin's scoped data"""
+        if plan.operation == 'group_stats' and not plan.filters:
+            # Unfiltered group stats come straight from the running aggregates
+            groups = data_manager.get_group_statistics(admin_id, plan.group_by)
+            data = pd.DataFrame([
+                {plan.group_by: value, 'students': stats['total_students'],
+                 'average_score': round(stats['average_quiz_score'], 1),
+                 'homework_rate': round(stats['homework_completion_rate'], 1)}
+                for value, stats in groups.items()
+            ])
+            return self._group_result(plan, data)
+
+        df = self._apply_filters(data_manager.filter_data_by_scope(admin_id), plan.filters)
+        return self._execute_rows(plan, df, self._describe_filters(plan.filters))
+
+    def execute_batch(self, plan: QueryPlan, batch) -> Dict[str, PlanResult]:
+        """Run a plan for every admin of a ScopeBatch; filters are applied once to the stacked scopes"""
+        if plan.operation == 'group_stats' and not plan.filters:
+            return {admin_id: self.execute(plan, batch, admin_id) for admin_id in batch.admin_ids}
+        description = self._describe_filters(plan.filters)
+        mask = None
+        if plan.filters:
+            mask = self._filter_mask(batch.values(FILTER_COLUMNS), plan.filters).to_numpy(dtype=bool)
+        frames = batch.split(mask)
+        return {admin_id: self._execute_rows(plan, df, description) for admin_id, df in frames.items()}
+
+    def _execute_rows(self, plan: QueryPlan, df: pd.DataFrame, description: str) -> PlanResult:
+        """Run a plan's operation on rows already restricted to the scope and filters"""
+        if plan.operation == 'count':
+            return PlanResult(text=f"There are {len(df)} students{description} in your scope.")
+
+        if plan.operation == 'top_n':
+            if df.empty:
+                return PlanResult(text=f"No students found{description}.")
+            ranked = df.nsmallest(plan.n, 'quiz_score') if plan.ascending else df.nlargest(plan.n, 'quiz_score')
+            label = "Lowest" if plan.ascending else "Top"
+            count = f"{plan.n} Students" if plan.n != 1 else "Student"
+            title = f"{label} {count} by Quiz Score{description}"
+            return PlanResult(title, ranked[STUDENT_COLUMNS], f"Scope average: {df['quiz_score'].mean():.1f}")
+
+        if plan.operation == 'group_stats':
+            if df.empty:
+                return PlanResult(text=f"No students found{description}.")
+            grouped = df.groupby(plan.group_by, observed=True).agg(
+                students=('quiz_score', 'size'),
+                average_score=('quiz_score', 'mean'),
+                homework_rate=('homework_submitted', 'mean')
+            ).reset_index()
+            grouped['average_score'] = grouped['average_score'].round(1)
+            grouped['homework_rate'] = (grouped['homework_rate'] * 100).round(1)
+            return self._group_result(plan, grouped, description)
+
+        if plan.operation == 'compare_classes':
+            selected = df[df['class'].isin(plan.classes)]
+            if selected.empty:
+                return PlanResult(text=f"None of {', '.join(plan.classes)} are in your scope.")
+            grouped = selected.groupby('class', observed=True).agg(
+                students=('quiz_score', 'size'),
+                average_score=('quiz_score', 'mean'),
+                best_score=('quiz_score', 'max'),
+                homework_rate=('homework_submitted', 'mean')
+            ).reset_index().sort_values('average_score', ascending=False)
+            grouped['average_score'] = grouped['average_score'].round(1)
+            grouped['homework_rate'] = (grouped['homework_rate'] * 100).round(1)
+            summary = None
+            if len(grouped) >= 2:
+                lead = grouped.iloc[0]['average_score'] - grouped.iloc[1]['average_score']
+                summary = f"{grouped.iloc[0]['class']} leads {grouped.iloc[1]['class']} by {lead:.1f} points on average"
+            missing = [c for c in plan.classes if c not in set(grouped['class'])]
+            if missing:
+                note = f"Not in your scope: {', '.join(missing)}"
+                summary = f"{summary} | {note}" if summary else note
+            return PlanResult(f"Class Comparison: {' vs '.join(plan.classes)}", grouped, summary)
+
+        if plan.operation == 'date_range':
+            dates = pd.to_datetime(df[plan.date_column], errors='coerce')
+            mask = pd.Series(True, index=df.index)
+            if plan.start_date:
+                mask &= dates >= pd.Timestamp(plan.start_date)
+            if plan.end_date:
+                mask &= dates <= pd.Timestamp(plan.end_date)
+            columns = (['student_name', 'class', 'upcoming_quiz', 'upcoming_quiz_date']
+                       if plan.date_column == 'upcoming_quiz_date'
+                       else ['student_name', 'class', 'quiz_score', 'quiz_date'])
+            selected = df.loc[mask, columns].sort_values(plan.date_column)
+            window = self._describe_window(plan)
+            if selected.empty:
+                return PlanResult(text=f"No quizzes found {window}{description}.")
+            title = ("Upcoming Quizzes " if plan.date_column == 'upcoming_quiz_date' else "Quiz Results ") + window
+            return PlanResult(title, selected, f"Total: {len(selected)} students")
+
+        if plan.operation == 'list':
+            if df.empty:
+                return PlanResult(text=f"No students found{description}.")
+            ordered = df.sort_values(plan.sort_by, ascending=plan.ascending, kind='stable')
+            direction = "ascending" if plan.ascending else "descending"
+            title = f"Students Sorted by {plan.sort_by.replace('_', ' ').title()} ({direction}){description}"
+            return PlanResult(title, ordered[STUDENT_COLUMNS + ['homework_submitted']], f"Total: {len(ordered)} students")
+
+        raise ValueError(f"Unknown plan operation: {plan.operation}")
+
+    @staticmethod
+    def _group_result(plan: QueryPlan, data: pd.DataFrame, description: str = "") -> PlanResult:
+        if data.empty:
+            return PlanResult(text="No data available in your scope.")
+        data = data.sort_values('average_score', ascending=plan.ascending, kind='stable')
+        label = plan.group_by.title()
+        if plan.n:
+            best = data.iloc[0]
+            word = "lowest" if plan.ascending else "highest"
+            return PlanResult(text=f"{label} {best[plan.group_by]} has the {word} average quiz score "
+                                   f"({best['average_score']:.1f}) across {int(best['students'])} students{description}.")
+        return PlanResult(f"Statistics by {label}{description}", data,
+                          f"{len(data)} {plan.group_by} groups, {int(data['students'].sum())} students")
+
+    @classmethod
+    def _apply_filters(cls, df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
+        if df.empty:
+            return df
+        return df[cls._filter_mask(df, filters)]
+
+    @staticmethod
+    def _filter_mask(df: pd.DataFrame, filters: Dict[str, Any]) -> pd.Series:
+        mask = pd.Series(True, index=df.index)
+        if 'grade' in filters:
+            mask &= df['grade'] == filters['grade']
+        if 'classes' in filters:
+            mask &= df['class'].isin(filters['classes'])
+        if 'homework_submitted' in filters:
+            mask &= df['homework_submitted'] == filters['homework_submitted']
+        if 'score' in filters:
+            operator, threshold = filters['score']
+            if operator == '<':
+                mask &= df['quiz_score'] < threshold
+            elif operator == '>=':
+                mask &= df['quiz_score'] >= threshold
+            else:
+                mask &= df['quiz_score'] > threshold
+        return mask
+
+    @staticmethod
+    def _describe_filters(filters: Dict[str, Any]) -> str:
+        parts = []
+        if 'grade' in filters:
+            parts.append(f"in {filters['grade']}")
+        if 'classes' in filters:
+            parts.append(f"in class {', '.join(filters['classes'])}")
+        if 'homework_submitted' in filters:
+            parts.append("who submitted homework" if filters['homework_submitted'] else "missing homework")
+        if 'score' in filters:
+            operator, threshold = filters['score']
+            words = {'<': 'below', '>': 'above', '>=': 'at least'}
+            parts.append(f"scoring {words[operator]} {threshold}")
+        return (" " + " ".join(parts)) if parts else ""
+
+    @staticmethod
+    def _describe_window(plan: QueryPlan) -> str:
+        if plan.start_date and plan.end_date:
+            if plan.start_date == plan.end_date:
+                return f"on {plan.start_date}"
+            return f"between {plan.start_date} and {plan.end_date}"
+        if plan.start_date:
+            return f"from {plan.start_date}"
+        return f"until {plan.end_date}"
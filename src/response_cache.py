@@ -0,0 +1,116 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+_PUNCTUATION = re.compile(r"[^\w\s<>=.]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a question: lowercase, no punctuation, single spaces"""
+    normalized = _PUNCTUATION.sub(" ", query.lower())
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    # Trailing periods are punctuation, decimal points inside numbers are not
+    return normalized.rstrip(". ")
+
+
+class ResponseCache:
+    """LRU cache of query responses with a TTL, optionally persisted to a local SQLite file.
+
+    Keys combine the normalized query, the admin's scope and a data fingerprint, so a
+    different scope or a data change never serves a stale answer.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, db_path: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+        if db_path:
+            self._connection = sqlite3.connect(db_path, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL)")
+
+    @staticmethod
+    def make_key(query: str, scope: Dict[str, List[str]], data_version: Any) -> str:
+        """Hash of normalized query text, admin scope and dataset version"""
+        payload = json.dumps({
+            'query': normalize_query(query),
+            'scope': {key: sorted(values) for key, values in sorted(scope.items())},
+            'data_version': str(data_version)
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for a key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT created, response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (row[0], row[1])
+                    self._store_in_memory(key, entry)
+
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._evict(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, response: str):
+        """Store a response"""
+        entry = (time.time(), response)
+        with self._lock:
+            self._store_in_memory(key, entry)
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                        (key, response, entry[0]))
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for reporting"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def _store_in_memory(self, key: str, entry: Tuple[float, str]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict(self, key: str):
+        self._entries.pop(key, None)
+        if self._connection is not None:
+            with self._connection:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
@@ -0,0 +1,232 @@
+import math
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+# Cells are keyed by the scope columns, so any admin scope is an exact union of cells
+CELL_COLUMNS = ('grade', 'class', 'region')
+SCOPE_KEYS = {'grades': 0, 'classes': 1, 'regions': 2}
+
+
+class CellStats:
+    """Running totals for one (grade, class, region) cell"""
+    __slots__ = ('count', 'score_count', 'score_sum', 'score_sum_squares',
+                 'homework_submitted', 'score_histogram', 'quiz_counts')
+
+    def __init__(self):
+        self.count = 0
+        self.score_count = 0
+        self.score_sum = 0.0
+        self.score_sum_squares = 0.0
+        self.homework_submitted = 0
+        # score -> number of students; gives min/max/median without keeping rows
+        self.score_histogram: Dict[Any, int] = {}
+        self.quiz_counts: Dict[Any, int] = {}
+
+    def copy(self) -> 'CellStats':
+        clone = CellStats()
+        clone.count = self.count
+        clone.score_count = self.score_count
+        clone.score_sum = self.score_sum
+        clone.score_sum_squares = self.score_sum_squares
+        clone.homework_submitted = self.homework_submitted
+        clone.score_histogram = dict(self.score_histogram)
+        clone.quiz_counts = dict(self.quiz_counts)
+        return clone
+
+    def apply(self, score: Any, homework_submitted: bool, upcoming_quiz: Any, sign: int):
+        """Add (sign=1) or remove (sign=-1) one student's contribution"""
+        self.count += sign
+        if _present(score):
+            self.score_count += sign
+            self.score_sum += sign * score
+            self.score_sum_squares += sign * score * score
+            _bump(self.score_histogram, score, sign)
+        if homework_submitted:
+            self.homework_submitted += sign
+        if _present(upcoming_quiz):
+            _bump(self.quiz_counts, upcoming_quiz, sign)
+
+
+class RunningAggregates:
+    """Incrementally maintained analytics over the student roster"""
+
+    def __init__(self):
+        self.cells: Dict[Tuple[Any, Any, Any], CellStats] = {}
+        # Keys of cells this instance may change in place; None when it shares no cells
+        self._owned: Optional[set] = None
+
+    @classmethod
+    def from_frame(cls, students_df: pd.DataFrame) -> 'RunningAggregates':
+        """Build aggregates from an existing frame with a few grouped counts"""
+        aggregates = cls()
+        if students_df.empty:
+            return aggregates
+        keys = list(CELL_COLUMNS)
+        if not all(column in students_df.columns for column in keys + ['quiz_score']):
+            return aggregates
+
+        def cell(key):
+            cell_stats = aggregates.cells.get(key)
+            if cell_stats is None:
+                cell_stats = aggregates.cells[key] = CellStats()
+            return cell_stats
+
+        grouped = students_df.groupby(keys, observed=True, sort=False, dropna=False)
+        for key, count in grouped.size().items():
+            cell(key).count = int(count)
+        if 'homework_submitted' in students_df.columns:
+            for key, submitted in grouped['homework_submitted'].sum().items():
+                cell(key).homework_submitted = int(submitted)
+
+        # Score histogram per cell; sums and sums of squares follow from it
+        histogram = students_df.groupby(keys + ['quiz_score'], observed=True, sort=False).size()
+        for (*key, score), count in histogram.items():
+            cell_stats, score, count = cell(tuple(key)), _to_python(score), int(count)
+            cell_stats.score_histogram[score] = count
+            cell_stats.score_count += count
+            cell_stats.score_sum += score * count
+            cell_stats.score_sum_squares += score * score * count
+
+        if 'upcoming_quiz' in students_df.columns:
+            quizzes = students_df.groupby(keys + ['upcoming_quiz'], observed=True, sort=False).size()
+            for (*key, quiz), count in quizzes.items():
+                cell(tuple(key)).quiz_counts[quiz] = int(count)
+        return aggregates
+
+    def copy(self) -> 'RunningAggregates':
+        """Copy sharing every cell until one of the two changes it, so readers of either never
+        see the other's updates"""
+        clone = RunningAggregates()
+        clone.cells = dict(self.cells)
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def add(self, record: Dict[str, Any]):
+        """Count a student record"""
+        self._apply(record, 1)
+
+    def remove(self, record: Dict[str, Any]):
+        """Un-count a student record previously passed to add()"""
+        self._apply(record, -1)
+
+    def _apply(self, record: Dict[str, Any], sign: int):
+        key = tuple(record.get(column) for column in CELL_COLUMNS)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = CellStats()
+        elif self._owned is not None and key not in self._owned:
+            cell = self.cells[key] = cell.copy()
+        if self._owned is not None:
+            self._owned.add(key)
+        cell.apply(_to_python(record.get('quiz_score')), bool(record.get('homework_submitted')),
+                   record.get('upcoming_quiz'), sign)
+        if cell.count == 0:
+            del self.cells[key]
+
+    def _matching_cells(self, scope: Dict[str, List[str]]) -> List[Tuple[Tuple, CellStats]]:
+        allowed = {position: set(scope[key]) for key, position in SCOPE_KEYS.items() if key in scope}
+        return [(key, cell) for key, cell in self.cells.items()
+                if all(key[position] in values for position, values in allowed.items())]
+
+    def summarize(self, scope: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Analytics for an admin scope, in the shape of DataManager.get_class_analytics"""
+        cells = self._matching_cells(scope)
+        total = sum(cell.count for _, cell in cells)
+        if not total:
+            return {}
+
+        scored = sum(cell.score_count for _, cell in cells)
+        score_sum = sum(cell.score_sum for _, cell in cells)
+        sum_squares = sum(cell.score_sum_squares for _, cell in cells)
+        histogram: Dict[Any, int] = {}
+        quizzes = set()
+        grade_distribution: Dict[Any, int] = {}
+        class_distribution: Dict[Any, int] = {}
+        for (grade, class_name, _), cell in cells:
+            grade_distribution[grade] = grade_distribution.get(grade, 0) + cell.count
+            class_distribution[class_name] = class_distribution.get(class_name, 0) + cell.count
+            for score, count in cell.score_histogram.items():
+                histogram[score] = histogram.get(score, 0) + count
+            quizzes.update(cell.quiz_counts)
+
+        average = score_sum / scored if scored else float('nan')
+        std = float('nan')
+        if scored > 1:
+            variance = (sum_squares - scored * average * average) / (scored - 1)
+            std = math.sqrt(max(variance, 0.0))
+        ordered_scores = sorted(histogram)
+
+        return {
+            'total_students': total,
+            'average_quiz_score': average,
+            'homework_completion_rate': sum(cell.homework_submitted for _, cell in cells) / total * 100,
+            'grade_distribution': sorted_counts(grade_distribution),
+            'class_distribution': sorted_counts(class_distribution),
+            'upcoming_quiz_count': len(quizzes),
+            'score_statistics': {
+                'min': ordered_scores[0] if ordered_scores else float('nan'),
+                'max': ordered_scores[-1] if ordered_scores else float('nan'),
+                'median': _histogram_median(histogram, ordered_scores, scored),
+                'std': std
+            }
+        }
+
+    def rollup(self, scope: Dict[str, List[str]], column: str) -> Dict[Any, Dict[str, Any]]:
+        """Per-grade, per-class or per-region totals within an admin scope"""
+        position = CELL_COLUMNS.index(column)
+        groups: Dict[Any, Dict[str, Any]] = {}
+        for key, cell in self._matching_cells(scope):
+            group = groups.setdefault(key[position], {'count': 0, 'score_count': 0, 'score_sum': 0.0,
+                                                      'homework_submitted': 0})
+            group['count'] += cell.count
+            group['score_count'] += cell.score_count
+            group['score_sum'] += cell.score_sum
+            group['homework_submitted'] += cell.homework_submitted
+
+        return {
+            value: {
+                'total_students': group['count'],
+                'average_quiz_score': group['score_sum'] / group['score_count'] if group['score_count'] else float('nan'),
+                'homework_submitted': group['homework_submitted'],
+                'homework_completion_rate': group['homework_submitted'] / group['count'] * 100
+            } for value, group in groups.items()
+        }
+
+
+def _present(value: Any) -> bool:
+    return value is not None and not (isinstance(value, float) and math.isnan(value)) and value is not pd.NA
+
+
+def _to_python(value: Any) -> Any:
+    """NumPy scalar -> plain Python number so histogram keys compare across sources"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _bump(counts: Dict[Any, int], key: Any, sign: int):
+    remaining = counts.get(key, 0) + sign
+    if remaining:
+        counts[key] = remaining
+    else:
+        counts.pop(key, None)
+
+
+def sorted_counts(counts: Dict[Any, int]) -> Dict[Any, int]:
+    """Order a count dict by descending count, like value_counts"""
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+
+def _histogram_median(histogram: Dict[Any, int], ordered_scores: List[Any], scored: int) -> float:
+    """Median of the scores described by a histogram"""
+    if not scored:
+        return float('nan')
+    lower_rank, upper_rank = (scored - 1) // 2, scored // 2
+    lower: Optional[Any] = None
+    seen = 0
+    for score in ordered_scores:
+        seen += histogram[score]
+        if lower is None and seen > lower_rank:
+            lower = score
+        if seen > upper_rank:
+            return (lower + score) / 2
+    return float('nan')
@@ -0,0 +1,181 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from response_cache import normalize_query
+
+EMBEDDING_DIMS = 1024
+
+# Words that carry no meaning for matching questions
+STOPWORDS = frozenset(
+    "a an the me my our us we i you show list give tell get find display please can could would "
+    "who whom which what whose how is are was were be been has have had do does did doing s "
+    "of for in on to with by from their them they there that this these those all any yet so and or".split())
+
+# Domain paraphrases folded onto one canonical token
+SYNONYMS = {
+    "pupils": "students", "pupil": "students", "kids": "students", "learners": "students",
+    "student": "students", "turned": "submitted", "handed": "submitted", "hand": "submitted",
+    "submit": "submitted", "submission": "submitted", "submissions": "submitted",
+    "assignment": "homework", "assignments": "homework",
+    "test": "quiz", "tests": "quiz", "exam": "quiz", "exams": "quiz", "quizzes": "quiz",
+    "marks": "score", "mark": "score", "results": "score", "grades": "score",
+    "mean": "average", "avg": "average", "percentage": "rate", "percent": "rate", "number": "count",
+    "maximum": "max", "minimum": "min",
+    "top": "best", "highest": "best", "strongest": "best",
+    "lowest": "worst", "weakest": "worst", "bottom": "worst",
+}
+PHRASES = {"coming up": "upcoming", "turned in": "submitted", "handed in": "submitted",
+           "hand in": "submitted", "next week": "upcoming", "how many": "count"}
+# Common for every question about the roster, so it barely distinguishes them
+LOW_WEIGHT_WORDS = {"students": 0.3, "class": 0.5}
+_SUFFIXES = ("ance", "ing", "ed", "es", "s")
+
+# Tokens that change the answer, not just the phrasing: a cached answer is only reused
+# when both questions agree on all of them
+NEGATIONS = frozenset("not no never without missing hasn haven didn isn aren t".split())
+DIRECTIONS = {"below": "low", "under": "low", "less": "low", "worst": "low",
+              "above": "high", "over": "high", "more": "high", "best": "high"}
+QUALIFIERS = frozenset("average median max min count rate deviation total late early".split())
+_ENTITY_PATTERN = re.compile(r"^(\d+[a-z]?|\d{4}-\d{2}-\d{2})$")
+
+
+def _tokens(query: str) -> List[str]:
+    normalized = normalize_query(query)
+    for phrase, replacement in PHRASES.items():
+        normalized = normalized.replace(phrase, replacement)
+    return [SYNONYMS.get(token, token) for token in normalized.split()]
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so scored/scores/scoring share features"""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def query_signature(query: str) -> Tuple:
+    """Numbers, class codes, negation, direction and aggregate words that must match exactly"""
+    tokens = _tokens(query)
+    return (
+        tuple(sorted(token for token in tokens if _ENTITY_PATTERN.match(token))),
+        any(token in NEGATIONS for token in tokens),
+        tuple(sorted({DIRECTIONS[token] for token in tokens if token in DIRECTIONS})),
+        tuple(sorted({token for token in tokens if token in QUALIFIERS}))
+    )
+
+
+def embed_query(query: str, dims: int = EMBEDDING_DIMS) -> np.ndarray:
+    """Unit vector of hashed word unigrams, bigrams and character trigrams.
+
+    Runs offline on CPU; crc32 keeps the hashing stable across processes.
+    """
+    tokens = [token for token in _tokens(query) if token not in STOPWORDS and token not in NEGATIONS]
+    weights = [LOW_WEIGHT_WORDS.get(token, 1.0) for token in tokens]
+    words = [_stem(token) for token in tokens]
+    features: List[Tuple[str, float]] = list(zip(words, weights))
+    # Unordered pairs, so "class 8A performance" matches "performance of class 8A"
+    features += [(" ".join(sorted(pair)), 0.5) for pair in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [(padded[i:i + 3], 0.2) for i in range(len(padded) - 2)]
+
+    vector = np.zeros(dims, dtype=np.float32)
+    for feature, weight in features:
+        vector[zlib.crc32(feature.encode('utf-8')) % dims] += weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Partition:
+    """Answered queries for one (scope, data version)"""
+    __slots__ = ('vectors', 'signatures', 'queries', 'responses')
+
+    def __init__(self, dims: int):
+        self.vectors = np.empty((0, dims), dtype=np.float32)
+        self.signatures: List[Tuple] = []
+        self.queries: List[str] = []
+        self.responses: List[str] = []
+
+
+class SemanticCache:
+    """Serves answers to near-duplicate questions by embedding similarity.
+
+    Entries are partitioned by admin scope and data fingerprint, so a lookup only
+    compares against answers computed from the same rows. A hit needs cosine
+    similarity >= threshold and an identical query_signature.
+    """
+
+    def __init__(self, threshold: float = 0.7, max_entries: int = 2048, dims: int = EMBEDDING_DIMS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dims = dims
+        self.hits = 0
+        self.misses = 0
+        self._partitions: "OrderedDict[Tuple, _Partition]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _partition_key(scope: Dict[str, List[str]], data_version: Any) -> Tuple:
+        return (tuple((key, tuple(sorted(values))) for key, values in sorted(scope.items())), str(data_version))
+
+    def lookup(self, query: str, scope: Dict[str, List[str]], data_version: Any) -> Optional[Tuple[str, float]]:
+        """(response, similarity) of the closest cached question, or None"""
+        vector = embed_query(query, self.dims)
+        signature = query_signature(query)
+        with self._lock:
+            partition = self._partitions.get(self._partition_key(scope, data_version))
+            if partition is not None and partition.responses:
+                similarities = partition.vectors @ vector
+                for index in np.argsort(similarities)[::-1]:
+                    if similarities[index] < self.threshold:
+                        break
+                    if partition.signatures[index] == signature:
+                        self.hits += 1
+                        return partition.responses[index], float(similarities[index])
+            self.misses += 1
+            return None
+
+    def put(self, query: str, scope: Dict[str, List[str]], data_version: Any, response: str):
+        """Remember the answer to a question"""
+        vector = embed_query(query, self.dims)
+        key = self._partition_key(scope, data_version)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = _Partition(self.dims)
+            self._partitions.move_to_end(key)
+            partition.vectors = np.vstack([partition.vectors, vector])
+            partition.signatures.append(query_signature(query))
+            partition.queries.append(query)
+            partition.responses.append(response)
+            self._size += 1
+            # Evict whole least-recently-used partitions; old data versions go first
+            while self._size > self.max_entries and len(self._partitions) > 1:
+                _, evicted = self._partitions.popitem(last=False)
+                self._size -= len(evicted.responses)
+            if self._size > self.max_entries:
+                overflow = self._size - self.max_entries
+                partition.vectors = partition.vectors[overflow:]
+                del partition.signatures[:overflow], partition.queries[:overflow], partition.responses[:overflow]
+                self._size -= overflow
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,302 @@
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from student_schema import apply_student_schema
+
+# SQLite column types for students_data.json fields; anything else is stored as TEXT
+COLUMN_TYPES = {
+    'quiz_score': 'INTEGER',
+    'homework_submitted': 'INTEGER'
+}
+# Scope/score columns for pushed-down filters; student_id for single-record upserts and deletes
+INDEXED_COLUMNS = ['grade', 'class', 'region', 'quiz_score', 'student_id']
+# Records per insert batch while streaming an import
+IMPORT_BATCH_ROWS = 5_000
+# Characters read from the source file at a time
+IMPORT_READ_CHARS = 1 << 16
+_ITEM_END = re.compile(r'\s*[,\]]')
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a column/table name for SQLite"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteStore:
+    """Local SQLite copy of the student data with indexes on the scope and score columns.
+    
+    Each import fills a new table and then makes it current in one transaction, so a
+    store (and the snapshot holding it) keeps reading the table it was opened on while
+    a reload runs. A view named after base_name always shows the current table.
+    """
+
+    def __init__(self, db_path: str, base_name: str = 'students'):
+        self.db_path = db_path
+        self.base_name = base_name
+        self.columns: List[str] = []
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        with self._write_lock:
+            connection = self.connection()
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.commit()
+        self.table_name = self._get_meta('table') or base_name
+        self._load_columns()
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path)
+            self._local.connection = connection
+        return connection
+
+    def _load_columns(self):
+        rows = self.connection().execute(f"PRAGMA table_info({quote_identifier(self.table_name)})").fetchall()
+        self.columns = [row[1] for row in rows]
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.connection().execute("SELECT value FROM _meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def revision(self) -> int:
+        """Number of writes to the table, stored in the database: survives restarts and is
+        shared by every process using the file"""
+        value = self._get_meta('revision')
+        return int(value) if value else 0
+
+    @staticmethod
+    def _bump_revision(connection: sqlite3.Connection):
+        """Count a write; call inside the write's transaction"""
+        connection.execute("INSERT INTO _meta (key, value) VALUES ('revision', '1') "
+                           "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def _on_table(self, table_name: str) -> 'SQLiteStore':
+        """This store, or one sharing its connections that reads another table"""
+        if table_name == self.table_name:
+            return self
+        store = copy.copy(self)
+        store.table_name = table_name
+        store._load_columns()
+        return store
+
+    def import_json(self, json_path: str) -> 'SQLiteStore':
+        """Load students_data.json into SQLite unless the same file version is already imported.
+        
+        Returns the store to read the imported data from. Records are streamed into a
+        staging table in batches, which becomes current in one short transaction;
+        this store keeps reading its own table, for requests still using it.
+        """
+        stat = os.stat(json_path)
+        source_version = f"{os.path.abspath(json_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        current = self._get_meta('table') or self.base_name
+        if self._get_meta('source_version') == source_version and self._on_table(current).columns:
+            return self._on_table(current)
+
+        staging = f"{self.base_name}__{uuid.uuid4().hex[:12]}"
+        connection = self.connection()
+        try:
+            columns = self._fill_table(connection, staging, _iter_json_array(json_path))
+            with connection:
+                for column in INDEXED_COLUMNS:
+                    if column in columns:
+                        connection.execute(f"CREATE INDEX {quote_identifier(f'idx_{staging}_{column}')} "
+                                           f"ON {quote_identifier(staging)} ({quote_identifier(column)})")
+            with self._write_lock, connection:
+                # The switch is one write transaction, so no reader sees it half done
+                connection.execute("BEGIN IMMEDIATE")
+                # Another process may have imported the same file meanwhile
+                if self._get_meta('source_version') == source_version:
+                    connection.execute(f"DROP TABLE {quote_identifier(staging)}")
+                    return self._on_table(self._get_meta('table') or self.base_name)
+                previous = self._get_meta('table') or self.base_name
+                connection.executemany("INSERT OR REPLACE INTO _meta (key, value) VALUES (?, ?)",
+                                       [('table', staging), ('source_version', source_version)])
+                self._bump_revision(connection)
+                # Keep the previous table for requests still reading it; older ones go
+                legacy_kept = False
+                for name, kind in connection.execute(
+                        "SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view') AND "
+                        "(name = ? OR substr(name, 1, ?) = ?)",
+                        (self.base_name, len(self.base_name) + 2, self.base_name + '__')).fetchall():
+                    if name not in (staging, previous) or kind == 'view':
+                        connection.execute(f"DROP {kind.upper()} {quote_identifier(name)}")
+                    elif name == self.base_name:
+                        legacy_kept = True
+                # A table from before generations were used keeps the name until the next import
+                if not legacy_kept:
+                    connection.execute(f"CREATE VIEW {quote_identifier(self.base_name)} AS "
+                                       f"SELECT * FROM {quote_identifier(staging)}")
+        except BaseException:
+            with connection:
+                connection.execute(f"DROP TABLE IF EXISTS {quote_identifier(staging)}")
+            raise
+        return self._on_table(staging)
+
+    @staticmethod
+    def _fill_table(connection: sqlite3.Connection, table_name: str, records: Iterator[Dict[str, Any]]) -> List[str]:
+        """Create a table and insert records in batches, adding columns as new fields appear"""
+        table = quote_identifier(table_name)
+        columns: List[str] = []
+        batch: List[Dict[str, Any]] = []
+
+        def flush():
+            new_columns = []
+            for record in batch:
+                for key in record:
+                    if key not in columns and key not in new_columns:
+                        new_columns.append(key)
+            if not columns and not new_columns:
+                # Empty file: still create a table to query
+                new_columns.append('student_id')
+            with connection:
+                if not columns:
+                    column_defs = ", ".join(f"{quote_identifier(c)} {COLUMN_TYPES.get(c, 'TEXT')}"
+                                            for c in new_columns)
+                    connection.execute(f"CREATE TABLE {table} ({column_defs})")
+                else:
+                    for column in new_columns:
+                        connection.execute(f"ALTER TABLE {table} ADD COLUMN "
+                                           f"{quote_identifier(column)} {COLUMN_TYPES.get(column, 'TEXT')}")
+                columns.extend(new_columns)
+                if batch:
+                    connection.executemany(
+                        f"INSERT INTO {table} ({', '.join(quote_identifier(c) for c in columns)}) "
+                        f"VALUES ({', '.join('?' for _ in columns)})",
+                        ([_to_sql_value(record.get(column)) for column in columns] for record in batch))
+            batch.clear()
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= IMPORT_BATCH_ROWS:
+                flush()
+        if batch or not columns:
+            flush()
+        return columns
+
+    def upsert_record(self, record: Dict[str, Any]):
+        """Update the row with the record's student_id, or insert it if missing"""
+        table = quote_identifier(self.table_name)
+        columns = [c for c in record if c in self.columns and c != 'student_id']
+        values = [_to_sql_value(record[c]) for c in columns]
+        with self._write_lock:
+            connection = self.connection()
+            with connection:
+                updated = 0
+                if columns:
+                    assignments = ", ".join(f"{quote_identifier(c)} = ?" for c in columns)
+                    updated = connection.execute(f"UPDATE {table} SET {assignments} WHERE student_id = ?",
+                                                 values + [record['student_id']]).rowcount
+                else:
+                    updated = connection.execute(f"SELECT COUNT(*) FROM {table} WHERE student_id = ?",
+                                                 (record['student_id'],)).fetchone()[0]
+                if not updated:
+                    insert_columns = ['student_id'] + columns
+                    connection.execute(
+                        f"INSERT INTO {table} ({', '.join(quote_identifier(c) for c in insert_columns)}) "
+                        f"VALUES ({', '.join('?' for _ in insert_columns)})",
+                        [record['student_id']] + values)
+                self._bump_revision(connection)
+
+    def delete_record(self, student_id: str) -> bool:
+        """Delete a student's row. Returns False if no row matched."""
+        with self._write_lock:
+            connection = self.connection()
+            with connection:
+                deleted = connection.execute(f"DELETE FROM {quote_identifier(self.table_name)} WHERE student_id = ?",
+                                             (student_id,)).rowcount
+                if deleted:
+                    self._bump_revision(connection)
+        return deleted > 0
+
+    def read_frame(self, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        """Run a query and return the rows with the typed student schema applied"""
+        students_df = pd.read_sql_query(sql, self.connection(), params=list(params))
+        if '_row' in students_df.columns:
+            # rowid - 1 matches the record position in the source JSON, like the pandas backends
+            students_df = students_df.set_index('_row')
+            students_df.index.name = None
+        return apply_student_schema(students_df)
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """Run a query and return raw rows"""
+        return self.connection().execute(sql, list(params)).fetchall()
+
+    def __len__(self) -> int:
+        return self.fetchall(f"SELECT COUNT(*) FROM {quote_identifier(self.table_name)}")[0][0]
+
+    def to_pandas(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read whole columns into pandas (used only when a caller asks for the full frame)"""
+        columns = self.columns if columns is None else [c for c in columns if c in self.columns]
+        column_list = ", ".join(["rowid - 1 AS _row"] + [quote_identifier(c) for c in columns])
+        return self.read_frame(f"SELECT {column_list} FROM {quote_identifier(self.table_name)} ORDER BY rowid")
+
+
+def _iter_json_array(path: str) -> Iterator[Any]:
+    """Items of a file holding one JSON array, decoded one at a time so the whole
+    document is never in memory"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position, eof = '', 0, False
+
+        def next_char() -> str:
+            # Next non-whitespace character, reading more as needed; '' at end of file
+            nonlocal buffer, position, eof
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if eof or position < len(buffer):
+                    return buffer[position] if position < len(buffer) else ''
+                chunk = f.read(IMPORT_READ_CHARS)
+                buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+
+        if next_char() != '[':
+            raise ValueError(f"{path}: expected a JSON array")
+        position += 1
+        char = next_char()
+        while char != ']':
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    # Only trust the item once its separator is in view; a number cut by the
+                    # read boundary still decodes
+                    if eof or _ITEM_END.match(buffer, end):
+                        position = end
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                # The item is longer than the buffer
+                chunk = f.read(IMPORT_READ_CHARS)
+                buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            yield item
+            char = next_char()
+            if char == ',':
+                position += 1
+                char = next_char()
+                if char == ']':
+                    raise ValueError(f"{path}: trailing ',' in JSON array")
+            elif char != ']':
+                raise ValueError(f"{path}: expected ',' or ']' after array item")
+        position += 1
+        if next_char():
+            raise ValueError(f"{path}: extra data after the JSON array")
+
+
+def _to_sql_value(value: Any) -> Any:
+    """Convert JSON values to types sqlite3 can bind"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
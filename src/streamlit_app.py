@@ -1,6 +1,8 @@
 import streamlit as st
 import os
+import io
 import json
+import uuid
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
@@ -9,7 +11,15 @@ from streamlit_option_menu import option_menu
 from streamlit_chat import message
 import pandas as pd
 from data_manager import DataManager
+from dashboard_metrics import DASHBOARD_COLUMNS, dashboard_metrics
+from admin_registry import AdminRegistry
+from conversation_store import ConversationStore
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+from stub_llm import make_stub_llm
 from ai_query_engine import AIQueryEngine
+from prompt_budget import DEFAULT_PROMPT_BUDGET
+from tracing import tracer
 
 # Load environment variables
 load_dotenv()
@@ -97,24 +107,213 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
 if 'selected_admin' not in st.session_state:
     st.session_state.selected_admin = 'A001'
-if 'conversation_context' not in st.session_state:
-    st.session_state.conversation_context = []
 
 
+@st.cache_resource
+def get_admin_registry(admins_file: str) -> AdminRegistry:
+    """Process-wide admin registry shared across sessions and reruns"""
+    return AdminRegistry(admins_file)
+
+
+@st.cache_resource
+def get_data_manager(students_file: str, admins_file: str) -> DataManager:
+    """Process-wide DataManager; reloads in the background when data files change.
+
+    With DATA_SERVICE_URL set, returns a client for a shared data service instead,
+    so UI processes don't each hold a copy of the student data.
+    """
+    service_url = os.getenv("DATA_SERVICE_URL")
+    if service_url:
+        from data_service import DataServiceClient
+        return DataServiceClient(service_url)
+    return DataManager(
+        students_file=students_file,
+        admins_file=admins_file,
+        admin_registry=get_admin_registry(admins_file),
+        storage=os.getenv("DATA_STORAGE", "auto")
+    )
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Process-wide AI response cache; persisted when RESPONSE_CACHE_PATH is set"""
+    return ResponseCache(
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        db_path=os.getenv("RESPONSE_CACHE_PATH") or None
+    )
+
+
+@st.cache_resource
+def get_semantic_cache():
+    """Process-wide cache of AI answers matched by question similarity; 0 disables it"""
+    threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.7"))
+    return SemanticCache(threshold=threshold) if threshold > 0 else None
+
+
+@st.cache_resource
+def get_conversation_store() -> ConversationStore:
+    """Process-wide conversation store; persisted to SQLite when CONVERSATION_DB_PATH is set"""
+    return ConversationStore(
+        max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", "50")),
+        db_path=os.getenv("CONVERSATION_DB_PATH") or None
+    )
+
+
+def get_session_id():
+    """Stable id of this browser session, kept in the URL so reloads and restarts resume the conversation"""
+    if "session" not in st.query_params:
+        st.query_params["session"] = uuid.uuid4().hex
+    return st.query_params["session"]
+
+
+def record_answer(ai_engine, response):
+    """Attach the answer and the first page of its table to the turn the engine just recorded"""
+    if ai_engine.last_turn is not None:
+        ai_engine.conversation_store.set_response(
+            ai_engine.last_turn, response, ai_engine.last_table.page() if ai_engine.last_table is not None else None)
+
+
+def render_earlier_turns(conversation_store, admin_id, session_id, before_id):
+    """Older questions, read from the store one page at a time and only when asked for"""
+    pages_key = f"history_pages_{admin_id}"
+    if not st.toggle("📜 Show earlier questions", key=f"show_history_{admin_id}"):
+        st.session_state.pop(pages_key, None)
+        return
+    pages = st.session_state.setdefault(pages_key, 1)
+    turns = conversation_store.history(admin_id, session_id, before_id=before_id, limit=20 * pages)
+    for turn in turns:
+        st.markdown(f"**{datetime.fromtimestamp(turn.timestamp).strftime('%Y-%m-%d %H:%M')}** · {turn.query}")
+        if turn.response:
+            st.caption(turn.response[:300] + ("…" if len(turn.response) > 300 else ""))
+    if len(turns) == 20 * pages and st.button("Load older", key=f"load_older_{admin_id}"):
+        st.session_state[pages_key] = pages + 1
+        st.rerun()
+
+
+@tracer.traced("ui.chat_request")
+def stream_ai_response(ai_engine, data_manager, admin_id, query):
+    """Show the AI answer as it streams in and return the final response text"""
+    placeholder = st.empty()
+    placeholder.info("🤖 Processing your question...")
+    partial = ""
+    response = ""
+    for event in ai_engine.stream_query(data_manager, admin_id, query):
+        if event["type"] == "final":
+            response = event["text"]
+        elif event["type"] == "step":
+            partial += f"\n\n`{event['text']}`\n\n"
+            placeholder.markdown(partial + "▌")
+        else:
+            partial += event["text"]
+            placeholder.markdown(partial + "▌")
+    placeholder.empty()
+    return response
+
+
+def render_student_table(data_manager, admin_id, key, columns, headers, filters=None):
+    """Paged student table: search, sort and paging run server-side and only the
+    visible page is sent to the browser"""
+    labels = dict(zip(columns, headers))
+    control_cols = st.columns([2, 2, 1, 1])
+    with control_cols[0]:
+        search = st.text_input("Search by name:", key=f"{key}_search")
+    with control_cols[1]:
+        sort_by = st.selectbox("Sort by:", columns, format_func=labels.get, key=f"{key}_sort")
+    with control_cols[2]:
+        ascending = st.radio("Order:", ["Asc", "Desc"], horizontal=True, key=f"{key}_order") == "Asc"
+    with control_cols[3]:
+        page_size = st.selectbox("Rows per page:", [25, 50, 100, 250], index=1, key=f"{key}_size")
+
+    def fetch_page(page_number):
+        return data_manager.get_student_page(
+            admin_id, columns, filters=filters, search=search or None, sort_by=sort_by,
+            ascending=ascending, offset=(page_number - 1) * page_size, limit=page_size
+        )
+
+    # The page widget is drawn below the table, so read its value from session state first
+    page_key = f"{key}_page"
+    page_number = st.session_state.get(page_key, 1)
+    page, total = fetch_page(page_number)
+    page_count = max(1, -(-total // page_size))
+    if page_number > page_count:
+        page_number = st.session_state[page_key] = page_count
+        page, total = fetch_page(page_number)
+
+    st.dataframe(page.set_axis(headers, axis=1), use_container_width=True, hide_index=True)
+    nav_col, info_col = st.columns([1, 3])
+    with nav_col:
+        st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, step=1, key=page_key)
+    with info_col:
+        first_row = (page_number - 1) * page_size + 1 if total else 0
+        st.caption(f"Showing {first_row}-{first_row + len(page) - 1 if total else 0} of {total} students")
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def compute_dashboard_metrics(_data_manager, admin_id, scope_key, data_fingerprint):
+    """Dashboard numbers for an admin in one pass over the scoped rows.
+
+    Cached per (admin, scope, data fingerprint), so reruns from page switches or
+    chat input reuse the result until the data or the admin's scope changes.
+    """
+    return dashboard_metrics(_data_manager.filter_data_by_scope(admin_id, DASHBOARD_COLUMNS))
+
+
+EXPORT_MIME_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def render_export_controls(data_manager, admin_id, key, file_prefix, filters=None):
+    """Export picker. The file is generated only when requested, streamed into an
+    in-memory buffer in row chunks, and then offered for download.
+
+    st.download_button keeps the payload in memory to serve it anyway, so no
+    temporary file is written that could outlive the session.
+    """
+    format_col, prepare_col, download_col = st.columns(3)
+    with format_col:
+        export_format = st.selectbox("Export format:", list(EXPORT_MIME_TYPES), format_func=str.upper,
+                                     key=f"{key}_format")
+    with prepare_col:
+        if st.button("📦 Prepare Export", key=f"{key}_prepare", use_container_width=True):
+            # Drop the previous export before building the next one
+            st.session_state.pop(key, None)
+            buffer = io.BytesIO()
+            data_manager.write_export(admin_id, buffer, export_format, filters=filters)
+            st.session_state[key] = {"data": buffer.getvalue(), "format": export_format, "filters": filters}
+
+    export = st.session_state.get(key)
+    if export and export["format"] == export_format and export["filters"] == filters:
+        with download_col:
+            st.download_button(
+                label=f"💾 Download {export_format.upper()}",
+                data=export["data"],
+                file_name=f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.{export_format}",
+                mime=EXPORT_MIME_TYPES[export_format],
+                key=f"{key}_download",
+                use_container_width=True
+            )
+
+
+@tracer.traced("ui.dashboard")
 def create_analytics_dashboard(data_manager, admin_id):
     """Create analytics dashboard with real metrics from admin's scope only"""
-    filtered_data = data_manager.filter_data_by_scope(admin_id)
+    metrics = compute_dashboard_metrics(
+        data_manager, admin_id,
+        json.dumps(data_manager.get_admin_scope(admin_id), sort_keys=True),
+        data_manager.data_fingerprint
+    )
     
-    if filtered_data.empty:
+    if metrics is None:
         st.warning("No data available for your scope")
         return
     
     # Responsive metrics layout
-    if len(filtered_data) > 0:
+    if metrics['total_students'] > 0:
         # Use 2 columns on mobile, 4 on desktop
         try:
             # Check if mobile by screen width (approximate)
@@ -132,7 +331,7 @@ def create_analytics_dashboard(data_manager, admin_id):
             col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_students = len(filtered_data)
+        total_students = metrics['total_students']
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin: 0;">My Students</h3>
@@ -141,8 +340,7 @@ def create_analytics_dashboard(data_manager, admin_id):
         """, unsafe_allow_html=True)
     
     with col2:
-        homework_submitted = len(filtered_data[filtered_data['homework_submitted'] == True])
-        homework_rate = (homework_submitted / total_students * 100) if total_students > 0 else 0
+        homework_rate = metrics['homework_rate']
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin: 0;">Homework Rate</h3>
@@ -151,7 +349,7 @@ def create_analytics_dashboard(data_manager, admin_id):
         """, unsafe_allow_html=True)
     
     with col3:
-        avg_score = filtered_data['quiz_score'].mean()
+        avg_score = metrics['avg_score']
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin: 0;">Avg Quiz Score</h3>
@@ -160,7 +358,7 @@ def create_analytics_dashboard(data_manager, admin_id):
         """, unsafe_allow_html=True)
     
     with col4:
-        low_performers = len(filtered_data[filtered_data['quiz_score'] < 75])
+        low_performers = metrics['performance_bands'][2]
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #667eea; margin: 0;">Need Support</h3>
@@ -176,30 +374,21 @@ def create_analytics_dashboard(data_manager, admin_id):
     
     with col1:
         st.markdown("**Students by Performance Level**")
-        high_perf = len(filtered_data[filtered_data['quiz_score'] >= 85])
-        med_perf = len(filtered_data[(filtered_data['quiz_score'] >= 75) & (filtered_data['quiz_score'] < 85)])
-        low_perf = len(filtered_data[filtered_data['quiz_score'] < 75])
-        
         perf_data = pd.DataFrame({
             'Performance Level': ['High (85+)', 'Medium (75-84)', 'Low (<75)'],
-            'Count': [high_perf, med_perf, low_perf]
+            'Count': metrics['performance_bands']
         })
         st.dataframe(perf_data, use_container_width=True)
     
     with col2:
         st.markdown("**Homework Status by Class**")
-        homework_summary = filtered_data.groupby('class').agg({
-            'homework_submitted': ['sum', 'count']
-        }).round(1)
-        homework_summary.columns = ['Submitted', 'Total']
-        homework_summary['Rate %'] = (homework_summary['Submitted'] / homework_summary['Total'] * 100).round(1)
-        st.dataframe(homework_summary, use_container_width=True)
+        st.dataframe(metrics['homework_summary'], use_container_width=True)
     
     # Student list with action items
     st.markdown("### 📋 Student Details")
-    display_data = filtered_data[['student_name', 'class', 'quiz_score', 'homework_submitted']].copy()
-    display_data.columns = ['Student Name', 'Class', 'Quiz Score', 'Homework Done']
-    st.dataframe(display_data, use_container_width=True)
+    render_student_table(data_manager, admin_id, "student_details",
+                         ['student_name', 'class', 'quiz_score', 'homework_submitted'],
+                         ['Student Name', 'Class', 'Quiz Score', 'Homework Done'])
 
 
 def main():
@@ -241,21 +430,14 @@ def main():
             }
         )
 
+        tracer.annotate(page=selected_page)
         st.markdown("---")
 
-        # Load admin data from JSON
-        with open("../data/admin_roles.json", 'r') as f:
-            admin_json_data = json.load(f)
-        
-        admin_options = {admin["admin_id"]: admin["admin_name"] for admin in admin_json_data}
+        # Shared admin registry; only re-parses admin_roles.json when it changes on disk
+        admin_registry = get_admin_registry("../data/admin_roles.json")
+        admin_registry.refresh()
         
-        admin_details = {
-            admin["admin_id"]: {
-                "role": f"{', '.join(admin['access_scope']['grades'])} Coordinator",
-                "region": ', '.join(admin['access_scope']['regions']),
-                "classes": ', '.join(admin['access_scope']['classes'])
-            } for admin in admin_json_data
-        }
+        admin_options = admin_registry.get_admin_options()
         
         # Admin selection with access code
         st.markdown("**👤 Admin Profile**")
@@ -273,8 +455,7 @@ def main():
             st.caption("💡 Hint: Access code is 0000")
             
             if access_code:
-                admin_data = next((admin for admin in admin_json_data if admin['admin_id'] == selected_admin), None)
-                if admin_data and access_code == admin_data.get('access_code', ''):
+                if admin_registry.verify_access_code(selected_admin, access_code):
                     st.session_state.current_admin = selected_admin
                     st.success("✅ Access granted")
                 else:
@@ -285,7 +466,12 @@ def main():
                 st.stop()
 
         # Admin info card - only show own scope
-        admin_info = admin_details[selected_admin]
+        admin_scope = admin_registry.get_scope(selected_admin).to_dict()
+        admin_info = {
+            "role": f"{', '.join(admin_scope.get('grades', []))} Coordinator",
+            "region": ', '.join(admin_scope.get('regions', [])),
+            "classes": ', '.join(admin_scope.get('classes', []))
+        }
         st.markdown(f"""
         <div class="admin-card">
             <h4>{admin_options[selected_admin]}</h4>
@@ -299,17 +485,31 @@ def main():
 
     # Initialize components
     try:
-        data_manager = DataManager(
-            students_file="../data/students_data.json",
-            admins_file="../data/admin_roles.json"
-        )
+        data_manager = get_data_manager("../data/students_data.json", "../data/admin_roles.json")
+        data_manager.refresh()
 
+        # LLM_BACKEND=stub runs the assistant offline with a local streaming stub model
+        use_stub_llm = os.getenv("LLM_BACKEND", "openai") == "stub"
         api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        if not api_key and not use_stub_llm:
             st.error("⚠️ OpenAI API key not found. Please check your .env file.")
             return
 
-        ai_engine = AIQueryEngine(api_key)
+        # One engine per session (it holds the conversation context); the LLM client
+        # and pandas agents inside it are pooled per process
+        conversation_store = get_conversation_store()
+        session_id = get_session_id()
+        if 'ai_engine' not in st.session_state:
+            st.session_state.ai_engine = AIQueryEngine(
+                api_key or "stub",
+                response_cache=get_response_cache(),
+                semantic_cache=get_semantic_cache(),
+                llm=make_stub_llm() if use_stub_llm else None,
+                conversation_store=conversation_store,
+                session_id=session_id,
+                prompt_budget=int(os.getenv("PROMPT_BUDGET", DEFAULT_PROMPT_BUDGET))
+            )
+        ai_engine = st.session_state.ai_engine
 
         # Page content based on selection  
         if selected_page == "AI Assistant":
@@ -325,12 +525,7 @@ def main():
                         # Execute query immediately
                         with st.spinner("🤖 Processing..."):
                             response = ai_engine.execute_query(data_manager, selected_admin, action["query"])
-                            st.session_state.chat_history.append({
-                                "query": action["query"],
-                                "response": response,
-                                "admin": admin_options[selected_admin],
-                                "timestamp": datetime.now().strftime("%H:%M:%S")
-                            })
+                            record_answer(ai_engine, response)
                             st.rerun()
 
             st.markdown("---")
@@ -338,15 +533,26 @@ def main():
             # Chat interface
             st.markdown("**💬 Conversation with AI Assistant**")
 
-            # Display chat history with better formatting
-            if st.session_state.chat_history:
+            # Display chat history with better formatting; only the latest turns are rendered
+            recent_turns = conversation_store.recent(selected_admin, session_id, 3)
+            if recent_turns:
                 st.markdown("**💬 Recent Conversations:**")
-                for i, chat in enumerate(st.session_state.chat_history[-3:]):
-                    with st.expander(f"Q: {chat['query'][:50]}...", expanded=(i == len(st.session_state.chat_history[-3:])-1)):
-                        st.markdown(f"**Query:** {chat['query']}")
+                for i, turn in enumerate(recent_turns):
+                    with st.expander(f"Q: {turn.query[:50]}...", expanded=(i == len(recent_turns) - 1)):
+                        st.markdown(f"**Query:** {turn.query}")
                         # Format response for better display
-                        response = chat['response']
-                        if '**' in response and '=' in response:
+                        response = turn.response or "No response recorded."
+                        table = turn.table
+                        if table:
+                            # Structured answer: render the table natively
+                            st.markdown(f"**{table['title']}**")
+                            st.dataframe(pd.DataFrame(table['data'], columns=table['columns']),
+                                         use_container_width=True, hide_index=True)
+                            if table['rows'] < table['total_rows']:
+                                st.caption(f"Showing first {table['rows']} of {table['total_rows']} rows")
+                            if table['summary']:
+                                st.info(f"Summary: {table['summary']}")
+                        elif '**' in response and '=' in response:
                             # It's a formatted table response
                             lines = response.split('\n')
                             title_line = next(
@@ -382,8 +588,9 @@ def main():
                                 st.code(response)
                         else:
                             st.code(response)
-                        if 'timestamp' in chat:
-                            st.caption(f"Asked at {chat['timestamp']}")
+                        st.caption(f"Asked at {datetime.fromtimestamp(turn.timestamp).strftime('%H:%M:%S')}")
+                if conversation_store.count(selected_admin, session_id) > len(recent_turns):
+                    render_earlier_turns(conversation_store, selected_admin, session_id, recent_turns[0].turn_id)
 
             # Enhanced query input
             st.markdown("**🎯 Ask Your Question:**")
@@ -415,30 +622,25 @@ def main():
             with col1:
                 if st.button("🚀 Ask AI Assistant", type="primary", use_container_width=True):
                     if query:
-                        with st.spinner("🤖 Processing your question..."):
-                            response = ai_engine.execute_query(
-                                data_manager, selected_admin, query)
-
-                            # Add to chat history
-                            st.session_state.chat_history.append({
-                                "query": query,
-                                "response": response,
-                                "admin": admin_options[selected_admin],
-                                "timestamp": datetime.now().strftime("%H:%M:%S")
-                            })
-
-                            st.success("✅ Query processed successfully!")
-                            st.rerun()
+                        response = stream_ai_response(ai_engine, data_manager, selected_admin, query)
+
+                        # Add to chat history
+                        record_answer(ai_engine, response)
+
+                        st.success("✅ Query processed successfully!")
+                        st.rerun()
 
             with col2:
                 if st.button("🗑️ Clear Chat", use_container_width=True):
-                    st.session_state.chat_history = []
+                    ai_engine.reset_context(selected_admin)
                     st.rerun()
 
             with col3:
                 if st.button("💾 Export Chat", use_container_width=True):
-                    if st.session_state.chat_history:
-                        chat_df = pd.DataFrame(st.session_state.chat_history)
+                    if conversation_store.count(selected_admin, session_id):
+                        chat_df = pd.DataFrame(
+                            [{**turn.to_context(), "response": turn.response, "admin": admin_options[selected_admin]}
+                             for turn in conversation_store.iter_all(selected_admin, session_id)])
                         csv = chat_df.to_csv(index=False)
                         st.download_button(
                             label="Download CSV",
@@ -454,12 +656,7 @@ def main():
                         # Execute query immediately
                         with st.spinner("🤖 Processing..."):
                             response = ai_engine.execute_query(data_manager, selected_admin, example)
-                            st.session_state.chat_history.append({
-                                "query": example,
-                                "response": response,
-                                "admin": admin_options[selected_admin],
-                                "timestamp": datetime.now().strftime("%H:%M:%S")
-                            })
+                            record_answer(ai_engine, response)
                             st.rerun()
 
         elif selected_page == "My Students":
@@ -467,32 +664,14 @@ def main():
             create_analytics_dashboard(data_manager, selected_admin)
             
             # Export only admin's data
-            filtered_data = data_manager.filter_data_by_scope(selected_admin)
-            if not filtered_data.empty:
+            if data_manager.get_admin_scope(selected_admin):
                 st.markdown("### 💾 Export My Data")
-                col1, col2 = st.columns(2)
-                with col1:
-                    csv = filtered_data.to_csv(index=False)
-                    st.download_button(
-                        label="Download My Students (CSV)",
-                        data=csv,
-                        file_name=f"my_students_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
-                    )
-                
-                with col2:
-                    json_data = filtered_data.to_json(orient='records', indent=2)
-                    st.download_button(
-                        label="Download My Students (JSON)",
-                        data=json_data,
-                        file_name=f"my_students_{datetime.now().strftime('%Y%m%d')}.json",
-                        mime="application/json"
-                    )
+                render_export_controls(data_manager, selected_admin, "my_students_export", "my_students")
 
         elif selected_page == "Data Explorer":
             st.markdown("## 🗃️ Data Explorer")
 
-            filtered_data = data_manager.filter_data_by_scope(selected_admin)
+            filtered_data = data_manager.filter_data_by_scope(selected_admin, ['grade', 'class', 'region'])
 
             if not filtered_data.empty:
                 # Data summary
@@ -516,38 +695,22 @@ def main():
                         "Filter by Class:", ["All"] + list(filtered_data['class'].unique()))
 
                 # Apply filters
-                display_data = filtered_data.copy()
+                filters = {}
                 if selected_grade != "All":
-                    display_data = display_data[display_data['grade']
-                                                == selected_grade]
+                    filters['grade'] = selected_grade
                 if selected_class != "All":
-                    display_data = display_data[display_data['class']
-                                                == selected_class]
+                    filters['class'] = selected_class
 
                 # Data table
                 st.markdown("**📄 Student Data**")
-                st.dataframe(display_data, use_container_width=True)
+                render_student_table(data_manager, selected_admin, "data_explorer",
+                                     data_manager.columns,
+                                     [column.replace('_', ' ').title() for column in data_manager.columns],
+                                     filters=filters)
 
                 # Export options
-                col1, col2 = st.columns(2)
-                with col1:
-                    csv = display_data.to_csv(index=False)
-                    st.download_button(
-                        label="💾 Download as CSV",
-                        data=csv,
-                        file_name=f"student_data_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
-                    )
-
-                with col2:
-                    json_data = display_data.to_json(
-                        orient='records', indent=2)
-                    st.download_button(
-                        label="💾 Download as JSON",
-                        data=json_data,
-                        file_name=f"student_data_{datetime.now().strftime('%Y%m%d')}.json",
-                        mime="application/json"
-                    )
+                render_export_controls(data_manager, selected_admin, "data_explorer_export", "student_data",
+                                       filters=filters)
             else:
                 st.warning("⚠️ No data available for your access scope.")
 
@@ -570,7 +733,7 @@ def main():
                 st.write(
                     f"Session Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                 st.write(
-                    f"Total Queries: {len(st.session_state.chat_history)}")
+                    f"Total Queries: {conversation_store.count(selected_admin, session_id)}")
 
             with col2:
                 st.write(f"API Status: ✅ Connected")
@@ -583,8 +746,7 @@ def main():
             st.markdown("**🔧 Advanced Options**")
 
             if st.button("🔄 Reset All Data"):
-                st.session_state.chat_history = []
-                st.session_state.conversation_context = []
+                ai_engine.reset_context(selected_admin)
                 st.success("✅ All data has been reset!")
                 st.rerun()
 
@@ -592,21 +754,38 @@ def main():
                 report_data = {
                     "admin_id": selected_admin,
                     "admin_name": admin_options[selected_admin],
-                    "total_queries": len(st.session_state.chat_history),
-                    "accessible_students": len(data_manager.filter_data_by_scope(selected_admin)),
-                    "session_time": datetime.now().isoformat()
+                    "total_queries": conversation_store.count(selected_admin, session_id),
+                    "accessible_students": len(data_manager.filter_data_by_scope(selected_admin, ['student_id'])),
+                    "session_time": datetime.now().isoformat(),
+                    # Where request time goes: per-span totals and the latest request breakdowns
+                    "tracing": tracer.report()
                 }
 
                 st.json(report_data)
 
-                report_json = pd.DataFrame([report_data]).to_json(
-                    orient='records', indent=2)
-                st.download_button(
-                    label="💾 Download Report",
-                    data=report_json,
-                    file_name=f"system_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
+                report_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                report_col, prometheus_col, otlp_col = st.columns(3)
+                with report_col:
+                    st.download_button(
+                        label="💾 Download Report",
+                        data=json.dumps(report_data, indent=2, default=str),
+                        file_name=f"system_report_{report_stamp}.json",
+                        mime="application/json"
+                    )
+                with prometheus_col:
+                    st.download_button(
+                        label="📈 Prometheus Metrics",
+                        data=tracer.to_prometheus(),
+                        file_name=f"metrics_{report_stamp}.prom",
+                        mime="text/plain"
+                    )
+                with otlp_col:
+                    st.download_button(
+                        label="🧭 OpenTelemetry Traces",
+                        data=json.dumps(tracer.to_otlp_json()),
+                        file_name=f"traces_{report_stamp}.json",
+                        mime="application/json"
+                    )
 
     except Exception as e:
         st.error(f"❌ Error initializing application: {str(e)}")
@@ -634,5 +813,14 @@ def show_footer():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        # One trace per script run; chat requests and dashboard queries are spans inside it
+        with tracer.span("ui.main"):
+            main()
+    finally:
+        # Optional local exports, refreshed after every run
+        if os.getenv("TRACE_PROMETHEUS_FILE"):
+            tracer.write_prometheus(os.getenv("TRACE_PROMETHEUS_FILE"))
+        if os.getenv("TRACE_OTLP_FILE"):
+            tracer.write_otlp_json(os.getenv("TRACE_OTLP_FILE"))
     show_footer()
@@ -0,0 +1,16 @@
+from typing import List
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+DEFAULT_STUB_RESPONSES = [
+    "Thought: I can answer from the data summary.\n"
+    "Final Answer: This is a stub response generated locally without calling OpenAI."
+]
+
+
+def make_stub_llm(responses: List[str] = None, token_delay: float = 0.02) -> FakeListChatModel:
+    """Offline chat model that streams its canned responses one character at a time.
+
+    Responses use the ReAct "Final Answer:" format so the pandas agent accepts them.
+    Use it for local development and tests (LLM_BACKEND=stub) without an API key.
+    """
+    return FakeListChatModel(responses=responses or DEFAULT_STUB_RESPONSES, sleep=token_delay)
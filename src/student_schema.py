@@ -0,0 +1,36 @@
+import pandas as pd
+
+# Compact dtypes for students_data.json columns. Low-cardinality strings become
+# categoricals so scope filters compare small integer codes instead of Python strings.
+CATEGORICAL_COLUMNS = ['grade', 'class', 'region', 'upcoming_quiz', 'performance_week']
+DATE_COLUMNS = ['homework_date', 'quiz_date', 'upcoming_quiz_date']
+STRING_COLUMNS = ['student_id', 'student_name']
+SCORE_COLUMN = 'quiz_score'
+BOOL_COLUMN = 'homework_submitted'
+
+
+def apply_student_schema(students_df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of the students frame with the compact typed schema applied"""
+    typed = {}
+    for column in students_df.columns:
+        series = students_df[column]
+        if column in CATEGORICAL_COLUMNS:
+            typed[column] = series.astype('category')
+        elif column in DATE_COLUMNS:
+            typed[column] = pd.to_datetime(series, errors='coerce')
+        elif column == SCORE_COLUMN:
+            typed[column] = _compact_score(series)
+        elif column == BOOL_COLUMN:
+            typed[column] = series.fillna(False).astype(bool)
+        else:
+            typed[column] = series
+    return pd.DataFrame(typed, index=students_df.index)
+
+
+def _compact_score(series: pd.Series) -> pd.Series:
+    """Smallest integer dtype that holds the scores; nullable Int16 if any are missing"""
+    scores = pd.to_numeric(series, errors='coerce')
+    if scores.isna().any():
+        return scores.round().astype('Int16')
+    return pd.to_numeric(scores.round().astype('int64'), downcast='integer')
+
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Rows rendered into a text answer; the full result stays available through TableResult
+DEFAULT_TEXT_ROWS = 50
+DEFAULT_PAGE_ROWS = 100
+
+
+@lru_cache(maxsize=256)
+def display_name(column: str) -> str:
+    """'quiz_score' -> 'Quiz Score'"""
+    return column.replace('_', ' ').title()
+
+
+@dataclass
+class TableResult:
+    """A tabular answer: a reference to the result rows plus title and summary.
+
+    Nothing is copied up front; text and pages are built from slices on demand.
+    """
+    title: str
+    frame: pd.DataFrame
+    summary: Optional[str] = None
+
+    @property
+    def total_rows(self) -> int:
+        return len(self.frame)
+
+    @property
+    def headers(self) -> List[str]:
+        return [display_name(column) for column in self.frame.columns]
+
+    def page(self, offset: int = 0, limit: int = DEFAULT_PAGE_ROWS) -> Dict[str, Any]:
+        """One page as column arrays with display headers and paging metadata"""
+        rows = self.frame.iloc[offset:offset + limit]
+        return {
+            'title': self.title,
+            'summary': self.summary,
+            'columns': self.headers,
+            'data': {header: rows[column].tolist() for header, column in zip(self.headers, self.frame.columns)},
+            'offset': offset,
+            'rows': len(rows),
+            'total_rows': self.total_rows
+        }
+
+    def to_text(self, max_rows: int = DEFAULT_TEXT_ROWS) -> str:
+        """Preformatted text with at most max_rows rows and a count of the rest"""
+        if self.frame.empty:
+            return f"{self.title}: No data found"
+
+        # Only the visible slice gets display headers
+        shown = self.frame.iloc[:max_rows].set_axis(self.headers, axis=1)
+        table_str = shown.to_string(index=False, justify='left')
+        response_parts = [f"** {self.title} **", "=" * (len(self.title) + 6), table_str]
+        if len(shown) < self.total_rows:
+            response_parts.append(f"... showing first {len(shown)} of {self.total_rows} rows")
+
+        if self.summary:
+            response_parts.extend(["", f"Summary: {self.summary}"])
+
+        return "\n".join(response_parts)
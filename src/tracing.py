@@ -0,0 +1,327 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Numeric span attributes summed into Prometheus counters
+COUNTED_ATTRIBUTES = ('rows_in', 'rows_out', 'prompt_tokens', 'llm_tokens', 'llm_prompt_tokens')
+METRIC_PREFIX = 'dumroo'
+SERVICE_NAME = 'dumroo-admin-panel'
+
+
+@dataclass
+class Span:
+    """One timed operation inside a request trace"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_unix_ns: int
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class _SpanStats:
+    __slots__ = ('count', 'total', 'max', 'buckets', 'hits', 'misses', 'errors', 'counters')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.counters = dict.fromkeys(COUNTED_ATTRIBUTES, 0)
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+
+
+def _new_id(length: int) -> str:
+    """Random hex id of `length` bytes (trace ids 16, span ids 8), as OpenTelemetry expects"""
+    return f"{random.getrandbits(length * 8):0{length * 2}x}"
+
+
+def _row_count(result: Any) -> Optional[int]:
+    """Rows in a DataFrame result or a (DataFrame, total) page"""
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], pd.DataFrame):
+        return len(result[0])
+    return None
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    """Records nested spans per request, plus per-span-name aggregates.
+
+    A span opened with no span active starts a new trace; spans opened inside it
+    (in the same thread, an asyncio task or a context copied into a worker thread)
+    join that trace. Finished traces are kept in a bounded ring for reports and
+    OpenTelemetry export; aggregates feed the Prometheus export.
+    """
+
+    def __init__(self, max_traces: int = 200, enabled: bool = True):
+        self.enabled = enabled
+        self._traces: "deque[List[Span]]" = deque(maxlen=max_traces)
+        self._stats: Dict[str, _SpanStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Time the enclosed block as a span; yields it (None when disabled) for annotation"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        trace = _current_trace.get()
+        root = trace is None
+        if root:
+            trace = []
+        span = Span(name, parent.trace_id if parent else _new_id(16), _new_id(8),
+                    parent.span_id if parent else None, time.time_ns(), attributes=attributes)
+        span_token = _current_span.set(span)
+        trace_token = _current_trace.set(trace) if root else None
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            # Only real failures; control flow like GeneratorExit or a UI rerun is not an error
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            try:
+                _current_span.reset(span_token)
+                if root:
+                    _current_trace.reset(trace_token)
+            except ValueError:
+                pass  # a generator span finalized from another context
+            trace.append(span)
+            self._record(span, trace if root else None)
+
+    def annotate(self, **attributes):
+        """Set attributes on the innermost active span, if any"""
+        span = _current_span.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    def traced(self, name: str = None) -> Callable:
+        """Decorator running a function in a span; DataFrame results set rows_out.
+
+        Coroutine functions are timed until they finish and generator functions
+        until they are exhausted or closed.
+        """
+        def decorator(function: Callable) -> Callable:
+            span_name = name or function.__qualname__
+
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            if inspect.isgeneratorfunction(function):
+                @functools.wraps(function)
+                def generator_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return (yield from function(*args, **kwargs))
+                return generator_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.span(span_name) as span:
+                    result = function(*args, **kwargs)
+                    rows = _row_count(result)
+                    if rows is not None:
+                        span.attributes['rows_out'] = rows
+                    return result
+            return wrapper
+        return decorator
+
+    def _record(self, span: Span, finished_trace: Optional[List[Span]]):
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = _SpanStats()
+            stats.count += 1
+            stats.total += span.duration
+            stats.max = max(stats.max, span.duration)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    stats.buckets[i] += 1
+            attributes = span.attributes
+            if 'cache_hit' in attributes:
+                if attributes['cache_hit']:
+                    stats.hits += 1
+                else:
+                    stats.misses += 1
+            if 'error' in attributes:
+                stats.errors += 1
+            for attribute in COUNTED_ATTRIBUTES:
+                value = attributes.get(attribute)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stats.counters[attribute] += value
+            if finished_trace is not None:
+                self._traces.append(finished_trace)
+
+    def reset(self):
+        with self._lock:
+            self._traces.clear()
+            self._stats.clear()
+
+    def recent_traces(self, limit: int = 10) -> List[List[Span]]:
+        """Most recent finished traces, newest first; spans in completion order"""
+        with self._lock:
+            return list(self._traces)[::-1][:limit]
+
+    def report(self, recent: int = 5) -> Dict[str, Any]:
+        """Per-span aggregates and a breakdown of the most recent requests"""
+        with self._lock:
+            spans = {}
+            for name, stats in sorted(self._stats.items(), key=lambda item: -item[1].total):
+                entry = {
+                    'count': stats.count,
+                    'total_ms': round(stats.total * 1000, 3),
+                    'mean_ms': round(stats.total / stats.count * 1000, 3),
+                    'max_ms': round(stats.max * 1000, 3)
+                }
+                if stats.hits or stats.misses:
+                    entry['cache_hit_rate'] = round(stats.hits / (stats.hits + stats.misses), 3)
+                if stats.errors:
+                    entry['errors'] = stats.errors
+                entry.update({attribute: value for attribute, value in stats.counters.items() if value})
+                spans[name] = entry
+        return {'spans': spans, 'recent_requests': [self._breakdown(trace) for trace in self.recent_traces(recent)]}
+
+    @staticmethod
+    def _breakdown(trace: List[Span]) -> Dict[str, Any]:
+        """A trace as its root plus an indented, start-ordered list of child spans"""
+        depth = {}
+        for span in sorted(trace, key=lambda s: s.start_unix_ns):
+            depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+        root = trace[-1]
+        return {
+            'request': root.name,
+            'duration_ms': round(root.duration * 1000, 3),
+            **root.attributes,
+            'spans': [
+                {'name': '  ' * (depth[span.span_id] - 1) + span.name,
+                 'duration_ms': round(span.duration * 1000, 3), **span.attributes}
+                for span in sorted(trace, key=lambda s: s.start_unix_ns) if span is not root
+            ]
+        }
+
+    def to_prometheus(self) -> str:
+        """Aggregates in the Prometheus text exposition format"""
+        duration = f"{METRIC_PREFIX}_span_duration_seconds"
+        cache = f"{METRIC_PREFIX}_span_cache_lookups_total"
+        errors = f"{METRIC_PREFIX}_span_errors_total"
+        lines = [f"# HELP {duration} Time spent in traced operations",
+                 f"# TYPE {duration} histogram"]
+        with self._lock:
+            stats_items = sorted(self._stats.items())
+            for name, stats in stats_items:
+                span = f'span="{_label(name)}"'
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(f'{duration}_bucket{{{span},le="{bound:g}"}} {count}')
+                lines.append(f'{duration}_bucket{{{span},le="+Inf"}} {stats.count}')
+                lines.append(f'{duration}_sum{{{span}}} {stats.total:.9f}')
+                lines.append(f'{duration}_count{{{span}}} {stats.count}')
+
+            lines += [f"# HELP {cache} Cache lookups made by traced operations",
+                      f"# TYPE {cache} counter"]
+            for name, stats in stats_items:
+                if stats.hits or stats.misses:
+                    lines.append(f'{cache}{{span="{_label(name)}",result="hit"}} {stats.hits}')
+                    lines.append(f'{cache}{{span="{_label(name)}",result="miss"}} {stats.misses}')
+
+            lines += [f"# HELP {errors} Traced operations that raised",
+                      f"# TYPE {errors} counter"]
+            lines += [f'{errors}{{span="{_label(name)}"}} {stats.errors}' for name, stats in stats_items
+                      if stats.errors]
+
+            for attribute in COUNTED_ATTRIBUTES:
+                metric = f"{METRIC_PREFIX}_span_{attribute}_total"
+                lines += [f"# HELP {metric} Sum of {attribute} over traced operations",
+                          f"# TYPE {metric} counter"]
+                lines += [f'{metric}{{span="{_label(name)}"}} {stats.counters[attribute]:g}'
+                          for name, stats in stats_items if stats.counters[attribute]]
+        return "\n".join(lines) + "\n"
+
+    def to_otlp_json(self, limit: int = None) -> Dict[str, Any]:
+        """Recent traces as an OpenTelemetry OTLP/JSON ExportTraceServiceRequest"""
+        spans = []
+        for trace in self.recent_traces(limit or self._traces.maxlen):
+            for span in trace:
+                otlp_span = {
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'name': span.name,
+                    'kind': 1,  # SPAN_KIND_INTERNAL
+                    'startTimeUnixNano': str(span.start_unix_ns),
+                    'endTimeUnixNano': str(span.start_unix_ns + int(span.duration * 1e9)),
+                    'attributes': [{'key': key, 'value': _otlp_value(value)}
+                                   for key, value in span.attributes.items()]
+                }
+                if span.parent_id:
+                    otlp_span['parentSpanId'] = span.parent_id
+                if 'error' in span.attributes:
+                    otlp_span['status'] = {'code': 2, 'message': span.attributes['error']}
+                spans.append(otlp_span)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{'scope': {'name': 'tracing'}, 'spans': spans}]
+        }]}
+
+    def write_prometheus(self, path: str):
+        """Write the Prometheus text file atomically (node_exporter textfile collector style)"""
+        _write_atomic(path, self.to_prometheus())
+
+    def write_otlp_json(self, path: str, limit: int = None):
+        _write_atomic(path, json.dumps(self.to_otlp_json(limit)))
+
+
+def _write_atomic(path: str, content: str):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+# Process-wide tracer; TRACING=0 turns span recording off
+tracer = Tracer(enabled=os.getenv("TRACING", "1") != "0")